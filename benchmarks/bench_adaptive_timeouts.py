@@ -0,0 +1,78 @@
+"""
+Compare the fixed probe timeout with RTT-driven adaptive timeouts on a mostly dead range.
+
+Probes are simulated: a live host answers after --rtt seconds, a dead one
+takes whatever timeout the probe was given. Both runs go through the worker
+pool with its retries, so every dead host costs --attempts timeouts.
+
+    python benchmarks/bench_adaptive_timeouts.py --hosts 2000 --live-ratio 0.05
+"""
+import argparse
+import asyncio
+import random
+import time
+from joby_challenge.models.async_worker_pool import AsyncWorkerPool
+from joby_challenge.models.probe_backends import ProbeBackend, AdaptiveTimeouts
+from joby_challenge.models.rtt_estimator import RTTEstimator, DEFAULT_MIN_TIMEOUT_SECONDS
+from joby_challenge.utils import DEFAULT_MAX_ATTEMPTS, DEFAULT_PING_TIMEOUT_SECONDS
+
+
+class SimulatedBackend(ProbeBackend):
+    def __init__(self, live, rtt):
+        super().__init__(DEFAULT_PING_TIMEOUT_SECONDS, None)
+        self.live = live
+        self.rtt = rtt
+
+    async def probe(self, host, timeout=None):
+        if host in self.live:
+            # jittered around the nominal RTT
+            await asyncio.sleep(self.rtt * random.uniform(0.5, 1.5))
+            return True
+
+        await asyncio.sleep(timeout or self.timeout)
+        return False
+
+
+async def run_pool(backend, hosts, args):
+    results = {}
+    pool = AsyncWorkerPool(
+        backend.probe, results.__setitem__, max_concurrent=args.max_concurrent, retry_attempts=args.attempts, retry_delay=0
+    )
+
+    started = time.perf_counter()
+    await pool.start(hosts)
+    elapsed = time.perf_counter() - started
+
+    reachable = sum(1 for value in results.values() if value is True)
+    return elapsed, reachable
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hosts", type=int, default=2000)
+    parser.add_argument("--live-ratio", type=float, default=0.05)
+    parser.add_argument("--rtt", type=float, default=0.002, help="seconds a live host takes to answer")
+    parser.add_argument("--attempts", type=int, default=DEFAULT_MAX_ATTEMPTS)
+    parser.add_argument("--max-concurrent", type=int, default=200)
+    parser.add_argument("--min-timeout", type=float, default=DEFAULT_MIN_TIMEOUT_SECONDS)
+    args = parser.parse_args()
+
+    hosts = [f"10.0.{index >> 8}.{index & 0xFF}" for index in range(args.hosts)]
+    live = set(random.Random(0).sample(hosts, int(len(hosts) * args.live_ratio)))
+    # live hosts spread through the range rather than bunched at the start
+    random.Random(1).shuffle(hosts)
+
+    elapsed, reachable = await run_pool(SimulatedBackend(live, args.rtt), hosts, args)
+    print(f"fixed {DEFAULT_PING_TIMEOUT_SECONDS}s timeout: {len(hosts)} hosts, {reachable} reachable, {elapsed:.3f}s")
+
+    estimator = RTTEstimator(args.min_timeout, DEFAULT_PING_TIMEOUT_SECONDS)
+    elapsed, reachable = await run_pool(AdaptiveTimeouts(SimulatedBackend(live, args.rtt), estimator), hosts, args)
+    stats = estimator.stats()
+    print(
+        f"adaptive timeouts  : {len(hosts)} hosts, {reachable} reachable, {elapsed:.3f}s, "
+        f"mean timeout {stats['mean_timeout'] * 1000:.1f} ms over {stats['probes']} probes"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
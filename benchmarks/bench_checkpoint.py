@@ -0,0 +1,68 @@
+"""
+Hosts/s of a lazy Orchestrator scan with and without --checkpoint, the size
+of the journal it leaves, and the time --resume takes to replay it.
+
+Probes are an instant in-process fake, hosts ending in 0, 4 or 8 up.
+
+    python benchmarks/bench_checkpoint.py --networks 10.0.0.0/16 10.1.0.0/16
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from joby_challenge.models.checkpoint import CheckpointJournal
+from joby_challenge.models.network_data_collector import NetworkDataCollector
+from joby_challenge.models.orchestrator import Orchestrator
+
+
+async def instant_probe(host, timeout=None):
+    # hosts ending in 0, 4 or 8 are up, a mix of both result lists
+    return host.endswith(("0", "4", "8"))
+
+
+def scan(networks, checkpoint_path):
+    orchestrator = Orchestrator(networks, lazy=True, checkpoint_path=checkpoint_path)
+    orchestrator.worker_pool.target_function = instant_probe
+
+    started = time.perf_counter()
+    asyncio.run(orchestrator.run_pool(orchestrator.ip_addresses))
+    return time.perf_counter() - started, len(orchestrator.ip_addresses)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--networks", nargs="+", default=["10.0.0.0/16", "10.1.0.0/16"])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "scan.journal")
+
+        plain = []
+        journaled = []
+        for _ in range(args.repeat):
+            elapsed, hosts = scan(args.networks, None)
+            plain.append(elapsed)
+            elapsed, hosts = scan(args.networks, path)
+            journaled.append(elapsed)
+
+        plain = min(plain)
+        journaled = min(journaled)
+        print(f"without journal: {hosts / plain:>10,.0f} hosts/s")
+        print(f"with journal   : {hosts / journaled:>10,.0f} hosts/s ({journaled / plain - 1:.1%} overhead)")
+        print(f"journal size   : {os.path.getsize(path):>10,} bytes for {hosts:,} results")
+
+        collector = NetworkDataCollector(networks=args.networks)
+        journal = CheckpointJournal(path, collector.store)
+        started = time.perf_counter()
+        journal.prepare(resume=True, on_result=collector.restore)
+        elapsed = time.perf_counter() - started
+        print(f"resume replay  : {elapsed:>10.3f}s for {journal.restored:,} results")
+
+
+if __name__ == "__main__":
+    main()
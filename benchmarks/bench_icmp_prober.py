@@ -0,0 +1,48 @@
+"""
+Compare the per-host aioping path against the shared-socket ICMPProber.
+
+Both run through AsyncWorkerPool against loopback addresses (every 127.0.0.0/8
+address answers), so the numbers measure probe overhead rather than the network.
+Needs raw socket privileges.
+
+    python benchmarks/bench_icmp_prober.py --network 127.0.0.0/22
+"""
+import argparse
+import asyncio
+import ipaddress
+import time
+from joby_challenge.models.async_worker_pool import AsyncWorkerPool, DEFAULT_MAX_CONCURRENT_WORKERS
+from joby_challenge.models.icmp_prober import ICMPProber
+from joby_challenge.utils import ping_host
+
+
+async def run_pool(target_function, hosts, max_concurrent):
+    results = {}
+    pool = AsyncWorkerPool(target_function, results.__setitem__, max_concurrent=max_concurrent)
+
+    started = time.perf_counter()
+    await pool.start(hosts)
+    elapsed = time.perf_counter() - started
+
+    reachable = sum(1 for value in results.values() if value is True)
+    return elapsed, reachable
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--network", default="127.0.0.0/22")
+    parser.add_argument("--max-concurrent", type=int, default=DEFAULT_MAX_CONCURRENT_WORKERS)
+    args = parser.parse_args()
+
+    hosts = [str(ip) for ip in ipaddress.ip_network(args.network).hosts()]
+
+    elapsed, reachable = await run_pool(ping_host, hosts, args.max_concurrent)
+    print(f"aioping per host : {len(hosts)} hosts, {reachable} reachable, {elapsed:.3f}s, {len(hosts) / elapsed:,.0f} probes/s")
+
+    async with ICMPProber() as prober:
+        elapsed, reachable = await run_pool(prober.ping, hosts, args.max_concurrent)
+    print(f"shared ICMP socket: {len(hosts)} hosts, {reachable} reachable, {elapsed:.3f}s, {len(hosts) / elapsed:,.0f} probes/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+"""
+CLI startup cost: import time of joby_challenge.main and wall time of --help.
+
+Measures in fresh interpreters with python -X importtime, keeping the best of
+--repeat runs, and exits non-zero when the import goes over --budget-ms so a
+CI step or cron canary catches a startup regression. Over budget, the
+slowest modules it pulled in are listed.
+
+    python benchmarks/bench_import_time.py --budget-ms 50
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+MODULE = "joby_challenge.main"
+
+
+def import_times():
+    """{module: cumulative import microseconds} of MODULE and everything its import pulled in."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {MODULE}"], capture_output=True, text=True, check=True
+    ).stderr
+
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+        if name.strip() != MODULE and len(name) - len(name.lstrip()) == 1:
+            # a top level import before MODULE's, site and the like
+            times = {}
+
+    return times
+
+
+def help_seconds():
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-m", MODULE, "--help"], capture_output=True, check=True)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=50.0, help="largest acceptable import time of the CLI")
+    parser.add_argument("--top", type=int, default=10, help="slowest modules listed when over budget")
+    args = parser.parse_args()
+
+    runs = [import_times() for _ in range(args.repeat)]
+    best = min(runs, key=lambda times: times[MODULE])
+    import_ms = best[MODULE] / 1000
+    help_ms = min(help_seconds() for _ in range(args.repeat)) * 1000
+
+    print(f"import {MODULE}: {import_ms:>7.1f} ms ({len(best)} modules, budget {args.budget_ms:.0f} ms)")
+    print(f"--help wall time         : {help_ms:>7.1f} ms, interpreter start included")
+
+    if import_ms > args.budget_ms:
+        print("over budget, slowest imports:")
+        for name, microseconds in sorted(best.items(), key=lambda item: -item[1])[1:args.top + 1]:
+            print(f"  {microseconds / 1000:>7.1f} ms {name}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
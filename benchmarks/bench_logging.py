@@ -0,0 +1,67 @@
+"""
+Cost of a per host log call on the calling thread.
+
+Compares the old setup, a DEBUG basicConfig StreamHandler fed f-strings, with
+configure_logging's queue handler and per template sampling, and with a debug
+call that the level check drops. Output goes to /dev/null.
+
+    python benchmarks/bench_logging.py --calls 200000
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from joby_challenge.logs import configure_logging
+
+HOST = "10.0.0.1"
+
+
+def reset_root():
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+
+
+def timed(calls, log):
+    started = time.perf_counter()
+    for _ in range(calls):
+        log()
+    return (time.perf_counter() - started) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200_000)
+    args = parser.parse_args()
+
+    logger = logging.getLogger("pings")
+    stderr = sys.stderr
+    sys.stderr = open(os.devnull, "w")
+    results = {}
+
+    try:
+        reset_root()
+        logging.basicConfig(level=logging.DEBUG)
+        results["basicConfig DEBUG, f-string"] = timed(args.calls, lambda: logger.info(f"{HOST} is reachable"))
+
+        reset_root()
+        listener = configure_logging("INFO")
+        results["queue + sampling, INFO"] = timed(args.calls, lambda: logger.info("%s is reachable", HOST))
+        results["queue, DEBUG call at INFO"] = timed(args.calls, lambda: logger.debug("%s ping failed", HOST))
+        listener.stop()
+
+        reset_root()
+        listener = configure_logging("INFO", burst=0)
+        results["queue, no sampling, INFO"] = timed(args.calls, lambda: logger.info("%s is reachable", HOST))
+        listener.stop()
+    finally:
+        sys.stderr.close()
+        sys.stderr = stderr
+
+    for name, seconds in results.items():
+        print(f"{name:28} {seconds * 1e9:>8,.0f} ns per call")
+
+
+if __name__ == "__main__":
+    main()
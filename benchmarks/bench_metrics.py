@@ -0,0 +1,50 @@
+"""
+Per call cost of the worker pool's metrics counters and latency histogram.
+
+Pushes --items no-op calls through AsyncWorkerPool with metrics=None and with
+a Metrics registry, and prints calls/s for each and the difference.
+
+    python benchmarks/bench_metrics.py --items 200000
+"""
+import argparse
+import asyncio
+import time
+from joby_challenge.models.async_worker_pool import AsyncWorkerPool
+from joby_challenge.models.metrics import Metrics
+
+
+async def no_op(argument):
+    return True
+
+
+def dispatch(items, metrics):
+    pool = AsyncWorkerPool(no_op, lambda argument, result: None, metrics=metrics)
+
+    started = time.perf_counter()
+    asyncio.run(pool.start(range(items)))
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    plain = []
+    measured = []
+    for _ in range(args.repeat):
+        plain.append(dispatch(args.items, None))
+        measured.append(dispatch(args.items, Metrics()))
+
+    plain = min(plain)
+    measured = min(measured)
+    overhead = (measured - plain) / args.items
+
+    print(f"without metrics: {args.items / plain:>12,.0f} calls/s")
+    print(f"with metrics   : {args.items / measured:>12,.0f} calls/s")
+    print(f"overhead       : {overhead * 1e9:,.0f} ns per call ({measured / plain - 1:.1%} of a no-op dispatch)")
+
+
+if __name__ == "__main__":
+    main()
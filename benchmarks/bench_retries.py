@@ -0,0 +1,67 @@
+"""
+Compare in-call retries (utils.async_retry) with pool-scheduled retries on a mostly dead range.
+
+Probes are simulated: a live host answers straight away, a dead one takes the
+full timeout. Timeouts and backoff are the real defaults multiplied by
+--time-scale, so the run stays short while keeping their proportions.
+
+    python benchmarks/bench_retries.py --hosts 2000 --live-ratio 0.05
+"""
+import argparse
+import asyncio
+import random
+import time
+from joby_challenge.models.async_worker_pool import AsyncWorkerPool, DEFAULT_MAX_CONCURRENT_WORKERS
+from joby_challenge.utils import async_retry, DEFAULT_MAX_ATTEMPTS, DEFAULT_DELAY_SECONDS, DEFAULT_PING_TIMEOUT_SECONDS
+
+
+def simulated_probe(live, timeout):
+    async def probe(host):
+        if host in live:
+            await asyncio.sleep(0)
+            return True
+
+        await asyncio.sleep(timeout)
+        return False
+
+    return probe
+
+
+async def run_pool(target_function, hosts, max_concurrent, **options):
+    results = {}
+    pool = AsyncWorkerPool(target_function, results.__setitem__, max_concurrent=max_concurrent, **options)
+
+    started = time.perf_counter()
+    await pool.start(hosts)
+    elapsed = time.perf_counter() - started
+
+    reachable = sum(1 for value in results.values() if value is True)
+    return elapsed, reachable
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hosts", type=int, default=2000)
+    parser.add_argument("--live-ratio", type=float, default=0.05)
+    parser.add_argument("--max-concurrent", type=int, default=DEFAULT_MAX_CONCURRENT_WORKERS)
+    parser.add_argument("--time-scale", type=float, default=0.05)
+    args = parser.parse_args()
+
+    hosts = [f"10.0.{index >> 8}.{index & 0xFF}" for index in range(args.hosts)]
+    live = set(random.Random(0).sample(hosts, int(len(hosts) * args.live_ratio)))
+
+    timeout = DEFAULT_PING_TIMEOUT_SECONDS * args.time_scale
+    delay = DEFAULT_DELAY_SECONDS * args.time_scale
+    probe = simulated_probe(live, timeout)
+
+    elapsed, reachable = await run_pool(async_retry(DEFAULT_MAX_ATTEMPTS, delay)(probe), hosts, args.max_concurrent)
+    print(f"async_retry in call : {len(hosts)} hosts, {reachable} reachable, {elapsed:.3f}s, {len(hosts) / elapsed:,.0f} hosts/s")
+
+    elapsed, reachable = await run_pool(
+        probe, hosts, args.max_concurrent, retry_attempts=DEFAULT_MAX_ATTEMPTS, retry_delay=delay
+    )
+    print(f"pool retry scheduler: {len(hosts)} hosts, {reachable} reachable, {elapsed:.3f}s, {len(hosts) / elapsed:,.0f} hosts/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
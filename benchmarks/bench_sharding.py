@@ -0,0 +1,46 @@
+"""
+Scan throughput of Orchestrator with 1..N shard processes.
+
+Uses the shared ICMP socket against loopback networks (every 127.0.0.0/8 address
+answers) so the probe path, not the network, is the bottleneck. Needs raw socket
+privileges; scaling is bounded by the number of CPU cores.
+
+    python benchmarks/bench_sharding.py --networks 127.0.0.0/18 127.1.0.0/18 --processes 1 2 4
+"""
+import argparse
+import asyncio
+import os
+import time
+from joby_challenge.models.orchestrator import Orchestrator
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--networks", nargs="+", default=["127.0.0.0/18", "127.1.0.0/18"])
+    parser.add_argument("--processes", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--max-concurrent", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPU cores")
+    baseline = None
+
+    for processes in args.processes:
+        orchestrator = Orchestrator(
+            args.networks,
+            shared_socket=True,
+            lazy=True,
+            max_concurrent=args.max_concurrent,
+            processes=processes,
+        )
+        hosts = len(orchestrator.ip_addresses)
+
+        started = time.perf_counter()
+        asyncio.run(orchestrator.start())
+        rate = hosts / (time.perf_counter() - started)
+        baseline = baseline or rate
+
+        print(f"{processes} process(es): {hosts} hosts, {rate:,.0f} hosts/s, {rate / baseline:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
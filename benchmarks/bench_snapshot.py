@@ -0,0 +1,73 @@
+"""
+Time saving two snapshots of a large network and diffing them.
+
+The stores are filled with random bitmaps instead of scanning, roughly
+--reachable-ratio of the hosts up in either run.
+
+    python benchmarks/bench_snapshot.py --network 10.0.0.0/8
+"""
+import argparse
+import ipaddress
+import math
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from joby_challenge.models.bitmap import Bitmap
+from joby_challenge.models.result_store import OffsetResultStore
+from joby_challenge.models.snapshot import Snapshot, write_snapshot, diff_snapshots
+
+
+def random_store(network, reachable_ratio, seed):
+    rng = random.Random(seed)
+    size = ipaddress.ip_network(network).num_addresses
+    store = OffsetResultStore([network])
+
+    # AND-ing random words thins the set bits out to about reachable_ratio
+    reachable = rng.getrandbits(size)
+    for _ in range(max(0, round(math.log2(1 / reachable_ratio)) - 1)):
+        reachable &= rng.getrandbits(size)
+
+    store.probed[0] = Bitmap.from_int((1 << size) - 1)
+    store.reachable[0] = Bitmap.from_int(reachable)
+
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--network", default="10.0.0.0/8")
+    parser.add_argument("--reachable-ratio", type=float, default=0.25)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = [os.path.join(directory, name) for name in ("old.snap", "new.snap")]
+
+        for seed, path in enumerate(paths):
+            store = random_store(args.network, args.reachable_ratio, seed)
+
+            started = time.perf_counter()
+            write_snapshot(path, store)
+            print(f"write : {time.perf_counter() - started:.3f}s, {os.path.getsize(path) / 2 ** 20:.1f} MiB")
+
+        del store
+
+        tracemalloc.start()
+        started = time.perf_counter()
+
+        with Snapshot(paths[0]) as old, Snapshot(paths[1]) as new:
+            [network_diff] = diff_snapshots(old, new)
+
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(
+            f"diff  : {elapsed:.3f}s, peak {peak / 2 ** 20:.1f} MiB, {network_diff.probed:,} hosts, "
+            f"{network_diff.came_up_count:,} came up, {network_diff.went_down_count:,} went down"
+        )
+
+
+if __name__ == "__main__":
+    main()
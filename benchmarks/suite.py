@@ -0,0 +1,363 @@
+"""
+Offline micro-benchmarks of the scan pipeline, with saved baselines.
+
+Every benchmark is run in rounds of at least MIN_ROUND_SECONDS, --repeat
+rounds, and the best round reported as ops/sec. It then runs once more under
+tracemalloc for its peak memory. No network access
+or privileges are needed, probes go to an in-process fake.
+
+    python benchmarks/suite.py --save baseline.json
+    python benchmarks/suite.py --compare baseline.json --threshold 0.2
+    python benchmarks/suite.py --only pool collector
+
+Speed is compared relative to a fixed pure Python reference loop timed right
+before each benchmark, so a busy or throttled machine doesn't read as a
+regression. --compare exits with status 1 when a benchmark got slower or
+hungrier than the baseline by more than the threshold.
+"""
+import argparse
+import asyncio
+import atexit
+import collections
+import gc
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from joby_challenge.models.async_worker_pool import AsyncWorkerPool
+from joby_challenge.models.ip_address_handler import IPAddressHandler
+from joby_challenge.models.exclusions import Exclusions
+from joby_challenge.models.target_sources import OffsetTargets, StreamedTargets
+from joby_challenge.models.network_data_collector import NetworkDataCollector
+from joby_challenge.models.orchestrator import Orchestrator
+
+SKIPS = ["1", "3", "5"]
+POOL_ITEMS = 100_000
+ORCHESTRATOR_NETWORKS = ["10.1.0.0/20", "10.2.0.0/20"]
+# every 13th address of the /16 is excluded, about 5000 entries like a large IPAM export
+EXCLUSION_STEP = 13
+IPV6_PREFIXES = ["2001:db8:1::/64", "2001:db8:2::/64"]
+# interface identifiers probed in each IPv6 prefix
+IPV6_OFFSETS = 50_000
+# lines of the generated targets file, drawn from STREAMED_NETWORKS so about a third repeat
+STREAMED_LINES = 300_000
+STREAMED_NETWORKS = ["10.1.0.0/16", "10.2.0.0/16", "10.3.0.0/16"]
+# addresses taken from the /8, all 16M would take minutes under tracemalloc
+LARGE_NETWORK_SAMPLE = 1_000_000
+
+# short benchmarks are looped until a timed round takes at least this long, like timeit's autorange
+MIN_ROUND_SECONDS = 0.2
+
+REFERENCE_OPERATIONS = 200_000
+
+# name -> factory returning (run callable, operations per run)
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(factory):
+        BENCHMARKS[name] = factory
+        return factory
+
+    return register
+
+
+async def no_op(argument):
+    return True
+
+
+async def fake_probe(host):
+    """Even last octets answer, odd ones don't, and every probe yields to the loop once."""
+    await asyncio.sleep(0)
+    return int(host.rsplit(".", 1)[-1]) % 2 == 0
+
+
+def reference():
+    """Fixed interpreter workload the benchmarks are measured against."""
+    def run():
+        total = 0
+        for value in range(REFERENCE_OPERATIONS):
+            total += value & 0xFF
+
+    return run, REFERENCE_OPERATIONS
+
+
+def expand(network, lazy, limit=None, exclusions=None):
+    def run():
+        handler = IPAddressHandler([network], skips=SKIPS, lazy=lazy, exclusions=exclusions)
+        # consume lazy targets the way the pool does, without keeping them
+        collections.deque(itertools.islice(handler.ip_addresses, limit), maxlen=0)
+
+    size = len(IPAddressHandler([network], skips=SKIPS, lazy=True, exclusions=exclusions).ip_addresses)
+    return run, min(size, limit or size)
+
+
+@benchmark("handler_expand_24")
+def handler_expand_24():
+    return expand("10.0.0.0/24", lazy=False)
+
+
+@benchmark("handler_expand_16")
+def handler_expand_16():
+    return expand("10.0.0.0/16", lazy=False)
+
+
+@benchmark("handler_lazy_16")
+def handler_lazy_16():
+    return expand("10.0.0.0/16", lazy=True)
+
+
+@benchmark("handler_lazy_16_exclusions")
+def handler_lazy_16_exclusions():
+    exclusions = Exclusions(f"10.0.{offset >> 8}.{offset & 0xFF}" for offset in range(0, 2 ** 16, EXCLUSION_STEP))
+    return expand("10.0.0.0/16", lazy=True, exclusions=exclusions)
+
+
+@benchmark("handler_lazy_8")
+def handler_lazy_8():
+    # a /8 as an eager list is 16M strings, only the lazy path is practical
+    return expand("10.0.0.0/8", lazy=True, limit=LARGE_NETWORK_SAMPLE)
+
+
+@benchmark("sparse_ipv6_targets")
+def sparse_ipv6_targets():
+    # spread over the whole 64 bit interface identifier space
+    offsets = [index * 0x9E3779B97F4A7C15 % 2 ** 64 for index in range(1, IPV6_OFFSETS + 1)]
+
+    def run():
+        targets = OffsetTargets(IPV6_PREFIXES, offsets)
+        collections.deque(targets, maxlen=0)
+
+    return run, IPV6_OFFSETS * len(IPV6_PREFIXES)
+
+
+@benchmark("sparse_ipv6_store")
+def sparse_ipv6_store():
+    offsets = [index * 0x9E3779B97F4A7C15 % 2 ** 64 for index in range(1, IPV6_OFFSETS + 1)]
+    addresses = list(OffsetTargets(IPV6_PREFIXES, offsets))
+
+    def run():
+        collector = NetworkDataCollector(networks=IPV6_PREFIXES, offsets=offsets)
+        for index, address in enumerate(addresses):
+            collector.add_result(address, index % 5 != 0)
+        collector.find_mismatches()
+
+    return run, len(addresses)
+
+
+@benchmark("streamed_targets_file")
+def streamed_targets_file():
+    """Targets file ingestion the way the pool consumes it, reads in a thread and async iteration."""
+    rng = random.Random(0)
+    file = tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False)
+    with file:
+        for _ in range(STREAMED_LINES):
+            offset = rng.randrange(1, 2 ** 16 - 1)
+            file.write(f"10.{rng.randrange(1, 4)}.{offset >> 8}.{offset & 0xFF}\n")
+
+    async def consume(targets):
+        async for _ in targets:
+            pass
+
+    def run():
+        asyncio.run(consume(StreamedTargets(file.name, STREAMED_NETWORKS)))
+
+    atexit.register(os.unlink, file.name)
+
+    return run, STREAMED_LINES
+
+
+def pool_dispatch(queue_size):
+    items = range(POOL_ITEMS)
+
+    def run():
+        pool = AsyncWorkerPool(no_op, lambda argument, result: None, queue_size=queue_size)
+        asyncio.run(pool.start(items))
+
+    return run, POOL_ITEMS
+
+
+@benchmark("pool_dispatch")
+def pool_dispatch_unbounded():
+    return pool_dispatch(None)
+
+
+@benchmark("pool_dispatch_streaming")
+def pool_dispatch_streaming():
+    return pool_dispatch(200)
+
+
+def collector_results():
+    """Counterpart results of two /16s, every 7th host differing."""
+    results = []
+    for offset in range(1, 65535):
+        high, low = offset >> 8, offset & 0xFF
+        results.append((f"10.1.{high}.{low}", True))
+        results.append((f"10.2.{high}.{low}", offset % 7 != 0))
+
+    return results
+
+
+@benchmark("collector_add_result")
+def collector_add_result():
+    results = collector_results()
+
+    def run():
+        collector = NetworkDataCollector()
+        for address, reachable in results:
+            collector.add_result(address, reachable)
+
+    return run, len(results)
+
+
+@benchmark("collector_add_result_store")
+def collector_add_result_store():
+    results = collector_results()
+
+    def run():
+        collector = NetworkDataCollector(networks=["10.1.0.0/16", "10.2.0.0/16"])
+        for address, reachable in results:
+            collector.add_result(address, reachable)
+        collector.find_mismatches()
+
+    return run, len(results)
+
+
+@benchmark("collector_check_mismatches")
+def collector_check_mismatches():
+    maps = [{"10.1.0.1": True, "10.2.0.1": index % 7 != 0} for index in range(100_000)]
+
+    def run():
+        collector = NetworkDataCollector()
+        for ip_address_map in maps:
+            collector.check_mismatches(ip_address_map)
+
+    return run, len(maps)
+
+
+@benchmark("orchestrator_start")
+def orchestrator_start():
+    def run():
+        orchestrator = Orchestrator(ORCHESTRATOR_NETWORKS, lazy=True, max_concurrent=200)
+        orchestrator.worker_pool.target_function = fake_probe
+        # retries still happen, without waiting out real backoff
+        orchestrator.worker_pool.retry_delay = 0
+        asyncio.run(orchestrator.start())
+
+    return run, len(IPAddressHandler(ORCHESTRATOR_NETWORKS, lazy=True).ip_addresses)
+
+
+def time_round(run, loops):
+    # collections would land in whichever round they happen to, timeit turns gc off too
+    gc.collect()
+    gc.disable()
+
+    try:
+        started = time.perf_counter()
+        for _ in range(loops):
+            run()
+        return time.perf_counter() - started
+    finally:
+        gc.enable()
+
+
+def best_time(run, repeat):
+    """Seconds per run, best of repeat rounds."""
+    loops = 1
+    while time_round(run, loops) < MIN_ROUND_SECONDS:
+        loops *= 2
+
+    return min(time_round(run, loops) for _ in range(repeat)) / loops
+
+
+def measure(factory, repeat):
+    run, operations = factory()
+
+    reference_run, reference_operations = reference()
+    reference_speed = reference_operations / best_time(reference_run, repeat)
+    best = best_time(run, repeat)
+
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "operations": operations,
+        "seconds": best,
+        "ops_per_sec": operations / best,
+        "relative_speed": operations / best / reference_speed,
+        "peak_bytes": peak,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Names of the benchmarks that regressed against the baseline."""
+    regressions = []
+
+    for name, result in results.items():
+        previous = baseline["results"].get(name)
+        if not previous:
+            continue
+
+        speed = result["relative_speed"] / previous["relative_speed"]
+        memory = result["peak_bytes"] / max(previous["peak_bytes"], 1)
+        slower = speed < 1 - threshold
+        hungrier = memory > 1 + threshold
+
+        print(
+            f"  {name:28} {speed:6.2f}x speed {memory:6.2f}x memory"
+            f"{'  SLOWER' if slower else ''}{'  MORE MEMORY' if hungrier else ''}"
+        )
+
+        if slower or hungrier:
+            regressions.append(name)
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", help="run the benchmarks whose names contain any of these")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", help="write the results to this JSON baseline file")
+    parser.add_argument("--compare", help="baseline JSON file to check the results against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args()
+
+    names = [
+        name for name in BENCHMARKS
+        if not args.only or any(pattern in name for pattern in args.only)
+    ]
+
+    results = {}
+    for name in names:
+        result = results[name] = measure(BENCHMARKS[name], args.repeat)
+        print(
+            f"{name:28} {result['ops_per_sec']:>14,.0f} ops/s "
+            f"{result['seconds']:8.3f}s {result['peak_bytes'] / 2 ** 20:8.1f} MiB peak"
+        )
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump({"python": platform.python_version(), "results": results}, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+
+        print(f"compared with {args.compare} (python {baseline['python']}):")
+        regressions = compare(results, baseline, args.threshold)
+
+        if regressions:
+            print(f"regressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
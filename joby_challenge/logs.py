@@ -0,0 +1,155 @@
+import copy
+import logging
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+LOG_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR"]
+DEFAULT_LOG_LEVEL = "INFO"
+# records per message template let through each window, 0 disables sampling
+DEFAULT_LOG_BURST = 50
+DEFAULT_LOG_WINDOW_SECONDS = 1.0
+# loggers of the per probe progress messages, the only ones sampled; reports are never cut short
+SAMPLED_LOGGERS = ("pings", "ICMPProber", "ProbeBackends", "AsyncWorkerPool")
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that hands the record over as is.
+
+    The stock prepare() formats the message on the calling thread, which is the
+    event loop; here the listener thread does all formatting and writing.
+    """
+    def prepare(self, record):
+        return record
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets through at most burst records per message template and window.
+
+    Per host messages share a template ("%s is reachable"), so a fast scan logs
+    a sample of them instead of one line per host. The first record of a
+    template in a later window carries the count that was dropped before it.
+    Only records of the loggers in names are sampled, and records above
+    max_level (warnings, errors) always pass.
+    """
+    def __init__(
+        self, burst=DEFAULT_LOG_BURST, window=DEFAULT_LOG_WINDOW_SECONDS, max_level=logging.INFO, names=SAMPLED_LOGGERS
+    ):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.max_level = max_level
+        self.names = frozenset(names)
+        self.window_end = 0.0
+        # (logger name, template) -> records seen this window
+        self.counts = {}
+        self.suppressed = {}
+
+    def filter(self, record):
+        if record.levelno > self.max_level or not self.burst or record.name not in self.names:
+            return True
+
+        now = time.monotonic()
+        if now >= self.window_end:
+            self.window_end = now + self.window
+            self.counts.clear()
+
+        key = (record.name, record.msg)
+        seen = self.counts.get(key, 0) + 1
+        self.counts[key] = seen
+
+        if seen > self.burst:
+            self.suppressed[key] = self.suppressed.get(key, 0) + 1
+            return False
+
+        dropped = self.suppressed.pop(key, 0)
+        if dropped:
+            record.msg = f"{record.getMessage()} ({dropped} similar messages suppressed)"
+            record.args = None
+
+        return True
+
+
+def configure_logging(level=DEFAULT_LOG_LEVEL, burst=DEFAULT_LOG_BURST, window=DEFAULT_LOG_WINDOW_SECONDS):
+    """
+    Route the root logger through a queue to a stderr handler on its own thread.
+
+    Replaces any handlers already on the root logger. Returns the started
+    QueueListener, stop() it before exiting to flush what is still queued.
+    """
+    records = queue.SimpleQueue()
+
+    handler = DeferredQueueHandler(records)
+    handler.addFilter(RateLimitFilter(burst, window))
+
+    stream = logging.StreamHandler()
+    stream.setFormatter(logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    listener = QueueListener(records, stream)
+    listener.start()
+
+    return listener
+
+
+class ForwardingQueueHandler(QueueHandler):
+    """
+    QueueHandler for records sent to another process, keeping their template.
+
+    The stock prepare() merges args into msg, so the parent's RateLimitFilter
+    would see one template per host and never sample forwarded records. Here
+    only what might not pickle is turned into text: args other than plain
+    values and the exception info.
+    """
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = str(record.msg)
+
+        if isinstance(record.args, dict):
+            record.args = {name: plain_value(value) for name, value in record.args.items()}
+        elif record.args:
+            record.args = tuple(plain_value(value) for value in record.args)
+
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+
+        return record
+
+
+def plain_value(value):
+    return value if isinstance(value, (str, int, float, type(None))) else str(value)
+
+
+class ForwardedRecords(QueueListener):
+    """
+    Drains records that other processes queued with forward_logging() and hands
+    each to the logger it was logged on here, so the usual handlers, level and
+    sampling apply to them.
+    """
+    def handle(self, record):
+        logging.getLogger(record.name).handle(record)
+
+
+def forward_logging(records, level):
+    """
+    Process pool initializer: send this process' log records to the records
+    multiprocessing queue, which a ForwardedRecords in the parent drains.
+
+    A forked child inherits the parent's queue handler but not the listener
+    thread behind it, so without this everything it logs is lost.
+    """
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(ForwardingQueueHandler(records))
+    root.setLevel(level)
@@ -1,17 +1,31 @@
 import argparse
-import asyncio
+import itertools
 import logging
-from joby_challenge.models.orchestrator import Orchestrator
+import sys
+from joby_challenge.models.backend_registry import is_backend, backend_names, BACKENDS, BACKEND_ICMP
+from joby_challenge.logs import configure_logging, LOG_LEVELS, DEFAULT_LOG_LEVEL, DEFAULT_LOG_BURST
+from joby_challenge.models.reports import REPORTS
 
-# Setup logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
+# changed addresses listed per network and direction by the diff subcommand
+DEFAULT_DIFF_LIMIT = 20
 
 logger = logging.getLogger("main")
 
+def add_logging_args(parser):
+    parser.add_argument(
+        "--log-level",
+        choices=LOG_LEVELS,
+        default=DEFAULT_LOG_LEVEL,
+        help="least severe log level printed, DEBUG logs every probe attempt",
+    )
+    parser.add_argument(
+        "--log-burst",
+        type=int,
+        default=DEFAULT_LOG_BURST,
+        help="per host probe messages of one kind printed per second before the rest are counted and dropped, "
+             "0 prints all; reports are never sampled",
+    )
+
 def parse_args():
     """
     Argument Parser function for user to run network ping tool
@@ -27,28 +41,398 @@ def parse_args():
         default="192.168.2.0/24",
         help="second ip address range, string written in CIDR (Classless Inter-Domain Routing) notation",
     )
+    parser.add_argument(
+        "--networks",
+        nargs="+",
+        help="any number of ip address ranges to compare by host offset, overrides --network_1/--network_2",
+    )
     parser.add_argument(
         "--skips",
         nargs="*",
         help="last octet of an ip address to skip, space separated for multiple",
     )
+    parser.add_argument(
+        "--exclude",
+        nargs="+",
+        default=[],
+        help="CIDRs, first-last ranges or single addresses to leave out of the scan",
+    )
+    parser.add_argument(
+        "--exclude-file",
+        action="append",
+        default=[],
+        help="file of exclusions in --exclude syntax, one per line with # comments, may be repeated",
+    )
+    parser.add_argument(
+        "--targets-file",
+        help="probe only the addresses in this file, one per line, - for stdin; read as the scan goes, "
+             "duplicates and addresses outside the networks dropped",
+    )
+    parser.add_argument(
+        "--iid-offsets",
+        nargs="+",
+        default=[],
+        help="probe only these host offsets in every network, integers or IPv6 interface identifiers like ::1, "
+             "for prefixes too large to enumerate",
+    )
+    parser.add_argument(
+        "--hitlist",
+        action="append",
+        default=[],
+        help="file of known addresses, one per line; each one's host offset is probed in every network, "
+             "may be repeated",
+    )
+    parser.add_argument(
+        "--shared-socket",
+        action="store_true",
+        help="probe through one long-lived ICMP socket instead of opening a socket per ping",
+    )
+    parser.add_argument(
+        "--backend",
+        default=BACKEND_ICMP,
+        help=f"how hosts are probed: icmp echo, unprivileged tcp connects / udp datagrams to --ports, "
+             f"or a backend installed packages register; one of {', '.join(sorted(BACKENDS))} built in",
+    )
+    parser.add_argument(
+        "--ports",
+        nargs="+",
+        type=int,
+        help="ports the tcp and udp backends try on every host, the first answer wins",
+    )
+    parser.add_argument(
+        "--probe-timeout",
+        type=float,
+        help="seconds a single probe waits for an answer, defaults depend on the backend",
+    )
+    parser.add_argument(
+        "--adaptive-timeouts",
+        action="store_true",
+        help="derive each probe's timeout from the smoothed RTT and deviation of the replies from its subnet",
+    )
+    parser.add_argument(
+        "--timeout-bounds",
+        nargs=2,
+        type=float,
+        metavar=("MIN", "MAX"),
+        help="floor and ceiling in seconds for --adaptive-timeouts, defaults to 50 ms and the backend's timeout",
+    )
+    parser.add_argument(
+        "--max-connections",
+        type=int,
+        help="sockets the tcp and udp backends keep open at once, defaults to 256",
+    )
+    parser.add_argument(
+        "--lazy",
+        action="store_true",
+        help="generate target addresses lazily instead of building the full list up front",
+    )
+    parser.add_argument(
+        "--interleave",
+        action="store_true",
+        help="probe the networks offset by offset and report each mismatch as soon as it is known",
+    )
+    parser.add_argument(
+        "--max-concurrent",
+        type=int,
+        help="number of pings in flight, the starting point with --adaptive-concurrency",
+    )
+    parser.add_argument(
+        "--adaptive-concurrency",
+        action="store_true",
+        help="adjust the in-flight limit from observed failures and latency (AIMD)",
+    )
+    parser.add_argument(
+        "--concurrency-bounds",
+        nargs=2,
+        type=int,
+        metavar=("MIN", "MAX"),
+        help="lower and upper in-flight limit for --adaptive-concurrency",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        metavar="PPS",
+        help="maximum pings per second across all workers",
+    )
+    parser.add_argument(
+        "--subnet-rate-limit",
+        type=float,
+        metavar="PPS",
+        help="maximum pings per second to any single destination /24",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="split the scan across this many processes, 0 for one per CPU core",
+    )
+    parser.add_argument(
+        "--cache",
+        dest="cache_path",
+        help="sqlite file of previous results, hosts with a fresh entry are not probed again",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        help="seconds a cached result stays fresh",
+    )
+    parser.add_argument(
+        "--cache-changed-ttl",
+        type=float,
+        help="seconds a result that differs from its cached value stays fresh, 0 re-probes it next run",
+    )
+    parser.add_argument(
+        "--monitor",
+        action="store_true",
+        help="keep re-sweeping and only report transitions, stable hosts are probed less often",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        help="seconds between the starts of two --monitor sweeps",
+    )
+    parser.add_argument(
+        "--cycles",
+        type=int,
+        help="stop --monitor after this many sweeps, runs until interrupted by default",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        help="bound the work queue and start workers immediately, defaults to a bounded queue with --lazy",
+    )
+    parser.add_argument(
+        "--output",
+        action="append",
+        default=[],
+        help="stream every result to this file as it arrives, CSV for a .csv path and NDJSON otherwise, repeatable",
+    )
+    parser.add_argument(
+        "--mismatch-output",
+        help="stream only mismatches to this NDJSON file",
+    )
+    parser.add_argument(
+        "--snapshot",
+        dest="snapshot_path",
+        help="save the results to this binary snapshot file, compare two with 'joby_challenge diff OLD NEW'",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        dest="metrics_path",
+        help="keep live scan metrics in this file, JSON for a .json path and Prometheus text otherwise",
+    )
+    parser.add_argument(
+        "--metrics-interval",
+        type=float,
+        help="seconds between metrics file updates and progress lines",
+    )
+    parser.add_argument(
+        "--progress",
+        action="store_true",
+        help="log a one line progress summary every --metrics-interval seconds",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        dest="checkpoint_path",
+        help="journal completed results to this file as the scan goes, so an interrupted scan can be resumed",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="restore the results in --checkpoint and only probe the targets it has no result for",
+    )
+    parser.add_argument(
+        "--report",
+        choices=REPORTS,
+        help="mismatches lists every host that differs, signatures groups hosts by where they are reachable",
+    )
+    add_logging_args(parser)
+
+    args = parser.parse_args()
+
+    if not is_backend(args.backend):
+        parser.error(f"unknown --backend {args.backend}, expected one of {', '.join(backend_names())}")
+
+    args.exclusions = None
+    if args.exclude or args.exclude_file:
+        from joby_challenge.models.exclusions import Exclusions, read_entries
+
+        try:
+            entries = list(args.exclude)
+            for path in args.exclude_file:
+                entries += read_entries(path)
+            args.exclusions = Exclusions(entries) if entries else None
+        except (OSError, ValueError) as e:
+            parser.error(f"bad exclusion: {e}")
 
-    return parser.parse_args()
+    args.target_offsets = None
+    if args.iid_offsets or args.hitlist:
+        from joby_challenge.models.exclusions import read_entries
+        from joby_challenge.models.target_sources import parse_offset, hitlist_offsets
 
-async def main():
-    """ grabs user arguments and starts tool"""
-    args = parse_args()
-    networks = [args.network_1, args.network_2]
+        try:
+            offsets = {parse_offset(offset) for offset in args.iid_offsets}
+            for path in args.hitlist:
+                offsets |= hitlist_offsets(read_entries(path), args.networks or [args.network_1, args.network_2])
+        except (OSError, ValueError) as e:
+            parser.error(f"bad target offset: {e}")
+
+        if args.monitor or args.snapshot_path:
+            parser.error("--iid-offsets and --hitlist can't be combined with --monitor or --snapshot")
+        args.target_offsets = sorted(offsets)
+
+    if args.processes != 1 and not args.targets_file and (args.metrics_path or args.progress):
+        parser.error("--metrics-file and --progress are only reported for --processes 1")
+
+    if args.targets_file and (args.target_offsets is not None or args.monitor):
+        parser.error("--targets-file can't be combined with --iid-offsets, --hitlist or --monitor")
+    if args.targets_file:
+        from joby_challenge.models.target_sources import too_large_to_stream
+
+        oversized = too_large_to_stream(args.networks or [args.network_1, args.network_2])
+        if oversized:
+            parser.error(
+                f"--targets-file only tracks networks of up to 2**32 addresses, not {', '.join(map(str, oversized))}; "
+                "use --iid-offsets or --hitlist"
+            )
+
+    if args.resume and not args.checkpoint_path:
+        parser.error("--resume needs the --checkpoint journal to resume from")
+    if args.checkpoint_path and args.monitor:
+        parser.error("--checkpoint can't be combined with --monitor")
+    if args.monitor and args.processes != 1:
+        parser.error("--monitor runs in a single process, --processes can't be combined with it")
+    if args.monitor and (args.cache_path or args.cache_ttl is not None or args.cache_changed_ttl is not None):
+        parser.error("--cache, --cache-ttl and --cache-changed-ttl can't be combined with --monitor")
+
+    if args.timeout_bounds and not 0 < args.timeout_bounds[0] <= args.timeout_bounds[1]:
+        parser.error("--timeout-bounds expects 0 < MIN <= MAX")
+
+    # only what was given, so every backend keeps its own defaults for the rest
+    args.backend_options = {}
+    if args.probe_timeout:
+        args.backend_options["timeout"] = args.probe_timeout
+    if args.backend != BACKEND_ICMP:
+        if args.ports:
+            args.backend_options["ports"] = args.ports
+        if args.max_connections:
+            args.backend_options["max_connections"] = args.max_connections
+    elif args.ports or args.max_connections:
+        parser.error("--ports and --max-connections only apply to the tcp and udp backends")
+
+    return args
+
+async def main(args):
+    """ starts tool with the parsed user arguments"""
+    from joby_challenge.models.result_sink import MismatchSink, open_sink
+
+    networks = args.networks or [args.network_1, args.network_2]
 
     if args.skips:
         args.skips = set(args.skips)
 
-    scanner = Orchestrator(networks, args.skips)
+    options = dict(
+        max_concurrent=args.max_concurrent,
+        shared_socket=args.shared_socket,
+        lazy=args.lazy,
+        interleave=args.interleave,
+        report=args.report,
+        queue_size=args.queue_size,
+        adaptive_concurrency=args.adaptive_concurrency,
+        concurrency_bounds=args.concurrency_bounds,
+        rate_limit=args.rate_limit,
+        subnet_rate_limit=args.subnet_rate_limit,
+        sinks=[open_sink(path) for path in args.output],
+        snapshot_path=args.snapshot_path,
+        metrics_path=args.metrics_path,
+        metrics_interval=args.metrics_interval,
+        progress=args.progress,
+        exclusions=args.exclusions,
+        backend=args.backend,
+        backend_options=args.backend_options,
+        adaptive_timeouts=args.adaptive_timeouts,
+        timeout_bounds=args.timeout_bounds,
+    )
+
+    if args.mismatch_output:
+        options["sinks"].append(MismatchSink(args.mismatch_output))
+
+    if args.monitor:
+        from joby_challenge.models.monitor import Monitor
+
+        options.update(interval=args.interval, cycles=args.cycles)
+        scanner_class = Monitor
+    else:
+        from joby_challenge.models.orchestrator import Orchestrator
+
+        options.update(
+            processes=args.processes,
+            cache_path=args.cache_path,
+            cache_ttl=args.cache_ttl,
+            cache_changed_ttl=args.cache_changed_ttl,
+            target_offsets=args.target_offsets,
+            targets_file=args.targets_file,
+            checkpoint_path=args.checkpoint_path,
+            resume=args.resume,
+        )
+        scanner_class = Orchestrator
+
+    # options left unset keep the scanner's own defaults
+    options = {name: value for name, value in options.items() if value is not None}
+    scanner = scanner_class(networks, args.skips, **options)
+
     await scanner.start()
 
+def parse_diff_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="joby_challenge diff",
+        description="compare two scan snapshots and list the hosts whose reachability changed",
+    )
+    parser.add_argument("old", help="earlier snapshot file")
+    parser.add_argument("new", help="later snapshot file")
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=DEFAULT_DIFF_LIMIT,
+        help="changed addresses listed per network and direction, 0 for counts only",
+    )
+    add_logging_args(parser)
+
+    return parser.parse_args(argv)
+
+def diff(args):
+    """ compares two snapshots saved with --snapshot"""
+    from joby_challenge.models.bitmap import iter_bits
+    from joby_challenge.models.snapshot import Snapshot, diff_snapshots, offset_address
+
+    with Snapshot(args.old) as old, Snapshot(args.new) as new:
+        for network_diff in diff_snapshots(old, new):
+            logger.info(
+                f"{network_diff.network}: {network_diff.probed} hosts in both, "
+                f"{network_diff.came_up_count} came up, {network_diff.went_down_count} went down"
+            )
+
+            for label, offsets in (("UP", network_diff.came_up), ("DOWN", network_diff.went_down)):
+                for offset in itertools.islice(iter_bits(offsets), args.limit):
+                    logger.info(f"{label} {offset_address(network_diff.network, offset)}")
+
 def run():
     """asyncio Entry point"""
-    asyncio.run(main())
+    if sys.argv[1:2] == ["diff"]:
+        args = parse_diff_args(sys.argv[2:])
+    else:
+        args = parse_args()
+
+    listener = configure_logging(args.log_level, args.log_burst)
+    try:
+        if sys.argv[1:2] == ["diff"]:
+            diff(args)
+        else:
+            import asyncio
+
+            asyncio.run(main(args))
+    finally:
+        listener.stop()
 
 if __name__ == "__main__":
     run()
\ No newline at end of file
@@ -1,43 +1,223 @@
 import asyncio
+import heapq
+import inspect
+import itertools
 import logging
+import time
+from joby_challenge.utils import DEFAULT_DELAY_SECONDS
 
 logger = logging.getLogger("AsyncWorkerPool")
 
 # Default value
 DEFAULT_MAX_CONCURRENT_WORKERS = 50
+# bounded queue size used for streaming targets, a few items per worker
+DEFAULT_QUEUE_SIZE = DEFAULT_MAX_CONCURRENT_WORKERS * 4
 
 class AsyncWorkerPool:
     """
     Manages asynchronous workers and task queue without any data collection.
+
+    With a queue_size the queue is bounded: workers start before anything is
+    queued and the producer waits for free slots, so neither time to first
+    probe nor memory depends on how many items there are.
+
+    With a concurrency_limiter (e.g. AIMDLimiter) every call to target_function
+    holds one of its slots, so the in-flight count follows the limiter rather
+    than the fixed worker count. With a rate_limiter every call first waits
+    for its packets-per-second budget.
+
+    With retry_attempts the pool retries failed items itself, with the same
+    attempts and linear backoff as utils.async_retry: a failed item waits on a
+    timer heap and is re-queued once its backoff has elapsed, so the worker
+    moves straight on to the next item instead of sleeping.
+
+    With metrics (a metrics.Metrics, usually metrics.registry) the pool counts
+    calls, retries and final results, tracks the in-flight count and records
+    every call's latency.
+
+    result_callback may be a coroutine function; the worker awaits it before
+    taking the next item, which lets a slow consumer hold the pool back.
     """
-    def __init__(self, target_function, result_callback, max_concurrent=DEFAULT_MAX_CONCURRENT_WORKERS):
+    def __init__(
+        self,
+        target_function,
+        result_callback,
+        max_concurrent=DEFAULT_MAX_CONCURRENT_WORKERS,
+        queue_size=None,
+        concurrency_limiter=None,
+        rate_limiter=None,
+        retry_attempts=None,
+        retry_delay=DEFAULT_DELAY_SECONDS,
+        metrics=None,
+    ):
         self.target_function = target_function
         self.result_callback = result_callback 
-        self.queue = asyncio.Queue()
+        self.queue = asyncio.Queue(maxsize=queue_size or 0)
         self.workers = []
         self.concurrent_workers = max_concurrent
+        self.concurrency_limiter = concurrency_limiter
+        self.rate_limiter = rate_limiter
+
+        self.retry_attempts = retry_attempts
+        self.retry_delay = retry_delay
+        # attempts made so far, only for items that have failed at least once
+        self.attempts = {}
+        # (deadline, tiebreak, item) of failed items waiting out their backoff
+        self.retry_heap = []
+        self.retry_counter = itertools.count()
+        self.retry_wakeup = asyncio.Event()
+        self.retry_sleep = None
+        self.retries = 0
+        self.metrics = metrics
 
     async def worker(self):
         """Process tasks from the queue without storing results."""
         while True:
             argument = await self.queue.get()
+            retrying = False
             try:
-                result = await self.target_function(argument)
-                # Pass result to callback instead of storing locally
-                self.result_callback(argument, result)
+                result = await self.call_target(argument)
+                retrying = not result and self.schedule_retry(argument)
+
+                if not retrying:
+                    if self.metrics:
+                        self.metrics.results += 1
+                        self.metrics.reachable += bool(result)
+
+                    # Pass result to callback instead of storing locally
+                    await self.report(argument, result)
             except Exception as e:
-                self.result_callback(argument, False)
-                logger.debug(f"Task failed for {argument}: {str(e)}")
+                retrying = self.schedule_retry(argument)
+
+                if not retrying:
+                    if self.metrics:
+                        self.metrics.results += 1
+
+                    await self.report(argument, False)
+                logger.debug("Task failed for %s: %s", argument, e)
+            finally:
+                # a retrying item stays unfinished until the retry scheduler re-queues it,
+                # so queue.join() can't return while retries are pending
+                if not retrying:
+                    self.attempts.pop(argument, None)
+                    self.queue.task_done()
+
+    async def report(self, argument, result):
+        outcome = self.result_callback(argument, result)
+        if inspect.isawaitable(outcome):
+            await outcome
+
+    def schedule_retry(self, argument):
+        """
+        Put a failed item on the timer heap if it has attempts left.
+
+        Returns:
+            bool: True if the item will be retried, False if its result is final
+        """
+        if not self.retry_attempts:
+            return False
+
+        attempt = self.attempts.get(argument, 1)
+        logger.debug("Attempt %d failed for %s", attempt, argument)
+
+        if attempt >= self.retry_attempts:
+            return False
+
+        self.attempts[argument] = attempt + 1
+        deadline = asyncio.get_running_loop().time() + self.retry_delay * attempt
+
+        if self.retry_sleep and self.retry_heap and deadline < self.retry_heap[0][0]:
+            self.retry_sleep.cancel()
+
+        heapq.heappush(self.retry_heap, (deadline, next(self.retry_counter), argument))
+        self.retry_wakeup.set()
+        self.retries += 1
+
+        if self.metrics:
+            self.metrics.retries += 1
+
+        return True
+
+    async def retry_scheduler(self):
+        """Move failed items back onto the queue as their backoff deadlines pass."""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            if not self.retry_heap:
+                self.retry_wakeup.clear()
+                await self.retry_wakeup.wait()
+                continue
+
+            deadline = self.retry_heap[0][0]
+            # schedule_retry cancels this sleep when an item with an earlier deadline arrives
+            self.retry_sleep = asyncio.ensure_future(asyncio.sleep(max(0.0, deadline - loop.time())))
+
+            try:
+                await asyncio.wait([self.retry_sleep])
             finally:
+                self.retry_sleep.cancel()
+
+            if self.retry_sleep.cancelled():
+                continue
+
+            while self.retry_heap and self.retry_heap[0][0] <= deadline:
+                _, _, argument = heapq.heappop(self.retry_heap)
+                await self.queue.put(argument)
+                # the re-queued copy now keeps the queue unfinished in place of the failed one
                 self.queue.task_done()
 
+    async def call_target(self, argument):
+        """Run target_function, holding a concurrency limiter slot if there is one."""
+        # rate limiting happens before taking a slot, waiting here isn't probe latency
+        if self.rate_limiter:
+            await self.rate_limiter.acquire(argument)
+
+        if not self.concurrency_limiter:
+            return await self.call_measured(argument)
+
+        await self.concurrency_limiter.acquire()
+        started = time.perf_counter()
+        success = False
+
+        try:
+            result = await self.call_measured(argument)
+            success = bool(result)
+            return result
+        finally:
+            self.concurrency_limiter.release(success, time.perf_counter() - started)
+
+    async def call_measured(self, argument):
+        """Run target_function, counted in the metrics if there are any."""
+        if not self.metrics:
+            return await self.target_function(argument)
+
+        metrics = self.metrics
+        metrics.calls += 1
+        metrics.in_flight += 1
+        started = time.perf_counter()
+
+        try:
+            return await self.target_function(argument)
+        finally:
+            metrics.in_flight -= 1
+            metrics.latency.observe(time.perf_counter() - started)
+
     async def populate_queue(self, items):
-        """Add items to the queue."""
+        """Add items to the queue, from an iterable or an async iterable."""
+        if hasattr(items, "__aiter__"):
+            async for item in items:
+                await self.queue.put(item)
+            return
+
         for item in items:
             await self.queue.put(item)
 
     async def start(self, items=None):
         """Start processing items from the queue."""
+        if self.queue.maxsize:
+            await self.start_streaming(items)
+            return
+
         # Add items to the queue if provided
         if items:
             await self.populate_queue(items)
@@ -50,12 +230,38 @@ class AsyncWorkerPool:
             worker = asyncio.create_task(self.worker())
             self.workers.append(worker)
 
-        # Wait for queue to be processed
-        await self.queue.join()
+        self.start_retry_scheduler()
+
+        try:
+            # Wait for queue to be processed
+            await self.queue.join()
+        finally:
+            await self.stop_workers()
+
+    async def start_streaming(self, items=None):
+        """Run workers alongside a producer that blocks whenever the bounded queue is full."""
+        for _ in range(self.concurrent_workers):
+            self.workers.append(asyncio.create_task(self.worker()))
+
+        self.start_retry_scheduler()
+
+        try:
+            if items:
+                await self.populate_queue(items)
+
+            await self.queue.join()
+        finally:
+            await self.stop_workers()
+
+    def start_retry_scheduler(self):
+        if self.retry_attempts and self.workers:
+            self.workers.append(asyncio.create_task(self.retry_scheduler()))
 
+    async def stop_workers(self):
         # Cancel workers
         for worker in self.workers:
             worker.cancel()
 
         # Wait for workers to be cancelled
-        await asyncio.gather(*self.workers, return_exceptions=True)
\ No newline at end of file
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
\ No newline at end of file
@@ -0,0 +1,72 @@
+import importlib
+import logging
+
+logger = logging.getLogger("BackendRegistry")
+
+BACKEND_ICMP = "icmp"
+BACKEND_TCP = "tcp"
+BACKEND_UDP = "udp"
+
+# built in backends as "module:class", imported only once one is asked for,
+# so a tcp scan never loads aioping and --help loads no backend at all
+BACKENDS = {
+    BACKEND_ICMP: "joby_challenge.models.icmp_backend:ICMPBackend",
+    BACKEND_TCP: "joby_challenge.models.probe_backends:TCPConnectBackend",
+    BACKEND_UDP: "joby_challenge.models.probe_backends:UDPBackend",
+}
+# entry point group other packages register ProbeBackend classes under
+ENTRY_POINT_GROUP = "joby_challenge.backends"
+
+
+def plugin_backends():
+    """{name: entry point} of the backends installed packages register, read only when asked."""
+    try:
+        from importlib import metadata
+    except ImportError:
+        return {}
+
+    entry_points = metadata.entry_points()
+    if hasattr(entry_points, "select"):
+        entry_points = entry_points.select(group=ENTRY_POINT_GROUP)
+    else:
+        entry_points = entry_points.get(ENTRY_POINT_GROUP, [])
+
+    return {entry_point.name: entry_point for entry_point in entry_points}
+
+
+def backend_names():
+    return sorted(set(BACKENDS) | set(plugin_backends()))
+
+
+def is_backend(name):
+    """True for a built in or installed backend, installed packages are only looked up for other names."""
+    return name in BACKENDS or name in plugin_backends()
+
+
+def load_backend(name):
+    """
+    Import the backend class registered under name.
+
+    Raises:
+        ValueError: for an unknown name
+    """
+    if name in BACKENDS:
+        module, _, attribute = BACKENDS[name].partition(":")
+        return getattr(importlib.import_module(module), attribute)
+
+    entry_point = plugin_backends().get(name)
+    if entry_point is None:
+        raise ValueError(f"Unknown probe backend {name}, expected one of {backend_names()}")
+
+    logger.debug("Loading probe backend %s from %s", name, entry_point.value)
+    return entry_point.load()
+
+
+def create_backend(name, **options):
+    """
+    Build the backend registered under name.
+
+    Raises:
+        ValueError: for an unknown name
+    """
+    return load_backend(name)(**options)
@@ -0,0 +1,79 @@
+# int.bit_count (3.10+) counts without building a string as long as the bitmap
+if hasattr(int, "bit_count"):
+    def popcount(value):
+        """Number of set bits in a non-negative integer."""
+        return value.bit_count()
+else:
+    def popcount(value):
+        """Number of set bits in a non-negative integer."""
+        return bin(value).count("1")
+
+
+def iter_bits(value):
+    """Yield the indices of the set bits of a non-negative integer, lowest first."""
+    data = value.to_bytes((value.bit_length() + 7) // 8, "little")
+
+    for byte_index, byte in enumerate(data):
+        if not byte:
+            continue
+
+        base = byte_index << 3
+        for bit in range(8):
+            if byte >> bit & 1:
+                yield base + bit
+
+
+class Bitmap:
+    """
+    Growable bit array backed by a bytearray.
+
+    Setting a bit is O(1). Whole-bitmap operations go through to_int()/from_int(),
+    where Python's big integers do the AND/OR/XOR work a machine word at a time.
+    """
+    def __init__(self, size=0, data=None):
+        self.data = bytearray(data) if data is not None else bytearray((size + 7) // 8)
+
+    def set(self, index):
+        byte = index >> 3
+
+        if byte >= len(self.data):
+            self.data.extend(bytes(byte - len(self.data) + 1))
+
+        self.data[byte] |= 1 << (index & 7)
+
+    def clear(self, index):
+        byte = index >> 3
+
+        if byte < len(self.data):
+            self.data[byte] &= ~(1 << (index & 7)) & 0xFF
+
+    def __contains__(self, index):
+        byte = index >> 3
+        return byte < len(self.data) and bool(self.data[byte] >> (index & 7) & 1)
+
+    def __len__(self):
+        """Capacity in bits."""
+        return len(self.data) << 3
+
+    def __eq__(self, other):
+        return isinstance(other, Bitmap) and self.to_int() == other.to_int()
+
+    def count(self):
+        return popcount(self.to_int())
+
+    def __iter__(self):
+        return iter_bits(self.to_int())
+
+    def to_int(self):
+        return int.from_bytes(self.data, "little")
+
+    def to_bytes(self):
+        return bytes(self.data)
+
+    @classmethod
+    def from_int(cls, value):
+        return cls(data=value.to_bytes((value.bit_length() + 7) // 8, "little"))
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls(data=data)
@@ -0,0 +1,243 @@
+import logging
+import os
+import struct
+import time
+import zlib
+
+logger = logging.getLogger("CheckpointJournal")
+
+JOURNAL_MAGIC = b"JOBYCKPT"
+JOURNAL_VERSION = 1
+# magic, format version, CRC32 of the scanned networks and target offsets
+PREAMBLE = struct.Struct("!8sHI")
+# compressed length of the record that follows
+RECORD_HEADER = struct.Struct("!I")
+# per network in a record: network index, then how many reachable and unreachable runs follow
+SECTION = struct.Struct("!III")
+# first offset and length of a run of consecutive offsets
+RUN = struct.Struct("!QI")
+
+# results buffered before a record is appended, at most this many are lost to a kill
+DEFAULT_CHECKPOINT_BATCH = 10000
+# ...or this many seconds worth, whichever comes first, so slow scans are journaled too
+DEFAULT_CHECKPOINT_INTERVAL_SECONDS = 5.0
+
+
+def scan_fingerprint(store):
+    """CRC32 of what a store is laid out by, so a journal is never replayed into another scan."""
+    description = ",".join(str(network) for network in store.networks)
+    if store.offsets is not None:
+        description += ";" + ",".join(map(str, store.offsets))
+
+    return zlib.crc32(description.encode())
+
+
+def to_runs(offsets):
+    """(first, length) runs of consecutive values in a sorted list."""
+    runs = []
+
+    for offset in offsets:
+        if runs and runs[-1][0] + runs[-1][1] == offset:
+            runs[-1][1] += 1
+        else:
+            runs.append([offset, 1])
+
+    return runs
+
+
+def encode_record(pending):
+    """Pack {network index: (reachable offsets, unreachable offsets)} into one compressed record."""
+    chunks = []
+
+    for index, (reachable, failed) in sorted(pending.items()):
+        reachable_runs = to_runs(sorted(reachable))
+        failed_runs = to_runs(sorted(failed))
+
+        chunks.append(SECTION.pack(index, len(reachable_runs), len(failed_runs)))
+        chunks += [RUN.pack(first, length) for first, length in reachable_runs]
+        chunks += [RUN.pack(first, length) for first, length in failed_runs]
+
+    payload = zlib.compress(b"".join(chunks))
+    return RECORD_HEADER.pack(len(payload)) + payload
+
+
+def decode_record(payload):
+    """Yield (network index, offset, reachable) for every result in a record's payload."""
+    data = zlib.decompress(payload)
+    position = 0
+
+    while position < len(data):
+        index, reachable_count, failed_count = SECTION.unpack_from(data, position)
+        position += SECTION.size
+
+        for run in range(reachable_count + failed_count):
+            first, length = RUN.unpack_from(data, position)
+            position += RUN.size
+            reachable = run < reachable_count
+
+            for offset in range(first, first + length):
+                yield index, offset, reachable
+
+
+class CheckpointJournal:
+    """
+    Append-only journal of completed results, so an interrupted scan can resume.
+
+    Results are buffered per network and appended every batch results (or
+    interval seconds) as one record: the completed offsets as zlib compressed
+    runs of consecutive offsets, split into reachable and unreachable. A
+    sequential sweep completes offsets mostly in order, so a record of ten
+    thousand results is a few dozen bytes.
+
+    Offsets are the store's (positions for sparse stores), and the preamble
+    holds a fingerprint of the store's networks and offsets: resuming a
+    different scan from the journal is refused. A record cut short by a kill
+    is dropped on resume and the journal truncated back to the last whole one.
+
+    Every record is a single write to a file opened for appending, so shard
+    processes can journal into the same file.
+    """
+    def __init__(self, path, store, batch=DEFAULT_CHECKPOINT_BATCH, interval=DEFAULT_CHECKPOINT_INTERVAL_SECONDS):
+        self.path = path
+        self.store = store
+        self.fingerprint = scan_fingerprint(store)
+        self.batch = batch
+        self.interval = interval
+        self.file = None
+        # prepare() has run, shard processes get a journal their parent prepared
+        self.prepared = False
+        # network index -> (reachable offsets, unreachable offsets) not written yet
+        self.pending = {}
+        self.pending_count = 0
+        self.flush_at = 0.0
+        self.restored = 0
+        self.skipped = 0
+
+    def create(self):
+        """Start a new journal, replacing any journal at path."""
+        with open(self.path, "wb") as file:
+            file.write(PREAMBLE.pack(JOURNAL_MAGIC, JOURNAL_VERSION, self.fingerprint))
+
+    def prepare(self, resume=False, on_result=None):
+        """
+        Create a new journal, or with resume replay the existing one into
+        on_result(index, offset, reachable) and cut off a torn last record.
+        Resuming without a journal starts one.
+
+        Raises:
+            ValueError: if the journal isn't one, or was written for a different scan
+        """
+        self.prepared = True
+
+        if not resume or not os.path.exists(self.path):
+            if resume:
+                logger.warning("No checkpoint journal at %s, starting from scratch", self.path)
+            self.create()
+            return
+
+        end = self.replay(on_result)
+        # anything appended after a torn record would never be read back
+        os.truncate(self.path, end)
+        logger.info("Resuming from %s, %d results already complete", self.path, self.restored)
+
+    def open(self):
+        """Start appending records, after prepare() in this or the parent process."""
+        self.file = open(self.path, "ab", buffering=0)
+        self.flush_at = time.monotonic() + self.interval
+
+    def replay(self, on_result):
+        """
+        Hand every journaled result to on_result(index, offset, reachable).
+
+        Returns:
+            int: file position after the last whole record
+        """
+        with open(self.path, "rb") as file:
+            data = file.read()
+
+        if len(data) < PREAMBLE.size:
+            raise ValueError(f"{self.path} is not a checkpoint journal")
+
+        magic, version, fingerprint = PREAMBLE.unpack_from(data)
+        if magic != JOURNAL_MAGIC or version != JOURNAL_VERSION:
+            raise ValueError(f"{self.path} is not a version {JOURNAL_VERSION} checkpoint journal")
+        if fingerprint != self.fingerprint:
+            raise ValueError(f"{self.path} was written for different networks or target offsets")
+
+        position = PREAMBLE.size
+
+        while position + RECORD_HEADER.size <= len(data):
+            (length,) = RECORD_HEADER.unpack_from(data, position)
+            start = position + RECORD_HEADER.size
+            if start + length > len(data):
+                break
+
+            try:
+                results = list(decode_record(data[start:start + length]))
+            except (zlib.error, struct.error):
+                break
+
+            for index, offset, reachable in results:
+                if on_result:
+                    on_result(index, offset, reachable)
+            self.restored += len(results)
+            position = start + length
+
+        if position < len(data):
+            logger.warning("Dropping %d bytes of an incomplete record at the end of %s", len(data) - position, self.path)
+
+        return position
+
+    def record(self, location, reachable):
+        """Buffer a completed result at a store location (network index, offset)."""
+        index, offset = location
+        pending = self.pending.get(index)
+        if pending is None:
+            pending = self.pending[index] = ([], [])
+
+        pending[0 if reachable else 1].append(offset)
+        self.pending_count += 1
+
+        if self.pending_count >= self.batch or time.monotonic() >= self.flush_at:
+            self.flush()
+
+    def flush(self):
+        self.flush_at = time.monotonic() + self.interval
+        if not self.pending_count:
+            return
+
+        self.file.write(encode_record(self.pending))
+        self.pending = {}
+        self.pending_count = 0
+
+    def completed(self, ip_address):
+        location = self.store.locate(ip_address)
+        return location is not None and location[1] in self.store.probed[location[0]]
+
+    def filter(self, addresses):
+        """Yield only the addresses without a result yet."""
+        for address in addresses:
+            if self.completed(address):
+                self.skipped += 1
+            else:
+                yield address
+
+    async def afilter(self, addresses):
+        """filter() for an async iterable of addresses."""
+        async for address in addresses:
+            if self.completed(address):
+                self.skipped += 1
+            else:
+                yield address
+
+    def close(self):
+        if self.file is None:
+            return
+
+        self.flush()
+        self.file.close()
+        self.file = None
+
+    def log_stats(self):
+        if self.restored or self.skipped:
+            logger.info("Checkpoint %s: %d results restored, %d targets skipped", self.path, self.restored, self.skipped)
@@ -0,0 +1,163 @@
+import asyncio
+import collections
+import logging
+import time
+
+logger = logging.getLogger("AIMDLimiter")
+
+DEFAULT_INITIAL_LIMIT = 50
+DEFAULT_MIN_LIMIT = 1
+DEFAULT_MAX_LIMIT = 1000
+# added to the limit after a healthy window
+DEFAULT_INCREASE = 1
+# limit is multiplied by this after a congested window
+DEFAULT_DECREASE_FACTOR = 0.5
+# completions per adjustment never drop below this, even at tiny limits
+DEFAULT_MIN_WINDOW = 10
+# failure ratio rising this far above its running baseline counts as congestion
+DEFAULT_FAILURE_MARGIN = 0.1
+# mean latency this many times the best window seen counts as congestion...
+DEFAULT_LATENCY_TOLERANCE = 2.0
+# ...as long as it is also at least this many seconds slower, so LAN jitter doesn't count
+DEFAULT_LATENCY_SLACK_SECONDS = 0.01
+# weight of each new window in the failure ratio baseline
+BASELINE_WEIGHT = 0.1
+# limit changes kept in history, a monitor runs for good and the sawtooth changes it most windows
+DEFAULT_HISTORY_LENGTH = 1000
+
+
+class AIMDLimiter:
+    """
+    Additive-increase/multiplicative-decrease limit on in-flight calls.
+
+    Completions are grouped into windows of roughly one limit's worth. A window
+    whose failure ratio jumps above the running baseline, or whose latency inflates
+    well past the best window seen, cuts the limit; any other window grows it by one.
+    A steady share of dead hosts is absorbed into the baseline instead of
+    throttling the scan for good.
+    """
+    def __init__(
+        self,
+        initial_limit=DEFAULT_INITIAL_LIMIT,
+        min_limit=DEFAULT_MIN_LIMIT,
+        max_limit=DEFAULT_MAX_LIMIT,
+        increase=DEFAULT_INCREASE,
+        decrease_factor=DEFAULT_DECREASE_FACTOR,
+    ):
+        if not 0 < min_limit <= max_limit:
+            raise ValueError(f"Expected 0 < min_limit <= max_limit, got {min_limit} and {max_limit}")
+
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+
+        self.in_flight = 0
+        self.waiters = collections.deque()
+
+        self.window_completions = 0
+        self.window_failures = 0
+        self.window_latency = 0.0
+        self.window_successes = 0
+        self.failure_baseline = None
+        self.best_latency = None
+
+        self.started = time.perf_counter()
+        # (seconds since creation, limit) for the latest limit changes
+        self.history = collections.deque([(0.0, int(self.limit))], maxlen=DEFAULT_HISTORY_LENGTH)
+        # over the limiter's whole life, for the summary
+        self.changes = 0
+        self.lowest = self.highest = int(self.limit)
+
+    async def acquire(self):
+        """Wait until fewer than limit calls are in flight, then take a slot."""
+        while self.in_flight >= int(self.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            self.waiters.append(waiter)
+
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self.waiters:
+                    self.waiters.remove(waiter)
+                raise
+
+        self.in_flight += 1
+
+    def release(self, success, latency):
+        """Give a slot back and record how the call went."""
+        self.in_flight -= 1
+        self.record(success, latency)
+        self.wake()
+
+    def wake(self):
+        free = int(self.limit) - self.in_flight
+
+        while free > 0 and self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def record(self, success, latency):
+        self.window_completions += 1
+
+        if success:
+            self.window_successes += 1
+            self.window_latency += latency
+        else:
+            self.window_failures += 1
+
+        if self.window_completions >= max(int(self.limit), DEFAULT_MIN_WINDOW):
+            self.adjust()
+
+    def adjust(self):
+        """Close the current window and move the limit."""
+        failure_ratio = self.window_failures / self.window_completions
+        latency = self.window_latency / self.window_successes if self.window_successes else None
+
+        congested = False
+
+        if self.failure_baseline is not None and failure_ratio > self.failure_baseline + DEFAULT_FAILURE_MARGIN:
+            congested = True
+
+        if latency is not None and self.best_latency is not None:
+            if (
+                latency > self.best_latency * DEFAULT_LATENCY_TOLERANCE
+                and latency - self.best_latency > DEFAULT_LATENCY_SLACK_SECONDS
+            ):
+                congested = True
+
+        if congested:
+            limit = max(self.min_limit, self.limit * self.decrease_factor)
+        else:
+            limit = min(self.max_limit, self.limit + self.increase)
+
+        # the failure baseline slowly absorbs a persistent failure ratio (a dead range),
+        # while the latency baseline only learns from healthy windows
+        if self.failure_baseline is None:
+            self.failure_baseline = failure_ratio
+        else:
+            self.failure_baseline += (failure_ratio - self.failure_baseline) * BASELINE_WEIGHT
+
+        if not congested and latency is not None and (self.best_latency is None or latency < self.best_latency):
+            self.best_latency = latency
+
+        if int(limit) != int(self.limit):
+            self.history.append((time.perf_counter() - self.started, int(limit)))
+            self.changes += 1
+            self.lowest = min(self.lowest, int(limit))
+            self.highest = max(self.highest, int(limit))
+            logger.debug(
+                f"concurrency limit {int(self.limit)} -> {int(limit)} "
+                f"(failures {failure_ratio:.0%}, latency {latency})"
+            )
+
+        self.limit = limit
+        self.window_completions = 0
+        self.window_failures = 0
+        self.window_successes = 0
+        self.window_latency = 0.0
+
+        self.wake()
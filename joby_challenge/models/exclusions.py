@@ -0,0 +1,220 @@
+import bisect
+import ipaddress
+import logging
+
+logger = logging.getLogger("Exclusions")
+
+# mask for the last octet of an integer IPv4 address
+LAST_OCTET_MASK = 0xFF
+# separates the two ends of an address range, e.g. 10.0.0.5-10.0.0.20
+RANGE_SEPARATOR = "-"
+COMMENT_PREFIX = "#"
+
+
+class IntervalSet:
+    """
+    Sorted, merged, inclusive integer intervals.
+
+    Overlapping and adjacent intervals are merged as they are added, so
+    membership is one bisect over the interval starts.
+    """
+    def __init__(self, intervals=()):
+        self.starts = []
+        self.ends = []
+        if intervals:
+            self.update(intervals)
+
+    def update(self, intervals):
+        merged = []
+
+        for first, last in sorted(list(zip(self.starts, self.ends)) + list(intervals)):
+            if merged and first <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], last)
+            else:
+                merged.append([first, last])
+
+        self.starts = [first for first, _ in merged]
+        self.ends = [last for _, last in merged]
+
+    def __contains__(self, value):
+        index = bisect.bisect_right(self.starts, value) - 1
+        return index >= 0 and value <= self.ends[index]
+
+    def __iter__(self):
+        return zip(self.starts, self.ends)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def size(self):
+        """Number of integers covered."""
+        return sum(last - first + 1 for first, last in self)
+
+    def overlapping(self, first, last):
+        """Intervals intersecting [first, last], clipped to it."""
+        index = max(bisect.bisect_right(self.starts, first) - 1, 0)
+
+        while index < len(self.starts) and self.starts[index] <= last:
+            if self.ends[index] >= first:
+                yield max(self.starts[index], first), min(self.ends[index], last)
+            index += 1
+
+    def subtract(self, first, last):
+        """Pieces of [first, last] not covered by any interval."""
+        start = first
+
+        for excluded_first, excluded_last in self.overlapping(first, last):
+            if excluded_first > start:
+                yield start, excluded_first - 1
+            start = excluded_last + 1
+
+        if start <= last:
+            yield start, last
+
+
+def parse_exclusion(target):
+    """
+    Parse a CIDR, a first-last address range or a single address.
+
+    Unlike scan targets a network is excluded whole, network and broadcast
+    address included.
+
+    Returns:
+        (IP version, first int, last int)
+
+    Raises:
+        ValueError: if target is none of the three
+    """
+    target = target.strip()
+
+    if RANGE_SEPARATOR in target:
+        first, last = (ipaddress.ip_address(end.strip()) for end in target.split(RANGE_SEPARATOR, 1))
+
+        if first.version != last.version or first > last:
+            raise ValueError(f"{target!r} is not an ascending range of one IP version")
+
+        return first.version, int(first), int(last)
+
+    network = ipaddress.ip_network(target, strict=False)
+    return network.version, int(network.network_address), int(network.broadcast_address)
+
+
+def read_entries(path):
+    """Entries of an exclusion file or hitlist, one per line, blank lines and # comments ignored."""
+    entries = []
+
+    with open(path) as file:
+        for line in file:
+            line = line.split(COMMENT_PREFIX, 1)[0].strip()
+            if line:
+                entries.append(line)
+
+    return entries
+
+
+class Exclusions:
+    """
+    Addresses left out of a scan: explicit intervals per IP version, plus
+    IPv4 last octets excluded in every /24 (the --skips option).
+
+    Target ranges are split around the exclusions before they are expanded,
+    so expansion never checks addresses one by one; contains() answers single
+    addresses in O(log n) for the offset based bookkeeping.
+    """
+    def __init__(self, targets=(), last_octets=()):
+        self.intervals = {4: IntervalSet(), 6: IntervalSet()}
+        self.last_octets = []
+        self.octet_set = set()
+
+        if targets:
+            self.update(targets)
+        self.add_last_octets(last_octets)
+
+    def update(self, targets):
+        """Add CIDRs, ranges or addresses, see parse_exclusion."""
+        parsed = {4: [], 6: []}
+        for target in targets:
+            version, first, last = parse_exclusion(target)
+            parsed[version].append((first, last))
+
+        for version, intervals in parsed.items():
+            if intervals:
+                self.intervals[version].update(intervals)
+
+        logger.debug("%d exclusions merged into %d ranges", sum(map(len, parsed.values())), sum(map(len, self.intervals.values())))
+
+    def add_last_octets(self, octets):
+        if not octets:
+            return
+
+        valid = set()
+        ignored = []
+        for octet in octets:
+            if str(octet).isdigit() and int(octet) <= LAST_OCTET_MASK:
+                valid.add(int(octet))
+            else:
+                ignored.append(str(octet))
+
+        if ignored:
+            # anything else would be ORed into the next octet up and skip the wrong hosts
+            logger.warning("Ignoring skips that aren't a last octet (0-255): %s", ", ".join(ignored))
+
+        self.octet_set.update(valid)
+        self.last_octets = sorted(self.octet_set)
+
+    def copy(self):
+        copied = Exclusions()
+        for version, intervals in self.intervals.items():
+            copied.intervals[version].starts = list(intervals.starts)
+            copied.intervals[version].ends = list(intervals.ends)
+        copied.octet_set = set(self.octet_set)
+        copied.last_octets = list(self.last_octets)
+
+        return copied
+
+    def __bool__(self):
+        return bool(self.octet_set or any(self.intervals.values()))
+
+    def contains(self, version, address):
+        if version == 4 and address & LAST_OCTET_MASK in self.octet_set:
+            return True
+
+        return address in self.intervals[version]
+
+    def split(self, version, first, last):
+        """Pieces of [first, last] left after the exclusions, in order."""
+        for start, end in self.intervals[version].subtract(first, last):
+            if version == 4 and self.last_octets:
+                yield from self.split_octets(start, end)
+            else:
+                yield start, end
+
+    def split_octets(self, first, last):
+        start = first
+
+        for block in range(first & ~LAST_OCTET_MASK, last + 1, LAST_OCTET_MASK + 1):
+            for octet in self.last_octets:
+                address = block | octet
+
+                if address < start:
+                    continue
+                if address > last:
+                    break
+                if address > start:
+                    yield start, address - 1
+                start = address + 1
+
+        if start <= last:
+            yield start, last
+
+    def count(self, version, first, last):
+        """Number of addresses in [first, last] excluded, without expanding anything."""
+        excluded = sum(end - start + 1 for start, end in self.intervals[version].overlapping(first, last))
+
+        if version == 4:
+            for start, end in self.intervals[version].subtract(first, last):
+                # addresses in [start, end] congruent to each skipped octet
+                for octet in self.last_octets:
+                    excluded += (end - octet) // 256 - (start - 1 - octet) // 256
+
+        return excluded
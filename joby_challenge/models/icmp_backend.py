@@ -0,0 +1,20 @@
+from joby_challenge.models.icmp_prober import DualStackProber
+from joby_challenge.models.probe_backends import ProbeBackend
+from joby_challenge.utils import probe_host
+
+
+class ICMPBackend(ProbeBackend):
+    """Echo requests through aioping, or through shared raw sockets (DualStackProber) with shared_socket."""
+    def __init__(self, timeout=None, max_connections=None, shared_socket=False):
+        super().__init__(timeout, max_connections)
+        self.prober = DualStackProber(self.timeout) if shared_socket else None
+
+    async def probe(self, host, timeout=None):
+        if self.prober:
+            return await self.prober.probe(host, timeout)
+
+        return await probe_host(host, timeout or self.timeout)
+
+    def close(self):
+        if self.prober:
+            self.prober.close()
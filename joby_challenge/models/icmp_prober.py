@@ -0,0 +1,354 @@
+import asyncio
+import ctypes
+import logging
+import os
+import socket
+import struct
+import time
+from joby_challenge.models.metrics import registry as metrics
+from joby_challenge.utils import async_retry, DEFAULT_PING_TIMEOUT_SECONDS
+
+logger = logging.getLogger("ICMPProber")
+
+# ICMP types, see rfc792
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+# ICMPv6 types, see rfc4443
+ICMPV6_ECHO_REQUEST = 128
+ICMPV6_ECHO_REPLY = 129
+
+DEFAULT_SOCKET_COUNT = 1
+# every reply to every in-flight probe lands on the same socket, give it room
+DEFAULT_RECEIVE_BUFFER_BYTES = 4 * 1024 * 1024
+DEFAULT_PAYLOAD = b"joby_challenge".ljust(56, b"\x00")
+RECV_BUFFER_SIZE = 65535
+SEQUENCE_MODULO = 1 << 16
+
+# type, code, checksum, identifier, sequence
+ICMP_HEADER = struct.Struct("!BBHHH")
+
+# Linux raw socket filter (SOL_RAW / ICMP_FILTER), a bitmask of ICMP types to drop
+SOL_RAW = 255
+ICMP_FILTER = 1
+ECHO_REPLY_ONLY_FILTER = struct.pack("I", ~(1 << ICMP_ECHO_REPLY) & 0xFFFFFFFF)
+# ICMPv6 equivalent (IPPROTO_ICMPV6 / ICMP6_FILTER), 256 bits where a set bit blocks that type
+ICMP6_FILTER = 1
+ECHOV6_REPLY_ONLY_FILTER = (~(1 << ICMPV6_ECHO_REPLY) & ((1 << 256) - 1)).to_bytes(32, "little")
+
+# classic BPF, used so each process' socket only queues replies carrying its own identifier
+SO_ATTACH_FILTER = 26
+BPF_INSTRUCTION = struct.Struct("HBBI")
+BPF_LDX_B_MSH = 0xB1  # X = 4 * (packet[k] & 0x0F), the IP header length
+BPF_LD_H_IND = 0x48  # A = 16 bits at packet[X + k]
+BPF_LD_H_ABS = 0x28  # A = 16 bits at packet[k]
+BPF_JEQ_K = 0x15  # jump jt if A == k else jf
+BPF_RET_K = 0x06  # accept k bytes, 0 drops
+
+
+def icmp_checksum(data):
+    """RFC 1071 internet checksum of a byte string."""
+    if len(data) % 2:
+        data += b"\x00"
+
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+
+    return ~total & 0xFFFF
+
+
+def build_echo_request(identifier, sequence, payload=DEFAULT_PAYLOAD, icmp_type=ICMP_ECHO_REQUEST):
+    """
+    Build an ICMP echo request packet with a valid checksum.
+
+    For ICMPv6 the kernel recomputes the checksum over the IPv6 pseudo header.
+    """
+    header = ICMP_HEADER.pack(icmp_type, 0, 0, identifier, sequence)
+    checksum = icmp_checksum(header + payload)
+
+    return ICMP_HEADER.pack(icmp_type, 0, checksum, identifier, sequence) + payload
+
+
+def parse_echo_reply(packet, reply_type=ICMP_ECHO_REPLY, ip_header=True):
+    """
+    Parse a packet read from a raw ICMP socket.
+
+    Returns:
+        (identifier, sequence) for echo replies, None for anything else
+    """
+    # raw IPv4 sockets hand us the IP header too, its length is in the low nibble,
+    # raw ICMPv6 sockets start at the ICMPv6 header
+    offset = (packet[0] & 0x0F) * 4 if ip_header else 0
+
+    if len(packet) < offset + ICMP_HEADER.size:
+        return None
+
+    icmp_type, _, _, identifier, sequence = ICMP_HEADER.unpack_from(packet, offset)
+
+    if icmp_type != reply_type:
+        return None
+
+    return identifier, sequence
+
+
+class ICMPProber:
+    """
+    ICMP echo engine that shares a few long-lived raw sockets across every probe.
+
+    Each probe gets a unique sequence number, and a single reader registered on the
+    event loop matches replies back to the future waiting on (address, sequence).
+    """
+    FAMILY = socket.AF_INET
+    PROTOCOL = socket.IPPROTO_ICMP
+
+    def __init__(self, timeout=DEFAULT_PING_TIMEOUT_SECONDS, socket_count=DEFAULT_SOCKET_COUNT):
+        self.timeout = timeout
+        self.socket_count = socket_count
+        self.identifier = os.getpid() & 0xFFFF
+        self.sockets = []
+        self.pending = {}
+        # socket fileno -> futures of the senders waiting for room in its buffer
+        self.writers = {}
+        self.sequence = 0
+        self.loop = None
+
+    def open(self):
+        """Open the shared sockets and register their readers on the running loop."""
+        self.loop = asyncio.get_running_loop()
+
+        if self.sockets:
+            return
+
+        for _ in range(self.socket_count):
+            sock = socket.socket(self.FAMILY, socket.SOCK_RAW, self.PROTOCOL)
+            sock.setblocking(False)
+            self.tune(sock)
+            self.loop.add_reader(sock.fileno(), self.read_replies, sock)
+            self.sockets.append(sock)
+
+        logger.debug(f"Opened {self.socket_count} shared ICMP socket(s)")
+
+    def tune(self, sock):
+        """
+        Best effort: bigger receive buffer, and let the kernel drop everything but
+        echo replies to this prober. Raw sockets get a copy of every ICMP packet, so
+        without the identifier filter each extra scanning process adds work to all the others.
+        """
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, DEFAULT_RECEIVE_BUFFER_BYTES)
+            self.filter_replies(sock)
+            self.attach_identifier_filter(sock)
+        except OSError as e:
+            logger.debug(f"Could not tune ICMP socket: {str(e)}")
+
+    def filter_replies(self, sock):
+        sock.setsockopt(SOL_RAW, ICMP_FILTER, ECHO_REPLY_ONLY_FILTER)
+
+    def load_identifier(self):
+        """BPF instructions loading the ICMP identifier into A, skipping the IP header."""
+        return [
+            BPF_INSTRUCTION.pack(BPF_LDX_B_MSH, 0, 0, 0),
+            BPF_INSTRUCTION.pack(BPF_LD_H_IND, 0, 0, 4),
+        ]
+
+    def attach_identifier_filter(self, sock):
+        program = b"".join(self.load_identifier() + [
+            BPF_INSTRUCTION.pack(BPF_JEQ_K, 0, 1, self.identifier),
+            BPF_INSTRUCTION.pack(BPF_RET_K, 0, 0, 0xFFFF),
+            BPF_INSTRUCTION.pack(BPF_RET_K, 0, 0, 0),
+        ])
+        buffer = ctypes.create_string_buffer(program)
+        # struct sock_fprog { unsigned short len; struct sock_filter *filter; }
+        fprog = struct.pack("HP", len(program) // BPF_INSTRUCTION.size, ctypes.addressof(buffer))
+        sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_FILTER, fprog)
+
+    def close(self):
+        """Unregister readers, close sockets and fail anything still waiting."""
+        for sock in self.sockets:
+            self.loop.remove_reader(sock.fileno())
+            sock.close()
+
+        for fileno, waiters in self.writers.items():
+            self.loop.remove_writer(fileno)
+            for future in waiters:
+                future.cancel()
+
+        for future in self.pending.values():
+            if not future.done():
+                future.cancel()
+
+        self.sockets = []
+        self.pending = {}
+        self.writers = {}
+
+    async def __aenter__(self):
+        self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+    def next_sequence(self, host):
+        """Next sequence number not already outstanding for this host."""
+        for _ in range(SEQUENCE_MODULO):
+            self.sequence = (self.sequence + 1) % SEQUENCE_MODULO
+            if (host, self.sequence) not in self.pending:
+                return self.sequence
+
+        raise RuntimeError(f"no free ICMP sequence numbers for {host}")
+
+    def read_replies(self, sock):
+        """Reader callback, drains the socket and resolves matching futures."""
+        while True:
+            try:
+                packet, address = sock.recvfrom(RECV_BUFFER_SIZE)
+            except (BlockingIOError, InterruptedError):
+                return
+
+            self.handle_packet(packet, address[0])
+
+    async def send(self, sock, packet, host, timeout):
+        """
+        sendto that waits, at most timeout seconds, for room in a full socket buffer instead of failing.
+
+        Raises:
+            asyncio.TimeoutError: if the buffer stayed full
+        """
+        deadline = self.loop.time() + timeout
+
+        while True:
+            try:
+                sock.sendto(packet, (host, 0))
+                return
+            except (BlockingIOError, InterruptedError):
+                await asyncio.wait_for(self.writable(sock), deadline - self.loop.time())
+
+    def writable(self, sock):
+        """
+        Future resolved once sock has room again. A loop holds a single writer
+        callback per fd, so one registration per socket wakes every waiting sender.
+        """
+        fileno = sock.fileno()
+        waiters = self.writers.get(fileno)
+        if waiters is None:
+            waiters = self.writers[fileno] = []
+            self.loop.add_writer(fileno, self.wake_writers, fileno)
+
+        future = self.loop.create_future()
+        waiters.append(future)
+        return future
+
+    def wake_writers(self, fileno):
+        self.loop.remove_writer(fileno)
+
+        for future in self.writers.pop(fileno, []):
+            if not future.done():
+                future.set_result(None)
+
+    def handle_packet(self, packet, host):
+        reply = self.parse_reply(packet)
+        if reply is None:
+            return
+
+        identifier, sequence = reply
+        if identifier != self.identifier:
+            # reply to some other process sharing the raw socket stream
+            return
+
+        future = self.pending.get((host, sequence))
+        if future is not None and not future.done():
+            future.set_result(time.perf_counter())
+
+    def parse_reply(self, packet):
+        return parse_echo_reply(packet)
+
+    def build_request(self, sequence):
+        return build_echo_request(self.identifier, sequence)
+
+    async def probe(self, host, timeout=None):
+        """
+        Send a single echo request and wait for its reply.
+
+        Args:
+            host: IP address to probe
+            timeout: Timeout in seconds, defaults to the prober's timeout
+
+        Returns:
+            bool: True if a reply arrived in time, False otherwise
+        """
+        self.open()
+
+        sequence = self.next_sequence(host)
+        key = (host, sequence)
+        future = self.loop.create_future()
+        self.pending[key] = future
+
+        sock = self.sockets[sequence % len(self.sockets)]
+        metrics.probes += 1
+        timeout = timeout or self.timeout
+        started = self.loop.time()
+
+        try:
+            # waiting for buffer space counts against the probe's timeout too
+            await self.send(sock, self.build_request(sequence), host, timeout)
+            await asyncio.wait_for(future, timeout - (self.loop.time() - started))
+            return True
+        except (asyncio.TimeoutError, OSError) as e:
+            if isinstance(e, asyncio.TimeoutError):
+                metrics.timeouts += 1
+            else:
+                metrics.errors += 1
+
+            logger.debug("%s probe %d failed: %s", host, sequence, str(e) or type(e).__name__)
+            return False
+        finally:
+            self.pending.pop(key, None)
+
+    @async_retry()
+    async def ping(self, host):
+        """Retrying probe with the same semantics as utils.ping_host, usable as a pool target_function."""
+        reachable = await self.probe(host)
+
+        if reachable:
+            logger.info("%s is reachable", host)
+
+        return reachable
+
+
+class ICMPv6Prober(ICMPProber):
+    """ICMPProber over a raw ICMPv6 socket, echo request 128 and reply 129, no IP header on reads."""
+    FAMILY = socket.AF_INET6
+    PROTOCOL = socket.IPPROTO_ICMPV6
+
+    def filter_replies(self, sock):
+        sock.setsockopt(socket.IPPROTO_ICMPV6, ICMP6_FILTER, ECHOV6_REPLY_ONLY_FILTER)
+
+    def load_identifier(self):
+        return [BPF_INSTRUCTION.pack(BPF_LD_H_ABS, 0, 0, 4)]
+
+    def parse_reply(self, packet):
+        return parse_echo_reply(packet, ICMPV6_ECHO_REPLY, ip_header=False)
+
+    def build_request(self, sequence):
+        return build_echo_request(self.identifier, sequence, icmp_type=ICMPV6_ECHO_REQUEST)
+
+
+class DualStackProber:
+    """
+    Sends each probe through an ICMPProber or an ICMPv6Prober by address family.
+
+    A family's sockets are only opened once a target of that family comes up,
+    both share the worker pool's concurrency and rate limits like any target_function.
+    """
+    def __init__(self, timeout=DEFAULT_PING_TIMEOUT_SECONDS, socket_count=DEFAULT_SOCKET_COUNT):
+        self.v4 = ICMPProber(timeout, socket_count)
+        self.v6 = ICMPv6Prober(timeout, socket_count)
+
+    async def probe(self, host, timeout=None):
+        prober = self.v6 if ":" in host else self.v4
+        return await prober.probe(host, timeout)
+
+    def close(self):
+        for prober in (self.v4, self.v6):
+            if prober.sockets:
+                prober.close()
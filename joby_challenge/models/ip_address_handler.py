@@ -1,60 +1,180 @@
 import ipaddress
 import logging
+from joby_challenge.models.exclusions import Exclusions
+from joby_challenge.models.target_sources import OffsetTargets, StreamedTargets
+from joby_challenge.utils import int_to_ip
 
 logger = logging.getLogger("IPAddressHandler")
 
+
+def shard_ranges(ranges, count):
+    """
+    Split integer host ranges into count shards of near equal size.
+
+    Every range is cut into count contiguous slices and shard k gets slice k of
+    each, so counterpart offsets of equally sized networks land in the same shard.
+    """
+    shards = [[] for _ in range(count)]
+
+    for version, first, last in ranges:
+        size = last - first + 1
+
+        for index in range(count):
+            start = first + size * index // count
+            end = first + size * (index + 1) // count - 1
+
+            if start <= end:
+                shards[index].append((version, start, end))
+
+    return shards
+
+
+class LazyIPAddresses:
+    """
+    Re-iterable view over integer host ranges.
+
+    Addresses are only turned into strings as they are iterated, so memory stays
+    flat no matter how large the networks are. Each range is split around the
+    exclusions first, so the addresses in between need no checks.
+
+    With interleave the ranges are walked round-robin, position by position, so
+    counterpart hosts of the compared networks come out next to each other
+    instead of one network after the other.
+    """
+    def __init__(self, ranges, skips=None, interleave=False, exclusions=None):
+        # list of (IP version, first int, last int), both ends inclusive
+        self.ranges = ranges
+        # skipped last octets join a copy of the exclusions, the caller's stay as they are
+        self.exclusions = exclusions.copy() if exclusions else Exclusions()
+        self.exclusions.add_last_octets(skips)
+        self.interleave = interleave
+
+    def __iter__(self):
+        if self.interleave:
+            yield from self.iter_interleaved()
+            return
+
+        for version, first, last in self.ranges:
+            for start, end in self.exclusions.split(version, first, last):
+                for address in range(start, end + 1):
+                    yield int_to_ip(address, version)
+
+    def iter_interleaved(self):
+        longest = max((last - first + 1 for _, first, last in self.ranges), default=0)
+        exclusions = self.exclusions if self.exclusions else None
+
+        for position in range(longest):
+            for version, first, last in self.ranges:
+                address = first + position
+
+                if address > last:
+                    continue
+                if exclusions and exclusions.contains(version, address):
+                    continue
+
+                yield int_to_ip(address, version)
+
+    def __len__(self):
+        return sum(
+            last - first + 1 - self.exclusions.count(version, first, last)
+            for version, first, last in self.ranges
+        )
+
+    def shard(self, count):
+        """Split into count LazyIPAddresses, see shard_ranges."""
+        return [LazyIPAddresses(ranges, exclusions=self.exclusions) for ranges in shard_ranges(self.ranges, count)]
+
+
 class IPAddressHandler:
-    def __init__(self, ip_addresses, skips=None):
+    """
+    Turns the target networks into the addresses to probe.
+
+    With offsets the networks aren't enumerated at all, only those host
+    offsets are probed in each of them (OffsetTargets), which is how IPv6
+    prefixes are scanned. With a targets_file only the addresses read from it
+    are probed (StreamedTargets), the networks still line the results up.
+    """
+    def __init__(
+        self, ip_addresses, skips=None, lazy=False, interleave=False, exclusions=None, offsets=None, targets_file=None,
+    ):
         self.skips = skips
+        self.exclusions = exclusions
+        self.offsets = offsets
+        self.targets_file = targets_file
+        self.lazy = lazy or interleave or offsets is not None or targets_file is not None
+        self.interleave = interleave
         self.ip_addresses = self.set_ip_addresses(ip_addresses)
-        
+
     def set_ip_addresses(self, ip_addresses):
         addresses = []
 
         if not isinstance(ip_addresses, list):
             raise TypeError(f"Expected list for ip_addresses, got {type(ip_addresses).__name__}")
-        
+
+        if self.offsets is not None:
+            return OffsetTargets(ip_addresses, self.offsets, self.skips, self.exclusions)
+
+        if self.targets_file is not None:
+            return StreamedTargets(self.targets_file, ip_addresses, self.skips, self.exclusions)
+
+        if self.lazy:
+            ranges = []
+            for ip_address in ip_addresses:
+                ranges += self.parse_ip_ranges(ip_address)
+
+            return LazyIPAddresses(ranges, self.skips, self.interleave, self.exclusions)
+
         for ip_address in ip_addresses:
-            logger.debug(f"Parsing IP: {ip_address}")
-            
+            logger.debug("Parsing IP: %s", ip_address)
+
             parsed_addresses = self.parse_ip_addresses(ip_address)
             addresses += parsed_addresses
 
-            logger.debug(f"Added {len(parsed_addresses)} IPs from {ip_address}")
+            logger.debug("Added %d IPs from %s", len(parsed_addresses), ip_address)
 
         return addresses
 
     def parse_ip_addresses(self, ip_address):
-        logger.debug(f"Parsing target: {ip_address}")
-        addresses = []
+        return list(LazyIPAddresses(self.parse_ip_ranges(ip_address), self.skips, exclusions=self.exclusions))
+
+    def parse_ip_ranges(self, ip_address):
+        """
+        Parse a network or single address into integer host ranges.
+
+        Returns:
+            list of (IP version, first int, last int) tuples, empty if unparseable
+        """
+        logger.debug("Parsing target: %s", ip_address)
+
         try:
             # Try to parse as a network first
             try:
                 network = ipaddress.ip_network(ip_address, strict=False)
-                # Skip the network address (.0) and broadcast address (.255)
-                addresses = [str(ip) for ip in network.hosts()]
-
-                logger.debug(
-                    f"Successfully parsed as network with {len(addresses)} addresses"
-                )
-                return addresses
             except ValueError:
                 # If not a network, treat as a single IP
-                ipaddress.ip_address(ip_address)  # Validate it's a valid IP
-                logger.debug(f"Successfully parsed as single IP address")
+                address = ipaddress.ip_address(ip_address)  # Validate it's a valid IP
+                logger.debug("Successfully parsed as single IP address")
 
-                addresses = [ip_address]
-            
+                return [(address.version, int(address), int(address))]
         except ValueError as e:
             logger.error(f"Failed to parse IP {ip_address}: {str(e)}")
-        finally:
-            if self.skips:
-                logger.debug(
-                    f"filtering out any addresses with last octects in {str(self.skips)}"
-                )
-                addresses = [ip for ip in addresses if self.get_last_octet(ip) not in self.skips]
+            return []
+
+        first = int(network.network_address)
+        last = int(network.broadcast_address)
+
+        # same bounds as network.hosts(): skip the network address (.0), and for
+        # IPv4 the broadcast address (.255), unless the network is too small to have them
+        if network.num_addresses > 2:
+            first += 1
+            if network.version == 4:
+                last -= 1
+
+        logger.debug(
+            f"Successfully parsed as network with {last - first + 1} addresses"
+        )
 
-            return addresses
+        return [(network.version, first, last)]
 
     def get_last_octet(self, ip_address):
-        return ip_address.split('.')[-1]
\ No newline at end of file
+        return ip_address.split('.')[-1]
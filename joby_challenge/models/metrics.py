@@ -0,0 +1,235 @@
+import asyncio
+import bisect
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger("Metrics")
+
+DEFAULT_METRICS_INTERVAL_SECONDS = 5.0
+# upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+METRIC_PREFIX = "joby"
+
+# counter name -> help text, in export order
+COUNTERS = {
+    "calls": "target_function calls made by the worker pool",
+    "results": "final results handed to the result callback",
+    "reachable": "final results that were reachable",
+    "retries": "failed attempts that were retried",
+    "probes": "probes sent by the backend",
+    "timeouts": "probes that got no reply in time",
+    "errors": "probes that failed with an error other than a timeout",
+}
+
+
+class Histogram:
+    """Fixed bucket histogram, observe() is one bisect and two additions."""
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        # one count per bucket plus the overflow bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """(upper bound, observations at or below it) per bucket, ending with +Inf."""
+        total = 0
+        rows = []
+
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            rows.append((bound, total))
+
+        return rows
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q quantile, None without observations."""
+        if not self.count:
+            return None
+
+        for bound, total in self.cumulative():
+            if total >= q * self.count:
+                return bound
+
+
+class Metrics:
+    """
+    Counters and a call latency histogram for a running scan, plus a histogram
+    of the probe timeouts chosen when they are adaptive.
+
+    Updating them is a plain attribute increment, so instrumentation stays on.
+    The worker pool, utils.async_retry, utils.probe_host and ICMPProber.probe
+    all count into the module level registry.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.started = time.monotonic()
+        for name in COUNTERS:
+            setattr(self, name, 0)
+        self.in_flight = 0
+        self.latency = Histogram()
+        # only observed with adaptive timeouts
+        self.timeout = Histogram()
+
+    def counters(self):
+        return {name: getattr(self, name) for name in COUNTERS}
+
+    def gauges(self, queue=None, total=None):
+        gauges = {
+            "in_flight": self.in_flight,
+            "uptime_seconds": round(time.monotonic() - self.started, 3),
+        }
+        if queue is not None:
+            gauges["queue_depth"] = queue.qsize()
+        if total is not None:
+            gauges["hosts_total"] = total
+
+        return gauges
+
+    def to_dict(self, queue=None, total=None):
+        exported = {
+            "counters": self.counters(),
+            "gauges": self.gauges(queue, total),
+            "latency_seconds": histogram_dict(self.latency),
+        }
+        if self.timeout.count:
+            exported["probe_timeout_seconds"] = histogram_dict(self.timeout)
+
+        return exported
+
+    def to_prometheus(self, queue=None, total=None):
+        """Prometheus text exposition format."""
+        lines = []
+
+        for name, value in self.counters().items():
+            lines += [
+                f"# HELP {METRIC_PREFIX}_{name}_total {COUNTERS[name]}",
+                f"# TYPE {METRIC_PREFIX}_{name}_total counter",
+                f"{METRIC_PREFIX}_{name}_total {value}",
+            ]
+
+        for name, value in self.gauges(queue, total).items():
+            lines += [f"# TYPE {METRIC_PREFIX}_{name} gauge", f"{METRIC_PREFIX}_{name} {value}"]
+
+        lines += histogram_lines(f"{METRIC_PREFIX}_call_latency_seconds", self.latency)
+        if self.timeout.count:
+            lines += histogram_lines(f"{METRIC_PREFIX}_probe_timeout_seconds", self.timeout)
+
+        return "\n".join(lines) + "\n"
+
+
+def histogram_dict(histogram):
+    return {
+        "buckets": {str(bound): count for bound, count in histogram.cumulative()},
+        "sum": histogram.sum,
+        "count": histogram.count,
+        "p50": histogram.quantile(0.5),
+        "p99": histogram.quantile(0.99),
+    }
+
+
+def histogram_lines(name, histogram):
+    """Prometheus text lines of a histogram."""
+    lines = [f"# TYPE {name} histogram"]
+    for bound, count in histogram.cumulative():
+        lines.append(f'{name}_bucket{{le="{"+Inf" if bound == float("inf") else bound}"}} {count}')
+    lines += [f"{name}_sum {histogram.sum}", f"{name}_count {histogram.count}"]
+
+    return lines
+
+
+# process wide registry, every shard process has its own
+registry = Metrics()
+
+
+class MetricsReporter:
+    """
+    Periodically writes the registry to a file and logs a progress line.
+
+    A path ending in .json gets a JSON snapshot, anything else Prometheus text
+    (e.g. for node_exporter's textfile collector). The file is replaced
+    atomically, written from a thread so the event loop never waits on disk.
+    """
+    def __init__(
+        self,
+        metrics=registry,
+        path=None,
+        interval=DEFAULT_METRICS_INTERVAL_SECONDS,
+        progress=False,
+        queue=None,
+        total=None,
+    ):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.progress = progress
+        self.queue = queue
+        self.total = total
+        self.task = None
+        self.last_report = (time.monotonic(), metrics.probes)
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Stop reporting, with one last report of the final counts."""
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+        await self.report()
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.report()
+
+    async def report(self):
+        if self.path:
+            await asyncio.get_running_loop().run_in_executor(None, self.write, self.export())
+
+        if self.progress:
+            logger.info(self.progress_line())
+
+    def export(self):
+        if str(self.path).endswith(".json"):
+            return json.dumps(self.metrics.to_dict(self.queue, self.total), indent=2)
+
+        return self.metrics.to_prometheus(self.queue, self.total)
+
+    def write(self, text):
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as file:
+            file.write(text)
+        os.replace(temporary, self.path)
+
+    def progress_line(self):
+        metrics = self.metrics
+        now = time.monotonic()
+        last_time, last_probes = self.last_report
+        rate = (metrics.probes - last_probes) / max(now - last_time, 1e-9)
+        self.last_report = (now, metrics.probes)
+
+        done = f"{metrics.results:,}"
+        if self.total:
+            done = f"{metrics.results / self.total:6.1%} {metrics.results:,}/{self.total:,}"
+
+        timeout_ratio = metrics.timeouts / metrics.probes if metrics.probes else 0.0
+        p50 = metrics.latency.quantile(0.5)
+
+        return (
+            f"{done} hosts | {rate:,.0f} probes/s | in flight {metrics.in_flight}"
+            f"{f' | queue {self.queue.qsize()}' if self.queue is not None else ''}"
+            f" | retries {metrics.retries:,} | timeouts {timeout_ratio:.1%}"
+            f" | p50 {'-' if p50 is None else f'<={p50 * 1000:g}ms'}"
+        )
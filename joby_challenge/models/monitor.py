@@ -0,0 +1,201 @@
+import asyncio
+import collections
+import logging
+import time
+from joby_challenge.models.bitmap import iter_bits, popcount
+from joby_challenge.models.orchestrator import Orchestrator
+
+logger = logging.getLogger("Monitor")
+
+DEFAULT_MONITOR_INTERVAL_SECONDS = 60.0
+# a host that stayed stable is probed every 2**exponent cycles, up to this exponent
+DEFAULT_MAX_BACKOFF_EXPONENT = 4
+# state changes within the last 8 probes of a host that make it count as flapping
+DEFAULT_FLAP_THRESHOLD = 3
+# each host keeps a shift register of whether its last 8 probes changed state
+CHANGE_HISTORY_MASK = 0xFF
+
+NEW_MISMATCH = "new mismatch"
+RESOLVED_MISMATCH = "resolved mismatch"
+FLAPPING = "flapping"
+
+Transition = collections.namedtuple("Transition", ["kind", "offset", "results"])
+
+
+class Monitor(Orchestrator):
+    """
+    Re-sweeps the networks on a schedule and reports transitions only.
+
+    The previous state lives in the collector's offset store. Every offset carries
+    a backoff exponent: it is probed every 2**exponent cycles, the exponent grows
+    while all its counterparts stay stable and drops to 0 as soon as one changes,
+    so the probe budget goes to the hosts that are moving.
+    """
+    def __init__(
+        self,
+        networks,
+        skips=None,
+        interval=DEFAULT_MONITOR_INTERVAL_SECONDS,
+        cycles=None,
+        max_backoff_exponent=DEFAULT_MAX_BACKOFF_EXPONENT,
+        flap_threshold=DEFAULT_FLAP_THRESHOLD,
+        **options,
+    ):
+        if options.get("processes", 1) != 1:
+            raise ValueError("Monitor mode runs in a single process")
+        if options.get("target_offsets") is not None or options.get("targets_file") is not None:
+            raise ValueError("Monitor mode tracks every host offset of its networks, it can't follow target lists")
+        if options.get("checkpoint_path"):
+            raise ValueError("Monitor mode re-sweeps forever, there is no scan to resume")
+
+        options["lazy"] = True
+        super().__init__(networks, skips, **options)
+
+        self.interval = interval
+        self.cycles = cycles
+        self.max_backoff_exponent = max_backoff_exponent
+        self.flap_threshold = flap_threshold
+        self.cycle = 0
+
+        # host offset bounds of every network, aligned with the store's networks
+        self.data_collector.track_hosts(self.ip_addresses.ranges, self.ip_addresses.exclusions)
+        self.host_bounds = self.data_collector.host_bounds
+        self.exclusions = self.data_collector.exclusions
+
+        self.offset_count = max((bounds[4] for bounds in self.host_bounds), default=-1) + 1
+        self.exponents = bytearray(self.offset_count)
+        self.change_history = [bytearray(self.offset_count) for _ in self.host_bounds]
+        self.flapping = [bytearray(self.offset_count) for _ in self.host_bounds]
+
+        self.due_offsets = []
+        self.changed_offsets = set()
+        self.mismatch_offsets = 0
+        self.transitions = []
+
+    def is_due(self, offset):
+        period = 1 << self.exponents[offset]
+        # the offset spreads stable hosts with the same period evenly over cycles
+        return (self.cycle + offset) % period == 0
+
+    def targets(self):
+        """Addresses to probe this cycle, every network's counterpart of each due offset."""
+        self.due_offsets = []
+
+        for offset in range(self.offset_count):
+            if not self.is_due(offset):
+                continue
+
+            self.due_offsets.append(offset)
+
+            for index, version, base, first, last in self.host_bounds:
+                if not first <= offset <= last:
+                    continue
+                if self.exclusions.contains(version, base + offset):
+                    continue
+
+                yield self.data_collector.store.address(index, offset)
+
+    def add_result(self, ip_address, reachable):
+        store = self.data_collector.store
+        location = store.locate(ip_address)
+
+        if location is None:
+            return
+
+        index, offset = location
+        previous = store.result(index, offset)
+        store.set(index, offset, reachable)
+
+        for sink in self.sinks:
+            sink.write(ip_address, reachable)
+        self.emit_host(ip_address, reachable)
+
+        changed = previous is not None and previous != reachable
+        history = ((self.change_history[index][offset] << 1) | changed) & CHANGE_HISTORY_MASK
+        self.change_history[index][offset] = history
+
+        if changed:
+            self.changed_offsets.add(offset)
+
+        flapping = popcount(history) >= self.flap_threshold
+        if flapping and not self.flapping[index][offset]:
+            self.report_transition(Transition(FLAPPING, offset, {ip_address: reachable}))
+        self.flapping[index][offset] = flapping
+
+        return self.backpressure()
+
+    def report_transition(self, transition):
+        self.transitions.append(transition)
+
+        results = ", ".join(
+            f"{address} {self.data_collector.reachable_map[reachable]}"
+            for address, reachable in transition.results.items()
+        )
+        logger.info(f"cycle {self.cycle} {transition.kind.upper()} offset {transition.offset}: {results}")
+
+    def finish_cycle(self):
+        """Report mismatch transitions and reschedule the offsets probed this cycle."""
+        store = self.data_collector.store
+        mismatches = store.mismatch_offsets()
+
+        for offset in iter_bits(mismatches & ~self.mismatch_offsets):
+            results = store.results_at(offset)
+            self.report_transition(Transition(NEW_MISMATCH, offset, results))
+            self.write_mismatch(results)
+        for offset in iter_bits(self.mismatch_offsets & ~mismatches):
+            self.report_transition(Transition(RESOLVED_MISMATCH, offset, store.results_at(offset)))
+
+        self.mismatch_offsets = mismatches
+
+        for offset in self.due_offsets:
+            if offset in self.changed_offsets:
+                self.exponents[offset] = 0
+            elif self.exponents[offset] < self.max_backoff_exponent:
+                self.exponents[offset] += 1
+
+        self.changed_offsets = set()
+
+    async def run_cycle(self):
+        """
+        One sweep over the due offsets.
+
+        Returns:
+            list of Transitions reported this cycle
+        """
+        self.transitions = []
+        self.started = time.time()
+        started = time.perf_counter()
+
+        await self.run_pool(self.targets())
+        self.finish_cycle()
+        # the cycle's mismatches, rather than with the next cycle's results
+        await self.catch_up()
+
+        for sink in self.sinks:
+            await sink.flush()
+
+        # the snapshot always holds the latest state of every host
+        if self.snapshot_path:
+            self.save_snapshot()
+
+        logger.info(
+            f"cycle {self.cycle}: probed {len(self.due_offsets)}/{self.offset_count} offsets "
+            f"in {time.perf_counter() - started:.1f}s, {len(self.transitions)} transitions"
+        )
+
+        return self.transitions
+
+    async def scan(self):
+        """Sweep every interval until cycles have run, forever if cycles is None."""
+        logger.info(f"Starting monitor, sweeping every {self.interval}s")
+
+        try:
+            while self.cycles is None or self.cycle < self.cycles:
+                started = time.monotonic()
+                await self.run_cycle()
+                self.cycle += 1
+
+                if self.cycles is None or self.cycle < self.cycles:
+                    await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+        finally:
+            await self.close_sinks()
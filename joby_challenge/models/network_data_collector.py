@@ -1,25 +1,63 @@
+import itertools
 import logging
+from joby_challenge.models.bitmap import iter_bits
+from joby_challenge.models.exclusions import Exclusions
+from joby_challenge.models.result_store import OffsetResultStore
 
 logger = logging.getLogger("NetworkDataCollector")
 
 # index of last octet when ip address is split by period
 DEFAULT_OCTET=3
 
+# example addresses logged per signature group
+DEFAULT_SIGNATURE_SAMPLES = 5
+
 class NetworkDataCollector:
     """
     Handles data collection and storage.
+
+    Given the scanned networks, results go into an OffsetResultStore keyed by host
+    offset instead of the octet-keyed dict, and mismatches are found in one pass
+    over its bitmaps rather than on every insert.
+
+    Once told which hosts are scanned (track_hosts), the collector counts down
+    the outstanding counterparts of every offset and finalizes the offset as
+    soon as the last one reports: a mismatch is logged there and then, and the
+    offset's bookkeeping is dropped.
     """
-    def __init__(self, octet_position=DEFAULT_OCTET):
+    def __init__(self, octet_position=DEFAULT_OCTET, networks=None, offsets=None):
         self.data = {}
         self.octet_position=octet_position
+        self.store = OffsetResultStore(networks, offsets) if networks else None
         self.mismatches = []
+        # (network index, IP version, network address, first host offset, last host offset)
+        self.host_bounds = []
+        self.exclusions = Exclusions()
+        # offset -> counterparts still to report, None while early finalization is off
+        self.outstanding = None
+        self.finalized = 0
+        # called with every mismatch as it is finalized
+        self.on_mismatch = None
         self.reachable_map = {
             True: "IS REACHABLE",
             False: "IS NOT REACHABLE"
         }
 
     def add_result(self, ip_address, reachable):
-        """Add a single result."""
+        """
+        Add a single result.
+
+        Returns:
+            the store location (network index, offset) of the result, None
+            without a store or for an address outside the networks
+        """
+        if self.store:
+            location = self.store.add(ip_address, reachable)
+
+            if location is not None and self.outstanding is not None:
+                self.count_down(location[1])
+            return location
+
         octets = ip_address.split('.')
         target_octet = octets[self.octet_position]
 
@@ -31,8 +69,89 @@ class NetworkDataCollector:
         self.data[target_octet][ip_address] = reachable
         self.check_mismatches(self.data[target_octet])
 
+    def restore(self, index, offset, reachable):
+        """Put back a result from an earlier run at a store location, see CheckpointJournal."""
+        self.store.set(index, offset, reachable)
+
+        if self.outstanding is not None:
+            self.count_down(offset)
+
+    def track_hosts(self, ranges, exclusions=None):
+        """
+        Record the scanned host ranges, aligned with the store's networks, and
+        start finalizing offsets as their counterparts complete.
+        """
+        self.host_bounds = []
+        for index, (version, first, last) in enumerate(ranges):
+            base = int(self.store.networks[index].network_address)
+            self.host_bounds.append((index, version, base, first - base, last - base))
+
+        self.exclusions = exclusions or Exclusions()
+        self.outstanding = {}
+
+    def counterparts(self, offset):
+        """Number of networks that probe a host at this offset (a position for sparse stores)."""
+        offset = self.store.offset_at(offset)
+        count = 0
+
+        for index, version, base, first, last in self.host_bounds:
+            if not first <= offset <= last:
+                continue
+            if self.exclusions.contains(version, base + offset):
+                continue
+
+            count += 1
+
+        return count
+
+    def count_down(self, offset):
+        remaining = self.outstanding.pop(offset, None)
+
+        if remaining is None:
+            remaining = self.counterparts(offset)
+
+        if remaining > 1:
+            self.outstanding[offset] = remaining - 1
+        else:
+            self.finalize(offset)
+
+    def finalize(self, offset):
+        """All counterparts of offset are in, report it if it's a mismatch."""
+        self.finalized += 1
+        results = self.store.results_at(offset)
+        values = results.values()
+
+        if True in values and False in values:
+            self.mismatches.append(results)
+
+            if self.on_mismatch:
+                self.on_mismatch(results)
+            logger.info("MISMATCH " + ", ".join(
+                f"{ip_addr} {self.reachable_map[reachable]}" for ip_addr, reachable in results.items()
+            ))
+
+    def finalize_remaining(self):
+        """Finalize offsets some counterparts never reported for, e.g. after a cancelled scan."""
+        if not self.outstanding:
+            return
+
+        logger.debug(f"Finalizing {len(self.outstanding)} incomplete offsets")
+
+        for offset in sorted(self.outstanding):
+            self.finalize(offset)
+
+        self.outstanding = {}
+
+    def log_finalized(self):
+        """End of scan summary when mismatches were already reported as offsets finalized."""
+        self.finalize_remaining()
+        logger.info(f"{len(self.mismatches)} mismatches across {self.finalized} offsets, reported as found")
+
     def get_all_results(self):
         """Get all results."""
+        if self.store:
+            return self.store.as_dict()
+
         return self.data
     
     def check_mismatches(self, ip_address_map):
@@ -45,12 +164,21 @@ class NetworkDataCollector:
         # check where ip address is pingable in one range, but not the other
         if True in results and False in results:
             self.mismatches.append(ip_address_map)
-            
+
+    def find_mismatches(self):
+        """Compare every network's bitmaps at once, only needed with an offset store."""
+        if self.store:
+            self.mismatches = self.store.mismatches()
+
+        return self.mismatches
+
     def log_mismatches(self):
-        """Log all mismatches in a single consolidated report."""
+        """Log all mismatches in a single consolidated report, and return them."""
+        self.find_mismatches()
+
         if not self.mismatches:
             logger.info("No mismatches found between networks")
-            return
+            return self.mismatches
 
         logger.info("**********MISMATCH ANALYSIS START***********")
         
@@ -59,4 +187,64 @@ class NetworkDataCollector:
                 reachable = self.reachable_map[reachable]
                 logger.info(f"{ip_addr} {reachable}")
             logger.info("----------------------------------")
-        logger.info("**********MISMATCH ANALYSIS END***********")
\ No newline at end of file
+        logger.info("**********MISMATCH ANALYSIS END***********")
+
+        return self.mismatches
+
+    def find_signatures(self):
+        """
+        Group host offsets by which networks they were reachable in.
+
+        Returns:
+            list of (signature, host count, offsets bitmap), largest group first
+        """
+        if not self.store:
+            return []
+
+        groups = self.store.signature_groups()
+
+        return sorted(
+            ((signature, count, offsets) for signature, (count, offsets) in groups.items()),
+            key=lambda group: (-group[1], group[0]),
+        )
+
+    def describe_signature(self, signature):
+        """Human readable summary of a signature, e.g. 'down only at 10.4.0.0/16'."""
+        networks = self.store.networks
+        down = [str(network) for index, network in enumerate(networks) if not signature >> index & 1]
+
+        if not down:
+            return "up everywhere"
+        if len(down) == len(networks):
+            return "down everywhere"
+        if len(down) == 1:
+            return f"down only at {down[0]}"
+
+        up = [str(network) for index, network in enumerate(networks) if signature >> index & 1]
+        if len(up) == 1:
+            return f"up only at {up[0]}"
+
+        return f"down at {', '.join(down)}"
+
+    def log_signatures(self, samples=DEFAULT_SIGNATURE_SAMPLES):
+        """Log one line per reachability signature with a few example offsets."""
+        signatures = self.find_signatures()
+
+        if not signatures:
+            logger.info("No hosts were probed in every network")
+            return
+
+        logger.info("**********SIGNATURE ANALYSIS START***********")
+
+        for signature, count, offsets in signatures:
+            examples = ", ".join(
+                str(self.store.offset_at(position)) for position in itertools.islice(iter_bits(offsets), samples)
+            )
+            # one character per network in argument order, 1 for reachable
+            pattern = "".join(str(signature >> index & 1) for index in range(len(self.store.networks)))
+            logger.info(
+                f"{pattern} {self.describe_signature(signature)}: "
+                f"{count} hosts (offsets {examples}{', ...' if count > samples else ''})"
+            )
+
+        logger.info("**********SIGNATURE ANALYSIS END***********")
@@ -1,39 +1,533 @@
+import asyncio
+import collections
 import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from joby_challenge.models.network_data_collector import NetworkDataCollector
-from joby_challenge.models.async_worker_pool import AsyncWorkerPool
+from joby_challenge.models.async_worker_pool import AsyncWorkerPool, DEFAULT_QUEUE_SIZE
 from joby_challenge.models.ip_address_handler import IPAddressHandler
-from joby_challenge.utils import ping_host
+from joby_challenge.models.probe_backends import AdaptiveTimeouts
+from joby_challenge.models.backend_registry import create_backend, BACKEND_ICMP
+from joby_challenge.models.checkpoint import CheckpointJournal
+from joby_challenge.models.rtt_estimator import RTTEstimator, DEFAULT_MIN_TIMEOUT_SECONDS
+from joby_challenge.models.rate_limiter import RateLimiter
+from joby_challenge.models.reachability_cache import ReachabilityCache, DEFAULT_CACHE_TTL_SECONDS, DEFAULT_CHANGED_TTL_SECONDS
+from joby_challenge.models.snapshot import write_snapshot
+from joby_challenge.models.metrics import MetricsReporter, registry, DEFAULT_METRICS_INTERVAL_SECONDS
+from joby_challenge.models.concurrency_limiter import AIMDLimiter, DEFAULT_MIN_LIMIT, DEFAULT_MAX_LIMIT
+from joby_challenge.utils import DEFAULT_MAX_ATTEMPTS, DEFAULT_DELAY_SECONDS
+from joby_challenge.logs import ForwardedRecords, forward_logging
+from joby_challenge.models.reports import REPORT_MISMATCHES, REPORT_SIGNATURES, REPORTS
 
 DEFAULT_MAX_CONCURRENT_WORKERS = 50
 
+# events buffered between a scan and a slow stream() consumer before the workers wait for it
+DEFAULT_STREAM_BUFFER = 1000
+
+# stream() events: a host's final result, and the results of an offset that differ between networks
+HostResult = collections.namedtuple("HostResult", ["address", "reachable"])
+Mismatch = collections.namedtuple("Mismatch", ["results"])
+# queued after the last event of a scan
+STREAM_END = object()
+
 logger = logging.getLogger("Orchestrator")
 
+
+def run_shard(networks, skips, targets, options):
+    """
+    Process entry point for sharded scans.
+
+    Scans one shard of the targets (a LazyIPAddresses or OffsetTargets) on a
+    fresh event loop with its own sockets, and returns the packed result
+    bitmaps for the parent to merge.
+    """
+    return asyncio.run(scan_shard(networks, skips, targets, options))
+
+
+async def scan_shard(networks, skips, targets, options):
+    # built inside the loop, before 3.10 queues, locks and limiters bind to the loop current at creation
+    orchestrator = Orchestrator(networks, skips, lazy=True, **options)
+    if orchestrator.checkpoint:
+        orchestrator.checkpoint.prepared = True
+    await orchestrator.run_pool(targets)
+
+    return orchestrator.data_collector.store.dump()
+
+
 class Orchestrator:
     """
     Main controller for ping application
+
+    With processes > 1 the target ranges are split into shards, each scanned by
+    its own process and event loop, and the shards' results merged at the end.
+
+    With interleave the networks are probed offset by offset rather than one
+    after the other, and mismatches are reported as soon as all counterparts
+    of an offset are in instead of at the end of the scan.
+
+    exclusions (an Exclusions) are left out on top of the skipped last octets.
+
+    With target_offsets only those host offsets are probed in every network,
+    see OffsetTargets; results are then aligned by offset in a sparse store.
+    With targets_file (a path, or "-" for stdin) only the addresses streamed
+    from it are probed, see StreamedTargets.
+
+    backend names the probe backend (icmp, tcp, udp or an installed plugin, see backend_registry)
+    and backend_options are passed on to it, e.g. ports or timeout. With
+    adaptive_timeouts every probe waits what an RTTEstimator derives from the
+    replies so far, within timeout_bounds (min, max), max defaulting to the
+    backend's timeout.
+
+    metrics_path and progress report the metrics registry of a single process
+    scan, they can't be combined with processes > 1.
+
+    With checkpoint_path completed results are journaled as the scan goes
+    (see CheckpointJournal); with resume as well, the journal of an
+    interrupted run is replayed first and its completed targets skipped.
+
+    Result sinks receive every result as it arrives, and mismatches as they are
+    finalized, or at the end of the scan without interleave. stream() yields
+    the same as HostResult and Mismatch events, start() runs it to the end.
     """
-    def __init__(self, networks, skips=None, max_concurrent=DEFAULT_MAX_CONCURRENT_WORKERS):
-        self.address_handler = IPAddressHandler(networks, skips)
+    def __init__(
+        self,
+        networks,
+        skips=None,
+        max_concurrent=DEFAULT_MAX_CONCURRENT_WORKERS,
+        shared_socket=False,
+        lazy=False,
+        report=REPORT_MISMATCHES,
+        queue_size=None,
+        adaptive_concurrency=False,
+        concurrency_bounds=(DEFAULT_MIN_LIMIT, DEFAULT_MAX_LIMIT),
+        rate_limit=None,
+        subnet_rate_limit=None,
+        processes=1,
+        cache_path=None,
+        cache_ttl=DEFAULT_CACHE_TTL_SECONDS,
+        cache_changed_ttl=DEFAULT_CHANGED_TTL_SECONDS,
+        interleave=False,
+        sinks=None,
+        snapshot_path=None,
+        metrics_path=None,
+        metrics_interval=DEFAULT_METRICS_INTERVAL_SECONDS,
+        progress=False,
+        exclusions=None,
+        target_offsets=None,
+        targets_file=None,
+        backend=BACKEND_ICMP,
+        backend_options=None,
+        adaptive_timeouts=False,
+        timeout_bounds=None,
+        checkpoint_path=None,
+        resume=False,
+    ):
+        if report not in REPORTS:
+            raise ValueError(f"Unknown report {report}, expected one of {REPORTS}")
+        self.report = report
+
+        if snapshot_path and target_offsets is not None:
+            raise ValueError("Snapshots are indexed by host offset, they can't hold the results of sparse targets")
+        if target_offsets is not None and targets_file is not None:
+            raise ValueError("Choose either target offsets or a targets file")
 
-        self.data_collector = NetworkDataCollector()
+        self.networks = networks
+        self.skips = skips
+        self.processes = processes or os.cpu_count()
+        if targets_file is not None and self.processes > 1:
+            # a stream can't be split up front, and stdin can only be read once
+            logger.warning("Streamed targets are scanned in a single process, ignoring processes")
+            self.processes = 1
+        if self.processes > 1 and (metrics_path or progress):
+            # every shard counts into the registry of its own process, the parent has nothing to report
+            raise ValueError("Metrics and progress are only reported for single process scans")
+
+        # every shard process builds its own pool from these, splitting the rate caps between them
+        self.shard_options = {
+            "max_concurrent": max_concurrent,
+            "shared_socket": shared_socket,
+            "backend": backend,
+            "backend_options": backend_options,
+            "adaptive_timeouts": adaptive_timeouts,
+            "timeout_bounds": timeout_bounds,
+            "checkpoint_path": checkpoint_path,
+            "resume": resume,
+            "queue_size": queue_size,
+            "adaptive_concurrency": adaptive_concurrency,
+            "concurrency_bounds": concurrency_bounds,
+            "rate_limit": rate_limit / self.processes if rate_limit else None,
+            "subnet_rate_limit": subnet_rate_limit / self.processes if subnet_rate_limit else None,
+            "cache_path": cache_path,
+            "cache_ttl": cache_ttl,
+            "cache_changed_ttl": cache_changed_ttl,
+            "exclusions": exclusions,
+            "target_offsets": target_offsets,
+        }
+        self.cache_path = cache_path
+        self.cache_ttl = cache_ttl
+        self.cache_changed_ttl = cache_changed_ttl
+        self.cache = None
+
+        # lazy mode streams addresses from integer ranges instead of building a list,
+        # shards need the ranges so sharded scans are always lazy, and so are sparse targets
+        lazy = lazy or self.processes > 1 or target_offsets is not None or targets_file is not None
+        if interleave and self.processes > 1:
+            logger.warning("Interleaved scheduling only applies to single process scans, ignoring it")
+            interleave = False
+        if interleave and targets_file is not None:
+            logger.warning("Streamed targets are probed in file order, ignoring interleave")
+            interleave = False
+        self.interleave = interleave
+        self.address_handler = IPAddressHandler(
+            networks, skips, lazy=lazy, interleave=interleave, exclusions=exclusions, offsets=target_offsets,
+            targets_file=targets_file,
+        )
+
+        self.data_collector = NetworkDataCollector(networks=networks, offsets=target_offsets)
+        # bounded queue of stream() events and the events not in it yet, only while streaming
+        self.events = None
+        self.pending_events = collections.deque()
+        self.stream_hosts = False
+
+        self.checkpoint = CheckpointJournal(checkpoint_path, self.data_collector.store) if checkpoint_path else None
+        self.resume = resume
+        if interleave:
+            self.data_collector.track_hosts(self.ip_addresses.ranges, self.ip_addresses.exclusions)
+
+        self.snapshot_path = snapshot_path
+        self.metrics_path = metrics_path
+        self.metrics_interval = metrics_interval
+        self.progress = progress
+        self.started = None
+
+        self.sinks = list(sinks or [])
+        if interleave:
+            self.data_collector.on_mismatch = self.write_mismatch
+
+        # lazily generated targets only keep memory flat if the queue is bounded too
+        if (lazy or interleave) and queue_size is None:
+            queue_size = DEFAULT_QUEUE_SIZE
+
+        backend_options = dict(backend_options or {})
+        if backend == BACKEND_ICMP:
+            # one long-lived ICMP socket per IP version for the whole scan instead of one per ping
+            backend_options["shared_socket"] = shared_socket
+        self.backend = create_backend(backend, **backend_options)
+
+        self.rtt = None
+        if adaptive_timeouts:
+            min_timeout, max_timeout = timeout_bounds or (DEFAULT_MIN_TIMEOUT_SECONDS, None)
+            self.rtt = RTTEstimator(min_timeout, max_timeout or self.backend.timeout)
+            self.backend = AdaptiveTimeouts(self.backend, self.rtt)
+        # single attempts, the pool schedules the retries so backoff doesn't hold a worker
+        target_function = self.backend.probe
         
+        # AIMD starts at max_concurrent and moves within the bounds, which needs
+        # enough workers to reach the upper bound
+        self.concurrency_limiter = None
+        if adaptive_concurrency:
+            min_limit, max_limit = concurrency_bounds
+            self.concurrency_limiter = AIMDLimiter(max_concurrent, min_limit, max_limit)
+            max_concurrent = max_limit
+
+        # packets per second caps, overall and per destination /24
+        self.rate_limiter = None
+        if rate_limit or subnet_rate_limit:
+            self.rate_limiter = RateLimiter(rate_limit, subnet_rate_limit)
+
         # Create worker pool with a callback to our data collector
         self.worker_pool = AsyncWorkerPool(
-            ping_host, 
-            result_callback=self.data_collector.add_result,
-            max_concurrent=max_concurrent
+            target_function, 
+            result_callback=self.add_result,
+            max_concurrent=max_concurrent,
+            queue_size=queue_size,
+            concurrency_limiter=self.concurrency_limiter,
+            rate_limiter=self.rate_limiter,
+            retry_attempts=DEFAULT_MAX_ATTEMPTS,
+            retry_delay=DEFAULT_DELAY_SECONDS,
+            metrics=registry,
         )
 
     async def start(self):
-        """Start pinging hosts and collect results."""
+        """Run the scan to the end and return every result."""
+        # only the mismatch events, a per host event costs a task switch a host
+        async for _ in self.stream(hosts=False):
+            pass
+
+        return self.data_collector.get_all_results()
+
+    async def stream(self, deadline=None, buffer_size=DEFAULT_STREAM_BUFFER, hosts=True):
+        """
+        Run the scan, yielding a HostResult per host (unless hosts is False)
+        and a Mismatch per mismatch as they complete.
+
+        Events go through a queue of buffer_size: once it is full the workers
+        wait in their result callback, so a slow consumer slows the scan
+        down instead of growing memory. Closing the generator (breaking out
+        of the loop, then aclose()) or cancelling the consuming task cancels
+        the scan, and so does a deadline in seconds, which then raises
+        asyncio.TimeoutError. The collected results stay on the orchestrator.
+        """
+        if self.events is not None:
+            raise RuntimeError("This orchestrator is already streaming")
+
+        loop = asyncio.get_running_loop()
+        expires = loop.time() + deadline if deadline is not None else None
+        self.events = asyncio.Queue(buffer_size)
+        self.pending_events.clear()
+        self.stream_hosts = hosts
+        producer = asyncio.ensure_future(self.produce())
+
+        try:
+            while True:
+                if expires is None:
+                    event = await self.events.get()
+                else:
+                    try:
+                        event = await asyncio.wait_for(self.events.get(), max(expires - loop.time(), 0))
+                    except asyncio.TimeoutError:
+                        raise asyncio.TimeoutError(f"Scan didn't finish within {deadline}s") from None
+
+                if event is STREAM_END:
+                    break
+                yield event
+
+            # re-raises whatever ended the scan early
+            await producer
+        finally:
+            if not producer.done():
+                producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+
+            self.events = None
+            self.stream_hosts = False
+
+    async def produce(self):
+        """Run the scan for stream(), ending the events with STREAM_END however it finishes."""
+        try:
+            await self.scan()
+            await self.flush_events()
+        except Exception:
+            await self.events.put(STREAM_END)
+            raise
+
+        await self.events.put(STREAM_END)
+
+    async def scan(self):
+        """Probe every target, then report, snapshot and close the sinks."""
         logger.info(f"Starting ping scan")
+        self.started = time.time()
 
-        # Execute all ping operations
-        await self.worker_pool.start(self.ip_addresses)
+        try:
+            # Execute all ping operations
+            if self.processes > 1:
+                await self.run_shards()
+            else:
+                await self.run_pool(self.ip_addresses)
 
-        self.data_collector.log_mismatches()
+            mismatches = None
+            if self.report == REPORT_SIGNATURES:
+                self.data_collector.log_signatures()
+            elif self.interleave:
+                self.data_collector.log_finalized()
+            else:
+                mismatches = self.data_collector.log_mismatches()
 
-        return self.data_collector.get_all_results()
+            if (self.sinks or self.events is not None) and not self.interleave:
+                # a full pass over the store's bitmaps, only if the report didn't just make it
+                if mismatches is None:
+                    mismatches = self.data_collector.find_mismatches()
+                for results in mismatches:
+                    self.write_mismatch(results)
+
+            if self.snapshot_path:
+                self.save_snapshot()
+        finally:
+            await self.close_sinks()
+
+    def emit(self, event):
+        if self.events is not None:
+            self.pending_events.append(event)
+
+    def emit_host(self, ip_address, reachable):
+        if self.events is not None and self.stream_hosts:
+            self.pending_events.append(HostResult(ip_address, reachable))
+
+    async def flush_events(self):
+        """Move pending events into the bounded queue, waiting while it is full."""
+        while self.pending_events:
+            await self.events.put(self.pending_events.popleft())
+
+    def backpressure(self):
+        """
+        A coroutine for the worker to await when there are events to queue or a
+        sink's writer thread is behind, so it waits for room; None otherwise.
+        """
+        if self.pending_events or any(sink.backlogged for sink in self.sinks):
+            return self.catch_up()
+        return None
+
+    async def catch_up(self):
+        for sink in self.sinks:
+            await sink.drain()
+        await self.flush_events()
+
+    async def flushing(self, items):
+        """Pass items through, catching up on the cache hits handed out between them."""
+        if hasattr(items, "__aiter__"):
+            async for item in items:
+                await self.catch_up()
+                yield item
+        else:
+            for item in items:
+                await self.catch_up()
+                yield item
+
+    def add_result(self, ip_address, reachable):
+        """
+        Pool callback, probe results go to the collector, the sinks and the cache
+        if there is one. Returns backpressure() for the worker to await.
+        """
+        self.add_cached_result(ip_address, reachable)
+
+        if self.cache:
+            self.cache.record(ip_address, reachable)
+
+        return self.backpressure()
+
+    def add_cached_result(self, ip_address, reachable):
+        """Results answered from the cache skip writing back to it."""
+        location = self.data_collector.add_result(ip_address, reachable)
+
+        if self.checkpoint and location is not None:
+            self.checkpoint.record(location, reachable)
+
+        for sink in self.sinks:
+            sink.write(ip_address, reachable)
+        self.emit_host(ip_address, reachable)
+
+    def write_mismatch(self, results):
+        for sink in self.sinks:
+            sink.write_mismatch(results)
+        self.emit(Mismatch(results))
+
+    def save_snapshot(self):
+        """Write the collected results to snapshot_path."""
+        write_snapshot(self.snapshot_path, self.data_collector.store, {
+            "started": self.started,
+            "finished": time.time(),
+            "skips": sorted(self.address_handler.skips or []),
+        })
+
+    async def close_sinks(self):
+        for sink in self.sinks:
+            await sink.close()
+
+    async def run_pool(self, items):
+        """Ping items with this process's worker pool, answering what we can from the cache."""
+        # counts are per scan (or monitor cycle), not since the process started
+        registry.reset()
+
+        reporter = None
+        if self.metrics_path or self.progress:
+            reporter = MetricsReporter(
+                path=self.metrics_path,
+                interval=self.metrics_interval,
+                progress=self.progress,
+                queue=self.worker_pool.queue,
+                total=len(items) if hasattr(items, "__len__") else None,
+            )
+            reporter.start()
+
+        if self.checkpoint:
+            if not self.checkpoint.prepared:
+                self.checkpoint.prepare(self.resume, self.data_collector.restore)
+            elif self.resume:
+                # the parent checked and trimmed the journal, shards only read it
+                self.checkpoint.replay(self.data_collector.restore)
+            self.checkpoint.open()
+
+            if self.resume:
+                if hasattr(items, "__aiter__"):
+                    items = self.checkpoint.afilter(items)
+                else:
+                    items = self.checkpoint.filter(items)
+
+        if self.cache_path:
+            self.cache = ReachabilityCache(self.cache_path, self.cache_ttl, self.cache_changed_ttl)
+            if hasattr(items, "__aiter__"):
+                items = self.cache.afilter(items, self.add_cached_result)
+            else:
+                items = self.cache.filter(items, self.add_cached_result)
+            if self.events is not None or self.sinks:
+                # cache hits bypass the pool and its callback, don't let them pile up
+                items = self.flushing(items)
+
+        try:
+            await self.worker_pool.start(items)
+        finally:
+            if reporter:
+                await reporter.stop()
+
+            if self.checkpoint:
+                self.checkpoint.close()
+                self.checkpoint.log_stats()
+
+            self.backend.close()
+            if self.rtt:
+                self.rtt.log_stats()
+
+            if self.cache:
+                self.cache.close()
+                self.cache.log_stats()
+                self.cache = None
+
+        limiter = self.concurrency_limiter
+        if limiter:
+            logger.info(
+                f"Concurrency limit ended at {int(limiter.limit)} "
+                f"after {limiter.changes} changes (range {limiter.lowest}-{limiter.highest})"
+            )
+
+    async def run_shards(self):
+        """Scan shards in separate processes and merge their packed results."""
+        loop = asyncio.get_running_loop()
+        shards = self.ip_addresses.shard(self.processes)
+
+        logger.info(f"Scanning {len(self.ip_addresses)} hosts in {self.processes} processes")
+
+        if self.checkpoint:
+            # shards append to one journal, it has to be ready before any of them starts
+            self.checkpoint.prepare(self.resume)
+
+        # shard processes log through a queue back to this process' handlers
+        records = multiprocessing.Queue()
+        forwarder = ForwardedRecords(records)
+        forwarder.start()
+
+        try:
+            with ProcessPoolExecutor(
+                self.processes, initializer=forward_logging, initargs=(records, logging.getLogger().getEffectiveLevel())
+            ) as executor:
+                dumps = await asyncio.gather(*(
+                    loop.run_in_executor(executor, run_shard, self.networks, self.skips, shard, self.shard_options)
+                    for shard in shards
+                ))
+        finally:
+            forwarder.stop()
+
+        for dump in dumps:
+            self.data_collector.store.merge(dump)
+
+        # shards don't share the sinks' files or the event stream, the merged results are written from here
+        if self.sinks or self.stream_hosts:
+            for ip_address, reachable in self.data_collector.store.iter_results():
+                for sink in self.sinks:
+                    sink.write(ip_address, reachable)
+                self.emit_host(ip_address, reachable)
+                await self.catch_up()
     
     @property
     def data(self):
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import socket
+import struct
+import time
+from joby_challenge.models.metrics import registry as metrics
+from joby_challenge.utils import DEFAULT_PING_TIMEOUT_SECONDS
+
+logger = logging.getLogger("ProbeBackends")
+
+# ports tried on every host, the first answer wins
+DEFAULT_TCP_PORTS = (80, 443, 22)
+DEFAULT_UDP_PORTS = (53, 123, 161)
+DEFAULT_TCP_TIMEOUT_SECONDS = 1.5
+DEFAULT_UDP_TIMEOUT_SECONDS = 2.0
+# sockets a backend keeps open at once, each port of each probe holds one
+DEFAULT_MAX_CONNECTIONS = 256
+
+# l_onoff=1, l_linger=0: close() sends a RST, so scanning leaves no TIME_WAIT sockets behind
+LINGER_RESET = struct.pack("ii", 1, 0)
+
+
+class ProbeBackend:
+    """
+    One way of asking whether a host is up.
+
+    probe(host, timeout=None) makes a single attempt and returns a bool, so a
+    backend's probe is a drop-in AsyncWorkerPool target_function and gets the
+    pool's retries, concurrency and rate limits like any other. Port based
+    backends try all their ports at once and the first answer wins; each port
+    holds one of max_connections socket slots, which bounds file descriptors
+    however high the pool's concurrency goes.
+    """
+    DEFAULT_TIMEOUT = DEFAULT_PING_TIMEOUT_SECONDS
+
+    def __init__(self, timeout=None, max_connections=DEFAULT_MAX_CONNECTIONS):
+        self.timeout = timeout or self.DEFAULT_TIMEOUT
+        self.max_connections = max_connections
+        self.slots = None
+
+    async def probe(self, host, timeout=None):
+        raise NotImplementedError
+
+    def close(self):
+        """Release anything held across probes."""
+
+    async def first_success(self, host, ports, timeout):
+        """Try every port concurrently, True as soon as one answers."""
+        if self.slots is None and self.max_connections:
+            # created on first use so it belongs to the running loop
+            self.slots = asyncio.Semaphore(self.max_connections)
+
+        metrics.probes += 1
+        attempts = [asyncio.ensure_future(self.attempt_port(host, port, timeout)) for port in ports]
+        failures = []
+
+        try:
+            for attempt in asyncio.as_completed(attempts):
+                result = await attempt
+                if result is True:
+                    return True
+                failures.append(result)
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+            await asyncio.gather(*attempts, return_exceptions=True)
+
+        if any(isinstance(failure, asyncio.TimeoutError) for failure in failures):
+            metrics.timeouts += 1
+        else:
+            metrics.errors += 1
+
+        logger.debug("%s probe failed on ports %s: %s", host, ports, failures[-1] if failures else None)
+        return False
+
+    async def attempt_port(self, host, port, timeout):
+        """True if the port answered, otherwise the error that ended the attempt."""
+        try:
+            if self.slots is None:
+                return await self.check_port(host, port, timeout)
+
+            async with self.slots:
+                return await self.check_port(host, port, timeout)
+        except (asyncio.TimeoutError, OSError) as e:
+            return e
+
+    async def check_port(self, host, port, timeout):
+        raise NotImplementedError
+
+    def open_socket(self, host, kind):
+        sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, kind)
+        sock.setblocking(False)
+        return sock
+
+
+class TCPConnectBackend(ProbeBackend):
+    """
+    TCP connect to a few ports, needs no privileges and gets through most ICMP filtering.
+
+    A completed handshake and a refused connection (RST) both mean the host
+    is up; only silence or an unreachable error until timeout counts as down.
+    """
+    DEFAULT_TIMEOUT = DEFAULT_TCP_TIMEOUT_SECONDS
+
+    def __init__(self, timeout=None, max_connections=DEFAULT_MAX_CONNECTIONS, ports=DEFAULT_TCP_PORTS):
+        super().__init__(timeout, max_connections)
+        self.ports = tuple(ports)
+
+    async def probe(self, host, timeout=None):
+        return await self.first_success(host, self.ports, timeout or self.timeout)
+
+    async def check_port(self, host, port, timeout):
+        sock = self.open_socket(host, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, LINGER_RESET)
+
+        try:
+            await asyncio.wait_for(asyncio.get_running_loop().sock_connect(sock, (host, port)), timeout)
+            return True
+        except ConnectionRefusedError:
+            return True
+        finally:
+            sock.close()
+
+
+class UDPBackend(ProbeBackend):
+    """
+    A datagram to a few ports; any reply, or an ICMP port unreachable for a
+    closed port, means the host is up. Hosts that drop the datagram silently
+    look down, so pick ports with services (or a payload) they answer.
+    """
+    DEFAULT_TIMEOUT = DEFAULT_UDP_TIMEOUT_SECONDS
+
+    def __init__(self, timeout=None, max_connections=DEFAULT_MAX_CONNECTIONS, ports=DEFAULT_UDP_PORTS, payload=b""):
+        super().__init__(timeout, max_connections)
+        self.ports = tuple(ports)
+        self.payload = payload
+
+    async def probe(self, host, timeout=None):
+        return await self.first_success(host, self.ports, timeout or self.timeout)
+
+    async def check_port(self, host, port, timeout):
+        loop = asyncio.get_running_loop()
+        sock = self.open_socket(host, socket.SOCK_DGRAM)
+
+        try:
+            # a connected UDP socket gets the port unreachable back as ECONNREFUSED
+            await loop.sock_connect(sock, (host, port))
+            await loop.sock_sendall(sock, self.payload)
+            await asyncio.wait_for(loop.sock_recv(sock, 1), timeout)
+            return True
+        except ConnectionRefusedError:
+            return True
+        finally:
+            sock.close()
+
+
+class AdaptiveTimeouts(ProbeBackend):
+    """
+    Wraps a backend so every probe waits the timeout an RTTEstimator picks
+    for its host, and every reply feeds the estimator its round trip time.
+    """
+    def __init__(self, backend, estimator):
+        super().__init__(backend.timeout, None)
+        self.backend = backend
+        self.estimator = estimator
+
+    async def probe(self, host, timeout=None):
+        started = time.perf_counter()
+        result = await self.backend.probe(host, timeout or self.estimator.timeout(host))
+
+        if result:
+            self.estimator.observe(host, time.perf_counter() - started)
+
+        return result
+
+    def close(self):
+        self.backend.close()
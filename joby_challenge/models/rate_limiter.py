@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import time
+from joby_challenge.utils import subnet
+
+logger = logging.getLogger("RateLimiter")
+
+# bucket depth as seconds worth of tokens, i.e. how much burst is tolerated
+DEFAULT_BURST_SECONDS = 0.1
+# idle per-subnet buckets are dropped once there are more than this many
+MAX_SUBNET_BUCKETS = 4096
+
+
+class TokenBucket:
+    """
+    Token bucket that hands out reservations instead of polling.
+
+    Every reservation takes a token straight away, letting the balance go
+    negative, and returns how long the caller has to wait for it. Callers
+    are therefore served in arrival order with no busy waiting.
+    """
+    def __init__(self, rate, burst=None):
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+
+        self.rate = rate
+        self.burst = burst or max(1.0, rate * DEFAULT_BURST_SECONDS)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self):
+        """Take a token, returns seconds to wait before using it."""
+        self.refill(time.monotonic())
+        self.tokens -= 1
+
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def idle(self):
+        """True once the bucket has refilled completely, so nobody is waiting on it."""
+        self.refill(time.monotonic())
+        return self.tokens >= self.burst
+
+
+class RateLimiter:
+    """
+    Packets per second cap shared by every worker, with an optional extra cap
+    per destination /24 so no single router sees a burst.
+    """
+    def __init__(self, packets_per_second=None, subnet_packets_per_second=None):
+        self.bucket = TokenBucket(packets_per_second) if packets_per_second else None
+        self.subnet_rate = subnet_packets_per_second
+        self.subnet_buckets = {}
+        self.waited = 0.0
+
+    def subnet_bucket(self, address):
+        key = subnet(address)
+        bucket = self.subnet_buckets.get(key)
+
+        if bucket is None:
+            if len(self.subnet_buckets) >= MAX_SUBNET_BUCKETS:
+                self.prune()
+
+            bucket = self.subnet_buckets[key] = TokenBucket(self.subnet_rate)
+
+        return bucket
+
+    def prune(self):
+        """Forget full buckets, a new bucket for the same subnet behaves identically."""
+        for key in [key for key, bucket in self.subnet_buckets.items() if bucket.idle()]:
+            del self.subnet_buckets[key]
+
+    async def acquire(self, address):
+        """Wait until a packet to address is allowed by the subnet cap, then the global cap."""
+        # the subnet wait comes first so it doesn't sit on a reserved global token
+        if self.subnet_rate:
+            await self.wait(self.subnet_bucket(address).reserve())
+
+        if self.bucket:
+            await self.wait(self.bucket.reserve())
+
+    async def wait(self, delay):
+        if delay > 0:
+            self.waited += delay
+            await asyncio.sleep(delay)
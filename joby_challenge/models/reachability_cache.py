@@ -0,0 +1,164 @@
+import itertools
+import logging
+import socket
+import sqlite3
+import time
+
+logger = logging.getLogger("ReachabilityCache")
+
+DEFAULT_CACHE_TTL_SECONDS = 3600.0
+# results that differ from the cached one are trusted for this long, 0 re-probes them next run
+DEFAULT_CHANGED_TTL_SECONDS = 0.0
+# addresses per SELECT ... IN (...), under SQLite's historical 999 parameter limit
+LOOKUP_BATCH_SIZE = 500
+# probe results buffered before they are written in one transaction
+WRITE_BATCH_SIZE = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reachability (
+    address BLOB PRIMARY KEY,
+    reachable INTEGER NOT NULL,
+    checked_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID
+"""
+
+# a result that flips the cached state gets the short changed TTL, SET sees the old row values
+UPSERT = """
+INSERT INTO reachability (address, reachable, checked_at, expires_at)
+VALUES (:address, :reachable, :checked_at, :checked_at + :ttl)
+ON CONFLICT(address) DO UPDATE SET
+    expires_at = CASE
+        WHEN reachable != excluded.reachable THEN excluded.checked_at + :changed_ttl
+        ELSE excluded.expires_at
+    END,
+    reachable = excluded.reachable,
+    checked_at = excluded.checked_at
+"""
+
+
+def pack_address(ip_address):
+    """Packed network order bytes of an address, 4 for IPv4 and 16 for IPv6."""
+    if ":" in ip_address:
+        return socket.inet_pton(socket.AF_INET6, ip_address)
+
+    return socket.inet_pton(socket.AF_INET, ip_address)
+
+
+class ReachabilityCache:
+    """
+    On-disk reachability results with a TTL per entry, for incremental rescans.
+
+    Entries are keyed by packed address bytes in a WITHOUT ROWID SQLite table.
+    Targets with a fresh entry are answered from the cache, everything else is
+    probed and written back in batches.
+    """
+    def __init__(self, path, ttl=DEFAULT_CACHE_TTL_SECONDS, changed_ttl=DEFAULT_CHANGED_TTL_SECONDS):
+        self.path = path
+        self.ttl = ttl
+        self.changed_ttl = changed_ttl
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(SCHEMA)
+        self.pending = []
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, addresses):
+        """
+        Fresh cached results for a batch of addresses.
+
+        Returns:
+            dict of address to reachable for the addresses with an unexpired entry
+        """
+        packed = {pack_address(address): address for address in addresses}
+        placeholders = ",".join("?" * len(packed))
+
+        rows = self.connection.execute(
+            f"SELECT address, reachable FROM reachability WHERE expires_at > ? AND address IN ({placeholders})",
+            [time.time(), *packed],
+        )
+
+        return {packed[address]: bool(reachable) for address, reachable in rows}
+
+    def filter(self, addresses, on_hit):
+        """
+        Yield only the addresses that need probing.
+
+        Fresh cached results are handed to on_hit(address, reachable) instead,
+        so they reach the collector through the same path as probe results.
+        """
+        addresses = iter(addresses)
+
+        while True:
+            batch = list(itertools.islice(addresses, LOOKUP_BATCH_SIZE))
+            if not batch:
+                return
+
+            yield from self.filter_batch(batch, on_hit)
+
+    async def afilter(self, addresses, on_hit):
+        """filter() for an async iterable of addresses."""
+        batch = []
+
+        async for address in addresses:
+            batch.append(address)
+
+            if len(batch) == LOOKUP_BATCH_SIZE:
+                for address in self.filter_batch(batch, on_hit):
+                    yield address
+                batch = []
+
+        for address in self.filter_batch(batch, on_hit):
+            yield address
+
+    def filter_batch(self, batch, on_hit):
+        """Addresses of batch without a fresh cached result, on_hit gets the others."""
+        if not batch:
+            return []
+
+        fresh = self.lookup(batch)
+        self.hits += len(fresh)
+        self.misses += len(batch) - len(fresh)
+
+        misses = []
+        for address in batch:
+            if address in fresh:
+                on_hit(address, fresh[address])
+            else:
+                misses.append(address)
+
+        return misses
+
+    def record(self, ip_address, reachable):
+        """Queue a probe result, written once a batch has built up."""
+        self.pending.append((ip_address, reachable, time.time()))
+
+        if len(self.pending) >= WRITE_BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+
+        with self.connection:
+            self.connection.executemany(UPSERT, (
+                {
+                    "address": pack_address(address),
+                    "reachable": int(bool(reachable)),
+                    "checked_at": checked_at,
+                    "ttl": self.ttl,
+                    "changed_ttl": self.changed_ttl,
+                }
+                for address, reachable, checked_at in self.pending
+            ))
+
+        self.pending = []
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    def log_stats(self):
+        total = self.hits + self.misses
+        hit_ratio = self.hits / total if total else 0.0
+        logger.info(f"Reachability cache {self.path}: {self.hits} hits, {self.misses} misses ({hit_ratio:.0%} hit rate)")
@@ -0,0 +1,4 @@
+# end of scan reports, kept apart from the orchestrator so --report can list them without importing the scanner
+REPORT_MISMATCHES = "mismatches"
+REPORT_SIGNATURES = "signatures"
+REPORTS = [REPORT_MISMATCHES, REPORT_SIGNATURES]
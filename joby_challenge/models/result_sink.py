@@ -0,0 +1,148 @@
+import asyncio
+import collections
+import csv
+import io
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("ResultSink")
+
+# records buffered before they are handed to the writer thread as one batch
+DEFAULT_BATCH_SIZE = 1000
+# batches allowed to queue up behind the writer thread before the scan waits for it
+MAX_PENDING_BATCHES = 8
+
+CSV_FIELDS = ["address", "reachable", "time"]
+
+
+class ResultSink:
+    """
+    Buffered file writer fed one result at a time from the pool's result callback.
+
+    Records are collected in memory and every batch is formatted and written by
+    one writer thread, so batches land in order and the event loop never waits
+    on the disk. Once MAX_PENDING_BATCHES are queued behind the writer the sink
+    is backlogged, and callers await drain() before writing more, which slows
+    the scan to disk speed rather than buffering without bound.
+    """
+    def __init__(self, path, batch_size=DEFAULT_BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.file = open(path, "w", newline="")
+        self.buffer = []
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ResultSink")
+        self.writes = collections.deque()
+        self.written = 0
+
+        header = self.header()
+        if header:
+            self.file.write(header)
+
+    def header(self):
+        return ""
+
+    def format(self, records):
+        """Text for a batch of records."""
+        raise NotImplementedError
+
+    def write(self, address, reachable):
+        """Record a probe result."""
+        self.add((address, reachable, time.time()))
+
+    def write_mismatch(self, results):
+        """Record a finalized mismatch, a map of address to reachable, ignored by result sinks."""
+
+    def add(self, record):
+        self.buffer.append(record)
+
+        if len(self.buffer) >= self.batch_size:
+            self.submit()
+
+    def submit(self):
+        """Hand the buffered records to the writer thread."""
+        if not self.buffer:
+            return
+
+        records, self.buffer = self.buffer, []
+
+        while self.writes and self.writes[0].done():
+            self.writes.popleft().result()
+
+        self.writes.append(self.executor.submit(self.write_records, records))
+
+    @property
+    def backlogged(self):
+        return len(self.writes) >= MAX_PENDING_BATCHES
+
+    async def drain(self):
+        """Wait, without blocking the event loop, until the writer thread is no longer backlogged."""
+        while self.backlogged:
+            await asyncio.wrap_future(self.writes[0])
+            # other drainers were waiting on the same batch, only finished ones are popped
+            while self.writes and self.writes[0].done():
+                self.writes.popleft().result()
+
+    def write_records(self, records):
+        self.file.write(self.format(records))
+        self.written += len(records)
+
+    async def flush(self):
+        """Write out everything recorded so far."""
+        self.submit()
+        self.writes.append(self.executor.submit(self.file.flush))
+
+        writes, self.writes = list(self.writes), collections.deque()
+        await asyncio.gather(*(asyncio.wrap_future(write) for write in writes))
+
+    async def close(self):
+        await self.flush()
+        await asyncio.wrap_future(self.executor.submit(self.file.close))
+        self.executor.shutdown()
+
+        logger.info(f"Wrote {self.written} records to {self.path}")
+
+
+class NDJSONSink(ResultSink):
+    """One JSON object per probe result and line."""
+    def format(self, records):
+        return "".join(
+            json.dumps({"address": address, "reachable": reachable, "time": round(checked_at, 3)}) + "\n"
+            for address, reachable, checked_at in records
+        )
+
+
+class CSVSink(ResultSink):
+    """Probe results as CSV rows with a header line."""
+    def header(self):
+        return ",".join(CSV_FIELDS) + "\r\n"
+
+    def format(self, records):
+        text = io.StringIO()
+        writer = csv.writer(text)
+        writer.writerows(
+            (address, int(reachable), f"{checked_at:.3f}") for address, reachable, checked_at in records
+        )
+
+        return text.getvalue()
+
+
+class MismatchSink(ResultSink):
+    """Only mismatches, one JSON object of address to reachable per line."""
+    def write(self, address, reachable):
+        pass
+
+    def write_mismatch(self, results):
+        self.add(results)
+
+    def format(self, records):
+        return "".join(json.dumps(results) + "\n" for results in records)
+
+
+def open_sink(path, batch_size=DEFAULT_BATCH_SIZE):
+    """Result sink for path, CSV for a .csv file and NDJSON for anything else."""
+    if str(path).lower().endswith(".csv"):
+        return CSVSink(path, batch_size)
+
+    return NDJSONSink(path, batch_size)
@@ -0,0 +1,248 @@
+import bisect
+import functools
+import ipaddress
+import logging
+import operator
+import struct
+import zlib
+from joby_challenge.models.bitmap import Bitmap, iter_bits, popcount
+from joby_challenge.utils import ip_to_int, int_to_ip
+
+logger = logging.getLogger("OffsetResultStore")
+
+# network count, then per network the compressed length of its probed and reachable bitmaps
+DUMP_HEADER = struct.Struct("!I")
+DUMP_LENGTHS = struct.Struct("!II")
+
+# networks up to this many addresses get their bitmaps allocated up front,
+# anything bigger grows on demand as offsets are set
+PREALLOCATE_MAX_ADDRESSES = 1 << 24
+
+
+def union(bitmaps):
+    """OR a sequence of Bitmaps together into one integer."""
+    return functools.reduce(operator.or_, (bitmap.to_int() for bitmap in bitmaps), 0)
+
+
+def intersection(bitmaps):
+    """AND a sequence of Bitmaps together into one integer."""
+    values = [bitmap.to_int() for bitmap in bitmaps]
+    return functools.reduce(operator.and_, values) if values else 0
+
+
+class OffsetResultStore:
+    """
+    Reachability results keyed by host offset within each network.
+
+    Every network gets three bitmaps (probed, reachable, failed) indexed by
+    address - network address, so counterpart hosts in different networks
+    share an index and whole networks can be compared with integer bit operations.
+
+    With offsets (sparse targets, e.g. IPv6 interface identifiers) the bitmaps
+    are indexed by position in the sorted offsets instead, so a /64 costs as
+    many bits as it has targets. Positions stand in for offsets everywhere
+    else; offset_at() maps them back.
+    """
+    def __init__(self, networks, offsets=None):
+        self.networks = []
+
+        for network in networks:
+            try:
+                self.networks.append(ipaddress.ip_network(network, strict=False))
+            except ValueError:
+                # IPAddressHandler already reports unparseable targets
+                logger.debug(f"Not tracking unparseable network {network}")
+
+        # sorted target offsets and offset -> position, None for dense networks
+        self.offsets = sorted(set(offsets)) if offsets is not None else None
+        self.positions = {offset: position for position, offset in enumerate(self.offsets)} if offsets is not None else None
+
+        sizes = [
+            network.num_addresses if network.num_addresses <= PREALLOCATE_MAX_ADDRESSES else 0
+            for network in self.networks
+        ]
+        if self.offsets is not None:
+            sizes = [len(self.offsets)] * len(self.networks)
+        self.probed = [Bitmap(size) for size in sizes]
+        self.reachable = [Bitmap(size) for size in sizes]
+        self.failed = [Bitmap(size) for size in sizes]
+
+        # per IP version, network (start, end, index) sorted by start for bisect lookups
+        self.bounds = {4: [], 6: []}
+        for index, network in enumerate(self.networks):
+            self.bounds[network.version].append(
+                (int(network.network_address), int(network.broadcast_address), index)
+            )
+        for bounds in self.bounds.values():
+            bounds.sort()
+        self.starts = {version: [bound[0] for bound in bounds] for version, bounds in self.bounds.items()}
+
+    def locate(self, ip_address):
+        """
+        Find the network an address belongs to.
+
+        Returns:
+            (network index, host offset), or None if no network contains the address,
+            for sparse stores (network index, position), or None if it isn't a target offset
+        """
+        version = 6 if ":" in ip_address else 4
+        address = ip_to_int(ip_address)
+        bounds = self.bounds[version]
+
+        position = bisect.bisect_right(self.starts[version], address) - 1
+
+        # walk back in case networks overlap
+        while position >= 0:
+            start, end, index = bounds[position]
+            if address <= end:
+                if self.positions is None:
+                    return index, address - start
+
+                offset_position = self.positions.get(address - start)
+                return None if offset_position is None else (index, offset_position)
+            position -= 1
+
+        return None
+
+    def add(self, ip_address, reachable):
+        """
+        Record a result, later results for the same address replace earlier ones.
+
+        Returns:
+            (network index, host offset), or None if the address isn't tracked
+        """
+        location = self.locate(ip_address)
+
+        if location is None:
+            logger.warning(f"{ip_address} is not in any scanned network, dropping result")
+            return None
+
+        index, offset = location
+        self.set(index, offset, reachable)
+
+        return location
+
+    def set(self, index, offset, reachable):
+        self.probed[index].set(offset)
+
+        if reachable:
+            self.reachable[index].set(offset)
+            self.failed[index].clear(offset)
+        else:
+            self.failed[index].set(offset)
+            self.reachable[index].clear(offset)
+
+    def offset_at(self, position):
+        """Host offset stored at a bitmap position, the position itself for dense stores."""
+        return position if self.offsets is None else self.offsets[position]
+
+    def address(self, index, offset):
+        network = self.networks[index]
+        return int_to_ip(int(network.network_address) + self.offset_at(offset), network.version)
+
+    def result(self, index, offset):
+        """True/False for a probed offset, None if it hasn't been probed."""
+        if offset not in self.probed[index]:
+            return None
+
+        return offset in self.reachable[index]
+
+    def results_at(self, offset):
+        """Map of address to reachability for every network that probed this offset."""
+        return {
+            self.address(index, offset): offset in self.reachable[index]
+            for index in range(len(self.networks))
+            if offset in self.probed[index]
+        }
+
+    def mismatch_offsets(self):
+        """
+        Offsets reachable in at least one network and unreachable in another,
+        as an integer bitmap.
+        """
+        return union(self.reachable) & union(self.failed)
+
+    def mismatches(self):
+        return [self.results_at(offset) for offset in iter_bits(self.mismatch_offsets())]
+
+    def as_dict(self):
+        """Results in the collector's {offset: {address: reachable}} layout."""
+        return {str(self.offset_at(offset)): self.results_at(offset) for offset in iter_bits(union(self.probed))}
+
+    def iter_results(self):
+        """Yield (address, reachable) for every probed host, network by network."""
+        for index, probed in enumerate(self.probed):
+            reachable = self.reachable[index]
+
+            for offset in probed:
+                yield self.address(index, offset), offset in reachable
+
+    def signature_groups(self):
+        """
+        Group the offsets probed in every network by reachability signature.
+
+        Bit i of a signature is set when the offset was reachable in network i.
+        Groups are built by splitting on one network's reachable bitmap at a time,
+        so the work depends on the number of distinct signatures, never on 2**N.
+
+        Returns:
+            dict of signature to (host count, offsets as an integer bitmap)
+        """
+        groups = {0: intersection(self.probed)} if self.networks else {}
+
+        for index, reachable in enumerate(self.reachable):
+            reachable = reachable.to_int()
+            bit = 1 << index
+            split = {}
+
+            for signature, offsets in groups.items():
+                up = offsets & reachable
+                down = offsets & ~reachable
+
+                if up:
+                    split[signature | bit] = up
+                if down:
+                    split[signature] = down
+
+            groups = split
+
+        return {signature: (popcount(offsets), offsets) for signature, offsets in groups.items()}
+
+    def dump(self):
+        """
+        Pack the results into compressed bitmaps.
+
+        failed is implied by probed & ~reachable, so only two bitmaps per network
+        are written. Used to ship results between processes.
+        """
+        chunks = [DUMP_HEADER.pack(len(self.networks))]
+
+        for probed, reachable in zip(self.probed, self.reachable):
+            probed = zlib.compress(probed.to_bytes())
+            reachable = zlib.compress(reachable.to_bytes())
+            chunks += [DUMP_LENGTHS.pack(len(probed), len(reachable)), probed, reachable]
+
+        return b"".join(chunks)
+
+    def merge(self, data):
+        """OR the results from a dump() of a store over the same networks into this one."""
+        (count,) = DUMP_HEADER.unpack_from(data)
+        if count != len(self.networks):
+            raise ValueError(f"Expected results for {len(self.networks)} networks, got {count}")
+
+        position = DUMP_HEADER.size
+
+        for index in range(count):
+            probed_length, reachable_length = DUMP_LENGTHS.unpack_from(data, position)
+            position += DUMP_LENGTHS.size
+
+            probed = int.from_bytes(zlib.decompress(data[position:position + probed_length]), "little")
+            position += probed_length
+            reachable = int.from_bytes(zlib.decompress(data[position:position + reachable_length]), "little")
+            position += reachable_length
+
+            failed = probed & ~reachable
+            # results in the dump replace whatever this store had for the same offsets
+            self.probed[index] = Bitmap.from_int(self.probed[index].to_int() | probed)
+            self.reachable[index] = Bitmap.from_int(self.reachable[index].to_int() & ~failed | reachable)
+            self.failed[index] = Bitmap.from_int(self.failed[index].to_int() & ~reachable | failed)
@@ -0,0 +1,124 @@
+import logging
+from joby_challenge.models.metrics import registry as metrics
+from joby_challenge.utils import subnet, DEFAULT_PING_TIMEOUT_SECONDS
+
+logger = logging.getLogger("RTTEstimator")
+
+# adaptive timeouts never go below this, event loop lag under load is a few ms on its own
+DEFAULT_MIN_TIMEOUT_SECONDS = 0.05
+DEFAULT_MAX_TIMEOUT_SECONDS = DEFAULT_PING_TIMEOUT_SECONDS
+# RFC 6298 gains: weight of a new sample in the smoothed RTT and in the deviation
+RTT_ALPHA = 0.125
+RTT_BETA = 0.25
+# timeout = smoothed RTT + RTT_K * deviation
+RTT_K = 4
+
+
+class RTTEstimate:
+    """Smoothed RTT and mean deviation, Jacobson/Karels as in RFC 6298."""
+    __slots__ = ("srtt", "rttvar", "samples")
+
+    def __init__(self):
+        self.srtt = None
+        self.rttvar = None
+        self.samples = 0
+
+    def observe(self, rtt):
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar += RTT_BETA * (abs(self.srtt - rtt) - self.rttvar)
+            self.srtt += RTT_ALPHA * (rtt - self.srtt)
+        self.samples += 1
+
+    def timeout(self):
+        return self.srtt + RTT_K * self.rttvar
+
+
+class RTTEstimator:
+    """
+    Probe timeouts derived from the round trip times measured so far.
+
+    Every reply updates the estimate of its destination subnet (a /24 for
+    IPv4, a /64 for IPv6) and a scan wide one. A probe waits the estimate of
+    its subnet, or the scan wide one while its subnet hasn't answered yet,
+    clamped to [min_timeout, max_timeout]. Before the first reply it waits
+    max_timeout, so nothing is cut short until there is data.
+
+    Only replies are samples: a timeout says nothing about the RTT, and the
+    ceiling keeps a slow subnet from being timed out for good.
+    """
+    def __init__(self, min_timeout=DEFAULT_MIN_TIMEOUT_SECONDS, max_timeout=DEFAULT_MAX_TIMEOUT_SECONDS):
+        if not 0 < min_timeout <= max_timeout:
+            raise ValueError(f"Expected 0 < min_timeout <= max_timeout, got {min_timeout} and {max_timeout}")
+
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.subnets = {}
+        self.overall = RTTEstimate()
+
+        # effective timeouts handed out, for the end of scan report
+        self.chosen = 0
+        self.chosen_sum = 0.0
+        self.chosen_min = None
+        self.chosen_max = None
+
+    def estimate(self, host):
+        """The estimate timeouts for host come from, None before any reply."""
+        estimate = self.subnets.get(subnet(host))
+        if estimate is not None:
+            return estimate
+
+        return self.overall if self.overall.samples else None
+
+    def timeout(self, host):
+        """Timeout for the next probe of host."""
+        estimate = self.estimate(host)
+        timeout = self.max_timeout if estimate is None else min(max(estimate.timeout(), self.min_timeout), self.max_timeout)
+
+        metrics.timeout.observe(timeout)
+        self.chosen += 1
+        self.chosen_sum += timeout
+        if self.chosen_min is None or timeout < self.chosen_min:
+            self.chosen_min = timeout
+        if self.chosen_max is None or timeout > self.chosen_max:
+            self.chosen_max = timeout
+
+        return timeout
+
+    def observe(self, host, rtt):
+        """Record the round trip time of a reply from host."""
+        key = subnet(host)
+        estimate = self.subnets.get(key)
+        if estimate is None:
+            estimate = self.subnets[key] = RTTEstimate()
+
+        estimate.observe(rtt)
+        self.overall.observe(rtt)
+
+    def stats(self):
+        return {
+            "probes": self.chosen,
+            "mean_timeout": self.chosen_sum / self.chosen if self.chosen else None,
+            "min_timeout": self.chosen_min,
+            "max_timeout": self.chosen_max,
+            "subnets": len(self.subnets),
+            "srtt": self.overall.srtt,
+        }
+
+    def log_stats(self):
+        if not self.chosen:
+            return
+
+        stats = self.stats()
+        logger.info(
+            "Adaptive timeouts: %d probes waited %.1f ms on average (%.1f-%.1f ms), "
+            "%d subnets answered, smoothed RTT %s",
+            stats["probes"],
+            stats["mean_timeout"] * 1000,
+            stats["min_timeout"] * 1000,
+            stats["max_timeout"] * 1000,
+            stats["subnets"],
+            "n/a" if stats["srtt"] is None else f"{stats['srtt'] * 1000:.1f} ms",
+        )
@@ -0,0 +1,161 @@
+import collections
+import ipaddress
+import json
+import logging
+import mmap
+import struct
+from joby_challenge.models.bitmap import popcount
+from joby_challenge.utils import int_to_ip
+
+logger = logging.getLogger("Snapshot")
+
+SNAPSHOT_MAGIC = b"JOBYSNAP"
+SNAPSHOT_VERSION = 1
+# magic, format version, reserved, network count, JSON header length
+PREAMBLE = struct.Struct("!8sHHII")
+# per network: file offset of its bitmaps and the byte length of each
+SECTION = struct.Struct("!QQ")
+# bitmaps start on this boundary so they can be viewed straight out of the mapping
+ALIGNMENT = 8
+
+# bitmaps stored per network, in file order
+PROBED = 0
+REACHABLE = 1
+
+NetworkDiff = collections.namedtuple(
+    "NetworkDiff", ["network", "probed", "came_up", "went_down", "came_up_count", "went_down_count"]
+)
+
+
+def align(position):
+    return -(-position // ALIGNMENT) * ALIGNMENT
+
+
+def write_snapshot(path, store, metadata=None):
+    """
+    Save an OffsetResultStore as a snapshot file.
+
+    Layout: a fixed preamble, one section entry per network, a JSON header
+    with the network CIDRs and scan metadata, then for each network its probed
+    and reachable bitmaps, uncompressed, little endian and indexed by host offset.
+    """
+    if store.offsets is not None:
+        raise ValueError("Snapshots are indexed by host offset, results of sparse targets can't be saved")
+
+    header = json.dumps({
+        "networks": [str(network) for network in store.networks],
+        "metadata": metadata or {},
+    }).encode()
+
+    lengths = [
+        max(len(probed.data), len(reachable.data))
+        for probed, reachable in zip(store.probed, store.reachable)
+    ]
+
+    position = align(PREAMBLE.size + SECTION.size * len(lengths) + len(header))
+    sections = []
+    for length in lengths:
+        sections.append((position, length))
+        position = align(position + 2 * length)
+
+    with open(path, "wb") as file:
+        file.write(PREAMBLE.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, len(lengths), len(header)))
+        for section in sections:
+            file.write(SECTION.pack(*section))
+        file.write(header)
+
+        for (offset, length), probed, reachable in zip(sections, store.probed, store.reachable):
+            file.write(bytes(offset - file.tell()))
+            # bitmaps can differ in length when they grew on demand, pad both to the same size
+            file.write(probed.data.ljust(length, b"\0"))
+            file.write(reachable.data.ljust(length, b"\0"))
+
+    logger.info(f"Saved snapshot of {len(lengths)} networks to {path} ({position} bytes)")
+
+
+class Snapshot:
+    """
+    Read-only, memory mapped view of a snapshot file.
+
+    Only the preamble and header are parsed up front. A network's bitmaps are
+    read from the mapping when asked for, as integers for whole-bitmap operations.
+    """
+    def __init__(self, path):
+        self.path = path
+
+        with open(path, "rb") as file:
+            self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, count, header_length = PREAMBLE.unpack_from(self.mmap)
+
+        if magic != SNAPSHOT_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a snapshot file")
+        if version != SNAPSHOT_VERSION:
+            self.close()
+            raise ValueError(f"{path} has snapshot format version {version}, expected {SNAPSHOT_VERSION}")
+
+        self.sections = [
+            SECTION.unpack_from(self.mmap, PREAMBLE.size + SECTION.size * index) for index in range(count)
+        ]
+
+        header_start = PREAMBLE.size + SECTION.size * count
+        header = json.loads(self.mmap[header_start:header_start + header_length])
+
+        self.networks = [ipaddress.ip_network(network) for network in header["networks"]]
+        self.metadata = header["metadata"]
+
+    def bitmap(self, index, kind):
+        """One of a network's bitmaps (PROBED or REACHABLE) as an integer, bit n for host offset n."""
+        offset, length = self.sections[index]
+        start = offset + kind * length
+
+        return int.from_bytes(self.mmap[start:start + length], "little")
+
+    def index(self, network):
+        """Position of a network in this snapshot, None if it isn't in it."""
+        network = ipaddress.ip_network(network)
+        return self.networks.index(network) if network in self.networks else None
+
+    def close(self):
+        self.mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def diff_snapshots(old, new):
+    """
+    Reachability changes between two snapshots, for the networks in both.
+
+    Only offsets probed in both snapshots are compared.
+
+    Returns:
+        list of NetworkDiff, came_up and went_down as integer offset bitmaps
+    """
+    diffs = []
+
+    for old_index, network in enumerate(old.networks):
+        new_index = new.index(network)
+
+        if new_index is None:
+            logger.info(f"{network} is not in {new.path}, skipping it")
+            continue
+
+        probed = old.bitmap(old_index, PROBED) & new.bitmap(new_index, PROBED)
+        old_reachable = old.bitmap(old_index, REACHABLE) & probed
+        new_reachable = new.bitmap(new_index, REACHABLE) & probed
+
+        came_up = new_reachable & ~old_reachable
+        went_down = old_reachable & ~new_reachable
+
+        diffs.append(NetworkDiff(network, popcount(probed), came_up, went_down, popcount(came_up), popcount(went_down)))
+
+    return diffs
+
+
+def offset_address(network, offset):
+    return int_to_ip(int(network.network_address) + offset, network.version)
@@ -0,0 +1,278 @@
+import asyncio
+import bisect
+import contextlib
+import copy
+import ipaddress
+import itertools
+import logging
+import sys
+from joby_challenge.models.bitmap import Bitmap
+from joby_challenge.models.exclusions import Exclusions, COMMENT_PREFIX
+from joby_challenge.utils import ip_to_int, int_to_ip
+
+logger = logging.getLogger("TargetSources")
+
+# --targets-file value that reads from standard input
+STDIN_SOURCE = "-"
+# streamed targets are deduplicated with one bit per address of their network, so only networks up to this size
+MAX_STREAMED_NETWORK_ADDRESSES = 1 << 32
+# lines read per trip to the reader thread
+READ_BATCH_LINES = 4096
+# what happened to the lines of a streamed targets file
+STATS = ("read", "yielded", "duplicate", "outside", "excluded", "invalid")
+
+
+def parse_offset(value):
+    """Host offset from an integer ("5", "0x1f") or an IPv6 interface identifier ("::1", "::a:b")."""
+    if ":" in value:
+        return int(ipaddress.IPv6Address(value))
+
+    return int(value, 0)
+
+
+def too_large_to_stream(networks):
+    """Parseable networks with more addresses than StreamedTargets can deduplicate in."""
+    oversized = []
+
+    for network in networks:
+        try:
+            network = ipaddress.ip_network(network, strict=False)
+        except ValueError:
+            continue
+
+        if network.num_addresses > MAX_STREAMED_NETWORK_ADDRESSES:
+            oversized.append(network)
+
+    return oversized
+
+
+def hitlist_offsets(addresses, networks):
+    """
+    Host offsets of hitlist addresses within the network that contains them.
+
+    Addresses outside every network are dropped with a warning.
+
+    Raises:
+        ValueError: for a line that isn't an IP address
+    """
+    parsed = [ipaddress.ip_network(network, strict=False) for network in networks]
+    offsets = set()
+    dropped = 0
+
+    for address in addresses:
+        address = ipaddress.ip_address(address)
+
+        for network in parsed:
+            if address in network:
+                offsets.add(int(address) - int(network.network_address))
+                break
+        else:
+            dropped += 1
+
+    if dropped:
+        logger.warning("%d hitlist addresses are outside every network, ignoring them", dropped)
+
+    return offsets
+
+
+def read_batch(lines):
+    return list(itertools.islice(lines, READ_BATCH_LINES))
+
+
+class OffsetTargets:
+    """
+    Sparse targets: the same host offsets probed in every network.
+
+    Nothing is enumerated, so an IPv6 /64 with a thousand known interface
+    identifiers is a thousand targets per network and memory follows the
+    offsets, not the prefix size. Offsets come from explicit lists, hitlists
+    (hitlist_offsets) or patterns such as ::1 across every prefix.
+
+    Iteration goes offset by offset, so counterpart hosts of the networks come
+    out next to each other like LazyIPAddresses with interleave.
+    """
+    def __init__(self, networks, offsets, skips=None, exclusions=None):
+        # (IP version, network address int, number of addresses)
+        self.networks = []
+        for network in networks:
+            try:
+                network = ipaddress.ip_network(network, strict=False)
+            except ValueError as e:
+                logger.error(f"Failed to parse network {network}: {str(e)}")
+                continue
+
+            self.networks.append((network.version, int(network.network_address), network.num_addresses))
+
+        self.offsets = sorted(set(offsets))
+        self.exclusions = exclusions.copy() if exclusions else Exclusions()
+        self.exclusions.add_last_octets(skips)
+        self.interleave = True
+
+    @property
+    def ranges(self):
+        """Whole networks as (IP version, first int, last int), aligned with the result store's networks."""
+        return [(version, base, base + size - 1) for version, base, size in self.networks]
+
+    def __iter__(self):
+        exclusions = self.exclusions if self.exclusions else None
+
+        for offset in self.offsets:
+            for version, base, size in self.networks:
+                if offset >= size:
+                    continue
+                if exclusions and exclusions.contains(version, base + offset):
+                    continue
+
+                yield int_to_ip(base + offset, version)
+
+    def __len__(self):
+        return sum(
+            1 for offset in self.offsets for version, base, size in self.networks
+            if offset < size and not self.exclusions.contains(version, base + offset)
+        )
+
+    def shard(self, count):
+        """Split into count OffsetTargets over contiguous slices of the offsets."""
+        shards = []
+
+        for index in range(count):
+            shard = copy.copy(self)
+            shard.offsets = self.offsets[len(self.offsets) * index // count:len(self.offsets) * (index + 1) // count]
+            shards.append(shard)
+
+        return shards
+
+
+class StreamedTargets:
+    """
+    Targets read line by line from a file or stdin (source "-"), as the pool pulls them.
+
+    Nothing is read ahead and no list is built. An address is only yielded
+    the first time it shows up: every network keeps a Bitmap with one bit
+    per host offset, so duplicates cost a bit test however many millions of
+    lines the export has. Addresses outside the networks, excluded or
+    unparseable are counted and left out, the counts are logged at the end.
+
+    Single use, stdin can't be read twice. Networks bigger than 2**32
+    addresses (IPv6 prefixes) can't be tracked per offset, use OffsetTargets.
+    """
+    def __init__(self, source, networks, skips=None, exclusions=None):
+        self.source = source
+        self.exclusions = exclusions.copy() if exclusions else Exclusions()
+        self.exclusions.add_last_octets(skips)
+
+        # per IP version, network (start, end, index) sorted by start for bisect lookups, like OffsetResultStore
+        self.bounds = {4: [], 6: []}
+        self.count = 0
+        oversized = too_large_to_stream(networks)
+        if oversized:
+            raise ValueError(f"{oversized[0]} is too large to deduplicate streamed targets in, use target offsets")
+
+        for network in networks:
+            try:
+                network = ipaddress.ip_network(network, strict=False)
+            except ValueError:
+                # IPAddressHandler already reports unparseable targets
+                continue
+
+            start = int(network.network_address)
+            self.bounds[network.version].append((start, int(network.broadcast_address), self.count))
+            self.count += 1
+
+        for bounds in self.bounds.values():
+            bounds.sort()
+        self.starts = {version: [bound[0] for bound in bounds] for version, bounds in self.bounds.items()}
+
+        self.stats = dict.fromkeys(STATS, 0)
+
+    @contextlib.contextmanager
+    def lines(self):
+        if self.source == STDIN_SOURCE:
+            yield sys.stdin
+            return
+
+        with open(self.source) as file:
+            yield file
+
+    def locate(self, version, address):
+        bounds = self.bounds[version]
+        position = bisect.bisect_right(self.starts[version], address) - 1
+
+        while position >= 0:
+            start, end, index = bounds[position]
+            if address <= end:
+                return index, address - start
+            position -= 1
+
+        return None
+
+    def __iter__(self):
+        self.stats = dict.fromkeys(STATS, 0)
+        seen = [Bitmap() for _ in range(self.count)]
+
+        with self.lines() as lines:
+            yield from self.parse(lines, seen)
+
+        self.log_stats()
+
+    async def __aiter__(self):
+        """Like iterating, with the reads done in a thread so a slow pipe never blocks the event loop."""
+        loop = asyncio.get_running_loop()
+        self.stats = dict.fromkeys(STATS, 0)
+        seen = [Bitmap() for _ in range(self.count)]
+
+        with self.lines() as lines:
+            while True:
+                batch = await loop.run_in_executor(None, read_batch, lines)
+                if not batch:
+                    break
+
+                for address in self.parse(batch, seen):
+                    yield address
+
+        self.log_stats()
+
+    def parse(self, lines, seen):
+        """Addresses in lines not seen before, setting their bits in seen."""
+        exclusions = self.exclusions if self.exclusions else None
+        stats = self.stats
+
+        for line in lines:
+            entry = line.split(COMMENT_PREFIX, 1)[0].strip()
+            if not entry:
+                continue
+            stats["read"] += 1
+
+            version = 6 if ":" in entry else 4
+            try:
+                address = ip_to_int(entry)
+            except (OSError, ValueError):
+                # inet_pton raises ValueError for embedded NUL bytes
+                stats["invalid"] += 1
+                continue
+
+            location = self.locate(version, address)
+            if location is None:
+                stats["outside"] += 1
+                continue
+
+            index, offset = location
+            if offset in seen[index]:
+                stats["duplicate"] += 1
+                continue
+            seen[index].set(offset)
+
+            if exclusions and exclusions.contains(version, address):
+                stats["excluded"] += 1
+                continue
+
+            stats["yielded"] += 1
+            # dotted quads parse back to the same string, IPv6 has many spellings
+            yield int_to_ip(address, 6) if version == 6 else entry
+
+    def log_stats(self):
+        logger.info(
+            "Read %(read)d targets: %(yielded)d probed, %(duplicate)d duplicates, "
+            "%(outside)d outside the networks, %(excluded)d excluded, %(invalid)d unparseable",
+            self.stats,
+        )
@@ -1,13 +1,38 @@
 import logging
-import aioping
 import asyncio
 import functools
+import socket
+from joby_challenge.models.metrics import registry as metrics
 
 logger = logging.getLogger("pings")
 
 DEFAULT_MAX_ATTEMPTS = 3
 DEFAULT_DELAY_SECONDS = 0.5
 DEFAULT_PING_TIMEOUT_SECONDS = 1.0
+# hosts are grouped into a /24 for IPv4 and a /64 for IPv6 wherever they share a path
+IPV4_SUBNET_SHIFT = 8
+IPV6_SUBNET_SHIFT = 64
+
+def ip_to_int(ip_address):
+    """Integer value of an IPv4 or IPv6 address string, without building an ipaddress object."""
+    if ":" in ip_address:
+        return int.from_bytes(socket.inet_pton(socket.AF_INET6, ip_address), "big")
+
+    return int.from_bytes(socket.inet_pton(socket.AF_INET, ip_address), "big")
+
+def subnet(ip_address):
+    """(IP version, subnet number) key of the /24 or /64 an address string is in."""
+    if ":" in ip_address:
+        return 6, ip_to_int(ip_address) >> IPV6_SUBNET_SHIFT
+
+    return 4, ip_to_int(ip_address) >> IPV4_SUBNET_SHIFT
+
+def int_to_ip(value, version=4):
+    """Address string for an integer IP address, the inverse of ip_to_int."""
+    if version == 6:
+        return socket.inet_ntop(socket.AF_INET6, value.to_bytes(16, "big"))
+
+    return socket.inet_ntop(socket.AF_INET, value.to_bytes(4, "big"))
 
 def async_retry(attempts=DEFAULT_MAX_ATTEMPTS, delay=DEFAULT_DELAY_SECONDS):
     """
@@ -32,13 +57,14 @@ def async_retry(attempts=DEFAULT_MAX_ATTEMPTS, delay=DEFAULT_DELAY_SECONDS):
                     caught = str(e)
                 finally:
                     if result == False:
-                        logger.debug(f"Attempt {attempt} failed! {caught}")
+                        logger.debug("Attempt %d failed! %s", attempt, caught)
 
                         if attempt == attempts:
                             raise Exception(f"max attempts({attempts}) reached")
 
                         back_off_seconds = delay * attempt
-                        logger.debug(f"retrying in {back_off_seconds}s...")
+                        logger.debug("retrying in %ss...", back_off_seconds)
+                        metrics.retries += 1
 
                         await asyncio.sleep(back_off_seconds)
                     else:
@@ -49,10 +75,9 @@ def async_retry(attempts=DEFAULT_MAX_ATTEMPTS, delay=DEFAULT_DELAY_SECONDS):
     return decorator
 
 
-@async_retry()
-async def ping_host(host, timeout=DEFAULT_PING_TIMEOUT_SECONDS):
+async def probe_host(host, timeout=DEFAULT_PING_TIMEOUT_SECONDS):
     """
-    Check if a host is reachable via ICMP ping.
+    Single ICMP ping without retries, for callers that schedule retries themselves.
 
     Args:
         host: IP address to ping
@@ -61,14 +86,37 @@ async def ping_host(host, timeout=DEFAULT_PING_TIMEOUT_SECONDS):
     Returns:
         bool: True if host is reachable, False otherwise
     """
-    logger.debug(f"Pinging {host} with aioping")
+    # imported on first use, so unprivileged backends and the CLI's --help never load it
+    import aioping
+
+    logger.debug("Pinging %s with aioping", host)
+    metrics.probes += 1
 
     try:
         await aioping.ping(host, timeout=timeout)
-        logger.info(f"{host} is reachable")
+        logger.info("%s is reachable", host)
         return True
     except Exception as e:
+        if isinstance(e, TimeoutError):
+            metrics.timeouts += 1
+        else:
+            metrics.errors += 1
+
         # Log the specific failure
-        logger.debug(f"{host} ping failed: {str(e)}")
+        logger.debug("%s ping failed: %s", host, e)
         return False
-    
\ No newline at end of file
+
+
+@async_retry()
+async def ping_host(host, timeout=DEFAULT_PING_TIMEOUT_SECONDS):
+    """
+    Check if a host is reachable via ICMP ping.
+
+    Args:
+        host: IP address to ping
+        timeout: Timeout in seconds
+
+    Returns:
+        bool: True if host is reachable, False otherwise
+    """
+    return await probe_host(host, timeout)
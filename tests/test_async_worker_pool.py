@@ -6,11 +6,21 @@ from tests.constants import TEST_EXCEPTION_MESSAGE, TEST_MAX_CONCURRENT
 
 TEST_QUEUE_ITEM = "test_item"
 TEST_ITEMS = ["item1", "item2", "item3"]
+TEST_QUEUE_SIZE = 2
+TEST_STREAM_LENGTH = 1000
 TEST_SLEEP_TIME = 0.1
 WORKER_TEST_CASES = [
     (True, None, True),
     (None, Exception(TEST_EXCEPTION_MESSAGE), False),
 ]
+TEST_RETRY_ATTEMPTS = 3
+TEST_RETRY_DELAY = 0.02
+# target results per call, ending on the final callback result
+RETRY_TEST_CASES = [
+    ([False, False, True], True),
+    ([False, Exception(TEST_EXCEPTION_MESSAGE), True], True),
+    ([False, False, False], False),
+]
 START_TEST_CASES = [(TEST_ITEMS, len(TEST_ITEMS)), ([], 0), (["single_item"], 1)]
 
 
@@ -112,3 +122,147 @@ class TestAsyncWorkerPool:
             for item in items:
                 target_function.assert_any_call(item)
                 result_callback.assert_any_call(item, True)
+
+    @pytest.mark.asyncio
+    async def test_start_with_generator(self, target_function, result_callback):
+        """start consumes any iterable, not just lists"""
+        pool = AsyncWorkerPool(target_function, result_callback, max_concurrent=3)
+
+        await pool.start(item for item in TEST_ITEMS)
+
+        assert target_function.call_count == len(TEST_ITEMS)
+
+    @pytest.mark.parametrize("queue_size", [None, 2])
+    @pytest.mark.asyncio
+    async def test_start_with_async_iterable(self, target_function, result_callback, queue_size):
+        """async iterables are consumed with async for, e.g. targets read in a thread"""
+        async def items():
+            for item in TEST_ITEMS:
+                await asyncio.sleep(0)
+                yield item
+
+        pool = AsyncWorkerPool(target_function, result_callback, max_concurrent=3, queue_size=queue_size)
+
+        await pool.start(items())
+
+        assert target_function.call_count == len(TEST_ITEMS)
+
+    @pytest.mark.parametrize(
+        "items,expected_calls",
+        START_TEST_CASES,
+        ids=["multiple items", "no items", "single item"],
+    )
+    @pytest.mark.asyncio
+    async def test_start_streaming(self, target_function, result_callback, items, expected_calls):
+        """a bounded pool processes the same items as the unbounded one"""
+        pool = AsyncWorkerPool(target_function, result_callback, max_concurrent=3, queue_size=TEST_QUEUE_SIZE)
+
+        await pool.start(items)
+
+        assert pool.queue.maxsize == TEST_QUEUE_SIZE
+        assert target_function.call_count == expected_calls
+        assert result_callback.call_count == expected_calls
+        assert pool.workers == []
+
+    @pytest.mark.asyncio
+    async def test_streaming_backpressure(self, result_callback):
+        """the producer is held back by the bounded queue, probing starts before it finishes"""
+        produced = []
+        queue_sizes = []
+
+        def items():
+            for index in range(TEST_STREAM_LENGTH):
+                produced.append(index)
+                yield index
+
+        async def target_function(argument):
+            queue_sizes.append(pool.queue.qsize())
+            return len(produced)
+
+        pool = AsyncWorkerPool(target_function, result_callback, max_concurrent=3, queue_size=TEST_QUEUE_SIZE)
+        await pool.start(items())
+
+        assert result_callback.call_count == TEST_STREAM_LENGTH
+        # the first probe ran after only a handful of items had been generated
+        first_call = result_callback.call_args_list[0]
+        assert first_call.args[1] <= TEST_QUEUE_SIZE + 3
+        assert max(queue_sizes) <= TEST_QUEUE_SIZE
+
+    @pytest.mark.asyncio
+    async def test_async_result_callback(self, target_function):
+        """a coroutine callback is awaited before the worker takes the next item"""
+        reported = []
+        release = asyncio.Event()
+
+        async def result_callback(argument, result):
+            await release.wait()
+            reported.append(argument)
+
+        pool = AsyncWorkerPool(target_function, result_callback, max_concurrent=1)
+        task = asyncio.ensure_future(pool.start(TEST_ITEMS))
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+        # the single worker is stuck reporting its first result
+        assert target_function.call_count == 1
+        release.set()
+        await task
+
+        assert reported == list(TEST_ITEMS)
+        assert pool.workers == []
+
+    @pytest.mark.asyncio
+    async def test_cancelled_start_stops_workers(self, result_callback):
+        async def target_function(argument):
+            await asyncio.get_running_loop().create_future()
+
+        pool = AsyncWorkerPool(target_function, result_callback, max_concurrent=2)
+        task = asyncio.ensure_future(pool.start(TEST_ITEMS))
+        await asyncio.sleep(0)
+        task.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert pool.workers == []
+
+    @pytest.mark.parametrize("results,expected_result", RETRY_TEST_CASES, ids=["recovers", "exception", "exhausted"])
+    @pytest.mark.asyncio
+    async def test_pool_retries(self, result_callback, mock_async_sleep, results, expected_result):
+        """the pool retries failed items with the async_retry attempts and backoff"""
+        target_function = AsyncMock(side_effect=results)
+        pool = AsyncWorkerPool(target_function, result_callback, retry_attempts=TEST_RETRY_ATTEMPTS, retry_delay=TEST_RETRY_DELAY)
+
+        await pool.start([TEST_QUEUE_ITEM])
+
+        assert target_function.call_count == TEST_RETRY_ATTEMPTS
+        result_callback.assert_called_once_with(TEST_QUEUE_ITEM, expected_result)
+        assert [call.args[0] for call in mock_async_sleep.call_args_list] == pytest.approx(
+            [TEST_RETRY_DELAY, TEST_RETRY_DELAY * 2], abs=TEST_RETRY_DELAY / 2
+        )
+        assert pool.attempts == {}
+        assert pool.retry_heap == []
+        assert pool.workers == []
+
+    @pytest.mark.parametrize("queue_size", [None, TEST_QUEUE_SIZE])
+    @pytest.mark.asyncio
+    async def test_retry_backoff_frees_worker(self, result_callback, queue_size):
+        """a single worker keeps probing fresh items while a failed one backs off"""
+        calls = []
+
+        async def target_function(argument):
+            calls.append(argument)
+            return argument != "dead"
+
+        pool = AsyncWorkerPool(
+            target_function,
+            result_callback,
+            max_concurrent=1,
+            queue_size=queue_size,
+            retry_attempts=TEST_RETRY_ATTEMPTS,
+            retry_delay=TEST_RETRY_DELAY,
+        )
+        await pool.start(["dead", *TEST_ITEMS])
+
+        assert calls == ["dead", *TEST_ITEMS, "dead", "dead"]
+        assert result_callback.call_count == len(TEST_ITEMS) + 1
+        result_callback.assert_any_call("dead", False)
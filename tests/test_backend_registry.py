@@ -0,0 +1,80 @@
+import pytest
+import subprocess
+import sys
+from unittest.mock import patch
+from joby_challenge.models import backend_registry
+from joby_challenge.models.backend_registry import (
+    backend_names,
+    create_backend,
+    is_backend,
+    load_backend,
+    BACKEND_ICMP,
+    BACKEND_TCP,
+    BACKEND_UDP,
+)
+from joby_challenge.models.probe_backends import ProbeBackend, TCPConnectBackend, UDPBackend
+
+TEST_TIMEOUT = 0.2
+TEST_PLUGIN = "carrier-pigeon"
+
+
+class PigeonBackend(ProbeBackend):
+    async def probe(self, host, timeout=None):
+        return True
+
+
+class FakeEntryPoint:
+    name = TEST_PLUGIN
+    value = "tests.test_backend_registry:PigeonBackend"
+
+    def load(self):
+        return PigeonBackend
+
+
+def imported_modules(statement):
+    """Names of the joby_challenge and aioping modules a fresh interpreter has loaded after statement."""
+    code = f"import sys\n{statement}\nprint(' '.join(sys.modules))"
+    loaded = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.split()
+
+    return {name for name in loaded if name.startswith(("joby_challenge", "aioping"))}
+
+
+class TestBackendRegistry:
+    def test_create_backend(self):
+        backend = create_backend(BACKEND_TCP, ports=[8080], timeout=TEST_TIMEOUT)
+
+        assert isinstance(backend, TCPConnectBackend)
+        assert backend.ports == (8080,)
+        assert backend.timeout == TEST_TIMEOUT
+        assert isinstance(create_backend(BACKEND_UDP), UDPBackend)
+        assert create_backend(BACKEND_ICMP).prober is None
+
+    def test_create_unknown_backend(self):
+        with patch.object(backend_registry, "plugin_backends", return_value={}):
+            with pytest.raises(ValueError, match="Unknown probe backend"):
+                create_backend(TEST_PLUGIN)
+
+            assert not is_backend(TEST_PLUGIN)
+
+    def test_plugin_backend(self):
+        with patch.object(backend_registry, "plugin_backends", return_value={TEST_PLUGIN: FakeEntryPoint()}):
+            assert is_backend(TEST_PLUGIN)
+            assert TEST_PLUGIN in backend_names()
+            assert isinstance(create_backend(TEST_PLUGIN, timeout=TEST_TIMEOUT), PigeonBackend)
+
+    def test_built_in_names_skip_plugin_lookup(self):
+        with patch.object(backend_registry, "plugin_backends") as plugin_backends:
+            assert is_backend(BACKEND_TCP)
+            load_backend(BACKEND_TCP)
+
+        plugin_backends.assert_not_called()
+
+    def test_only_the_selected_backend_is_imported(self):
+        loaded = imported_modules(
+            "from joby_challenge.models.backend_registry import create_backend\ncreate_backend('tcp')"
+        )
+
+        assert "joby_challenge.models.probe_backends" in loaded
+        assert "joby_challenge.models.icmp_backend" not in loaded
+        assert "joby_challenge.models.icmp_prober" not in loaded
+        assert "aioping" not in loaded
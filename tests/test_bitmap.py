@@ -0,0 +1,43 @@
+import pytest
+from joby_challenge.models.bitmap import Bitmap, popcount, iter_bits
+
+TEST_BITS = [0, 3, 8, 9, 63, 64, 1000]
+POPCOUNT_TEST_CASES = [(0, 0), (1, 1), (0b1011, 3), ((1 << 200) - 1, 200)]
+
+
+class TestBitmap:
+
+    @pytest.mark.parametrize("value,expected", POPCOUNT_TEST_CASES)
+    def test_popcount(self, value, expected):
+        assert popcount(value) == expected
+
+    def test_iter_bits(self):
+        value = sum(1 << bit for bit in TEST_BITS)
+        assert list(iter_bits(value)) == TEST_BITS
+        assert list(iter_bits(0)) == []
+
+    def test_set_and_clear(self):
+        """bits can be set past the preallocated size, the bitmap grows"""
+        bitmap = Bitmap(8)
+        for bit in TEST_BITS:
+            bitmap.set(bit)
+
+        assert all(bit in bitmap for bit in TEST_BITS)
+        assert 1 not in bitmap
+        assert 5000 not in bitmap
+        assert bitmap.count() == len(TEST_BITS)
+        assert list(bitmap) == TEST_BITS
+
+        bitmap.clear(1000)
+        bitmap.clear(5000)
+        assert 1000 not in bitmap
+        assert bitmap.count() == len(TEST_BITS) - 1
+
+    def test_round_trip(self):
+        bitmap = Bitmap()
+        for bit in TEST_BITS:
+            bitmap.set(bit)
+
+        assert Bitmap.from_int(bitmap.to_int()) == bitmap
+        assert Bitmap.from_bytes(bitmap.to_bytes()) == bitmap
+        assert bitmap.to_int() == sum(1 << bit for bit in TEST_BITS)
@@ -0,0 +1,138 @@
+import pytest
+from joby_challenge.models.checkpoint import (
+    CheckpointJournal,
+    decode_record,
+    encode_record,
+    to_runs,
+    PREAMBLE,
+    RECORD_HEADER,
+)
+from joby_challenge.models.result_store import OffsetResultStore
+from tests.constants import TEST_NETWORK_CIDR, TEST_NETWORK_CIDR_2
+
+TEST_NETWORKS = [TEST_NETWORK_CIDR, TEST_NETWORK_CIDR_2]
+TEST_RESULTS = [((0, 1), True), ((0, 2), True), ((0, 3), False), ((1, 1), False), ((1, 5), True)]
+TEST_BATCH = 2
+
+
+@pytest.fixture
+def store():
+    return OffsetResultStore(TEST_NETWORKS)
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / "scan.journal")
+
+
+def write_journal(path, store, results, batch=TEST_BATCH):
+    journal = CheckpointJournal(path, store, batch=batch)
+    journal.prepare()
+    journal.open()
+    for location, reachable in results:
+        journal.record(location, reachable)
+    journal.close()
+
+    return journal
+
+
+def replayed(path, store):
+    results = []
+    journal = CheckpointJournal(path, store)
+    journal.prepare(resume=True, on_result=lambda index, offset, reachable: results.append(((index, offset), reachable)))
+
+    return journal, results
+
+
+class TestRecords:
+    def test_to_runs(self):
+        assert to_runs([1, 2, 3, 7, 9, 10]) == [[1, 3], [7, 1], [9, 2]]
+        assert to_runs([]) == []
+
+    def test_round_trip(self):
+        pending = {1: ([5, 4], [6]), 0: ([1, 2, 3], [])}
+
+        assert list(decode_record(encode_record(pending)[RECORD_HEADER.size:])) == [
+            (0, 1, True), (0, 2, True), (0, 3, True), (1, 4, True), (1, 5, True), (1, 6, False),
+        ]
+
+    def test_sequential_results_compress(self):
+        """ten thousand consecutive offsets are a single run"""
+        record = encode_record({0: (list(range(10000)), [])})
+
+        assert len(record) < 64
+
+
+class TestCheckpointJournal:
+    def test_resume(self, store, journal_path):
+        write_journal(journal_path, store, TEST_RESULTS)
+
+        journal, results = replayed(journal_path, OffsetResultStore(TEST_NETWORKS))
+
+        assert sorted(results) == sorted(TEST_RESULTS)
+        assert journal.restored == len(TEST_RESULTS)
+
+    def test_batches(self, store, journal_path):
+        journal = CheckpointJournal(journal_path, store, batch=TEST_BATCH)
+        journal.prepare()
+        journal.open()
+
+        journal.record((0, 1), True)
+        assert journal.pending_count == 1
+        journal.record((0, 2), True)
+        assert journal.pending_count == 0
+        journal.close()
+
+        assert replayed(journal_path, store)[0].restored == 2
+
+    def test_later_results_win(self, store, journal_path):
+        write_journal(journal_path, store, [((0, 1), False), ((0, 1), True)], batch=1)
+
+        _, results = replayed(journal_path, store)
+
+        assert results[-1] == ((0, 1), True)
+
+    def test_torn_record_is_dropped(self, store, journal_path):
+        write_journal(journal_path, store, TEST_RESULTS[:TEST_BATCH])
+        with open(journal_path, "rb") as file:
+            whole = len(file.read())
+        with open(journal_path, "ab") as file:
+            # a length header promising more than was written before the kill
+            file.write(RECORD_HEADER.pack(100) + b"\x78")
+
+        journal, results = replayed(journal_path, store)
+
+        assert len(results) == TEST_BATCH
+        with open(journal_path, "rb") as file:
+            assert len(file.read()) == whole
+
+    def test_other_scan_is_refused(self, store, journal_path):
+        write_journal(journal_path, store, TEST_RESULTS)
+
+        with pytest.raises(ValueError, match="different networks"):
+            replayed(journal_path, OffsetResultStore([TEST_NETWORK_CIDR]))
+
+        with pytest.raises(ValueError, match="different networks"):
+            replayed(journal_path, OffsetResultStore(TEST_NETWORKS, offsets=[1]))
+
+    def test_not_a_journal(self, store, journal_path):
+        with open(journal_path, "wb") as file:
+            file.write(b"x" * PREAMBLE.size)
+
+        with pytest.raises(ValueError, match="not a version"):
+            replayed(journal_path, store)
+
+    def test_resume_without_journal_starts_one(self, store, journal_path):
+        journal, results = replayed(journal_path, store)
+
+        assert results == []
+        assert journal.prepared
+        with open(journal_path, "rb") as file:
+            assert len(file.read()) == PREAMBLE.size
+
+    def test_filter(self, store, journal_path):
+        store.set(0, 1, True)
+        journal = CheckpointJournal(journal_path, store)
+
+        assert list(journal.filter(["192.168.1.1", "192.168.1.2", "10.0.0.1"])) == ["192.168.1.2", "10.0.0.1"]
+        assert journal.skipped == 1
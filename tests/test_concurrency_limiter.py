@@ -0,0 +1,114 @@
+import pytest
+import asyncio
+from unittest.mock import MagicMock
+from joby_challenge.models.concurrency_limiter import AIMDLimiter, DEFAULT_MIN_WINDOW, DEFAULT_HISTORY_LENGTH
+from joby_challenge.models.async_worker_pool import AsyncWorkerPool
+
+TEST_INITIAL_LIMIT = 10
+TEST_FAST_LATENCY = 0.001
+TEST_SLOW_LATENCY = 0.5
+TEST_CAPACITY = 40
+TEST_ITEM_COUNT = 5000
+INVALID_BOUNDS_TEST_CASES = [(0, 10), (10, 5)]
+
+
+def run_window(limiter, success, latency, failures=0):
+    """Feed exactly one adjustment window of completions to the limiter."""
+    window = max(int(limiter.limit), DEFAULT_MIN_WINDOW)
+    for index in range(window):
+        limiter.in_flight += 1
+        limiter.release(success and index >= failures, latency)
+
+
+class TestAIMDLimiter:
+
+    @pytest.mark.parametrize("min_limit,max_limit", INVALID_BOUNDS_TEST_CASES)
+    def test_invalid_bounds(self, min_limit, max_limit):
+        with pytest.raises(ValueError):
+            AIMDLimiter(TEST_INITIAL_LIMIT, min_limit, max_limit)
+
+    def test_initial_limit_clamped(self):
+        assert AIMDLimiter(5000, 1, 100).limit == 100
+
+    def test_additive_increase(self):
+        limiter = AIMDLimiter(TEST_INITIAL_LIMIT, 1, 100)
+
+        for _ in range(5):
+            run_window(limiter, True, TEST_FAST_LATENCY)
+
+        assert limiter.limit == TEST_INITIAL_LIMIT + 5
+        assert limiter.history[-1][1] == TEST_INITIAL_LIMIT + 5
+
+    def test_history_is_bounded(self):
+        """a monitor never exits, only the latest changes are kept but the summary covers all of them"""
+        limiter = AIMDLimiter(TEST_INITIAL_LIMIT, 1, 10 ** 6)
+        for _ in range(DEFAULT_HISTORY_LENGTH + 50):
+            run_window(limiter, True, TEST_FAST_LATENCY)
+
+        assert len(limiter.history) == DEFAULT_HISTORY_LENGTH
+        assert limiter.changes == DEFAULT_HISTORY_LENGTH + 50
+        assert (limiter.lowest, limiter.highest) == (TEST_INITIAL_LIMIT, int(limiter.limit))
+
+    def test_decrease_on_failures(self):
+        """a jump in the failure ratio halves the limit"""
+        limiter = AIMDLimiter(TEST_INITIAL_LIMIT * 4, 1, 100)
+        run_window(limiter, True, TEST_FAST_LATENCY)
+        assert limiter.limit == TEST_INITIAL_LIMIT * 4 + 1
+
+        run_window(limiter, True, TEST_FAST_LATENCY, failures=TEST_INITIAL_LIMIT * 2)
+        assert limiter.limit == (TEST_INITIAL_LIMIT * 4 + 1) / 2
+
+    def test_decrease_on_latency(self):
+        limiter = AIMDLimiter(TEST_INITIAL_LIMIT, 1, 100)
+        run_window(limiter, True, TEST_FAST_LATENCY)
+        run_window(limiter, True, TEST_SLOW_LATENCY)
+
+        assert limiter.limit == (TEST_INITIAL_LIMIT + 1) / 2
+
+    def test_persistent_failures_absorbed(self):
+        """a range that is simply dead stops cutting the limit once the baseline catches up"""
+        limiter = AIMDLimiter(TEST_INITIAL_LIMIT, 1, 100)
+
+        for _ in range(100):
+            run_window(limiter, False, TEST_FAST_LATENCY)
+
+        assert limiter.limit > TEST_INITIAL_LIMIT
+
+    def test_min_limit(self):
+        limiter = AIMDLimiter(TEST_INITIAL_LIMIT, 4, 100)
+        run_window(limiter, True, TEST_FAST_LATENCY)
+
+        for _ in range(5):
+            run_window(limiter, True, TEST_SLOW_LATENCY)
+
+        assert limiter.limit == 4
+
+    @pytest.mark.asyncio
+    async def test_acquire_blocks_at_limit(self):
+        limiter = AIMDLimiter(2, 1, 10)
+        await limiter.acquire()
+        await limiter.acquire()
+
+        blocked = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not blocked.done()
+
+        limiter.release(True, TEST_FAST_LATENCY)
+        await blocked
+        assert limiter.in_flight == 2
+
+    @pytest.mark.asyncio
+    async def test_converges_below_capacity(self):
+        """driving a pool into a target that fails past a capacity settles the limit near it"""
+        limiter = AIMDLimiter(TEST_INITIAL_LIMIT, 1, 200)
+
+        async def target_function(argument):
+            await asyncio.sleep(0)
+            return limiter.in_flight <= TEST_CAPACITY
+
+        pool = AsyncWorkerPool(target_function, MagicMock(), max_concurrent=200, concurrency_limiter=limiter)
+        await pool.start(range(TEST_ITEM_COUNT))
+
+        limits = [limit for _, limit in limiter.history]
+        assert max(limits) > TEST_CAPACITY
+        assert TEST_CAPACITY / 2 <= limits[-1] <= TEST_CAPACITY * 1.5
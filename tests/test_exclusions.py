@@ -0,0 +1,112 @@
+import ipaddress
+import pytest
+from joby_challenge.models.exclusions import IntervalSet, Exclusions, parse_exclusion, read_entries
+from joby_challenge.models.ip_address_handler import IPAddressHandler
+from tests.constants import TEST_SKIP_VALUES, TEST_INVALID_IP
+
+TEST_INTERVALS = [(10, 20), (5, 8), (21, 25), (40, 50), (45, 46)]
+MERGED_INTERVALS = [(5, 8), (10, 25), (40, 50)]
+PARSE_TEST_CASES = [
+    ("10.0.0.0/30", (4, 0x0A000000, 0x0A000003)),
+    ("10.0.0.5 - 10.0.0.20", (4, 0x0A000005, 0x0A000014)),
+    ("10.0.0.7", (4, 0x0A000007, 0x0A000007)),
+    ("2001:db8::/127", (6, 0x20010DB8 << 96, (0x20010DB8 << 96) + 1)),
+]
+INVALID_EXCLUSIONS = [TEST_INVALID_IP, "10.0.0.20-10.0.0.5", "10.0.0.1-2001:db8::1"]
+TEST_EXCLUSIONS = ["10.0.0.8/29", "10.0.1.250-10.0.2.3", "10.0.3.7"]
+TEST_EXCLUSION_FILE = """\
+# from IPAM
+10.0.0.8/29
+10.0.1.250-10.0.2.3  # printers
+
+10.0.3.7
+"""
+TEST_NETWORK = "10.0.0.0/22"
+
+
+def expected_hosts(network, exclusions, skips):
+    excluded = set()
+    for exclusion in exclusions:
+        version, first, last = parse_exclusion(exclusion)
+        excluded.update(range(first, last + 1))
+
+    return [
+        str(host) for host in ipaddress.ip_network(network).hosts()
+        if int(host) not in excluded and str(int(host) & 0xFF) not in skips
+    ]
+
+
+class TestIntervalSet:
+
+    def test_merges(self):
+        intervals = IntervalSet(TEST_INTERVALS)
+
+        assert list(intervals) == MERGED_INTERVALS
+        assert intervals.size() == 4 + 16 + 11
+        assert [value for value in range(60) if value in intervals] == [
+            value for first, last in MERGED_INTERVALS for value in range(first, last + 1)
+        ]
+
+    def test_subtract(self):
+        intervals = IntervalSet(TEST_INTERVALS)
+
+        assert list(intervals.subtract(0, 60)) == [(0, 4), (9, 9), (26, 39), (51, 60)]
+        assert list(intervals.subtract(12, 42)) == [(26, 39)]
+        assert list(intervals.subtract(10, 25)) == []
+        assert list(intervals.overlapping(7, 11)) == [(7, 8), (10, 11)]
+
+
+class TestExclusions:
+
+    @pytest.mark.parametrize("target,expected", PARSE_TEST_CASES, ids=["cidr", "range", "address", "ipv6"])
+    def test_parse(self, target, expected):
+        assert parse_exclusion(target) == expected
+
+    @pytest.mark.parametrize("target", INVALID_EXCLUSIONS, ids=["garbage", "descending", "mixed versions"])
+    def test_parse_invalid(self, target):
+        with pytest.raises(ValueError):
+            parse_exclusion(target)
+
+    def test_read_file(self, tmp_path):
+        path = tmp_path / "exclusions.txt"
+        path.write_text(TEST_EXCLUSION_FILE)
+
+        assert read_entries(path) == TEST_EXCLUSIONS
+
+    def test_split_and_count(self):
+        """splitting and counting agree with checking every address"""
+        exclusions = Exclusions(TEST_EXCLUSIONS, last_octets=TEST_SKIP_VALUES)
+        network = ipaddress.ip_network(TEST_NETWORK)
+        first, last = int(network.network_address), int(network.broadcast_address)
+
+        kept = [address for start, end in exclusions.split(4, first, last) for address in range(start, end + 1)]
+        assert kept == [address for address in range(first, last + 1) if not exclusions.contains(4, address)]
+        assert exclusions.count(4, first, last) == (last - first + 1) - len(kept)
+
+    def test_out_of_range_octets_ignored(self):
+        """a skip of 300 must not bleed into the third octet (10.0.1.44 is 10.0.0.0 | 300)"""
+        exclusions = Exclusions(last_octets=["300", "5", "x"])
+        handler = IPAddressHandler(["10.0.0.0/23"], skips=["300"], lazy=True)
+
+        assert exclusions.last_octets == [5]
+        assert "10.0.1.44" in list(handler.ip_addresses)
+        assert len(handler.ip_addresses) == len(list(handler.ip_addresses)) == 510
+
+    def test_copy_is_independent(self):
+        exclusions = Exclusions(TEST_EXCLUSIONS)
+        copied = exclusions.copy()
+        copied.add_last_octets(TEST_SKIP_VALUES)
+
+        assert not exclusions.last_octets
+        assert list(copied.intervals[4]) == list(exclusions.intervals[4])
+
+    @pytest.mark.parametrize("lazy,interleave", [(False, False), (True, False), (True, True)])
+    def test_handler(self, lazy, interleave):
+        handler = IPAddressHandler(
+            [TEST_NETWORK], skips=TEST_SKIP_VALUES, lazy=lazy, interleave=interleave,
+            exclusions=Exclusions(TEST_EXCLUSIONS),
+        )
+        expected = expected_hosts(TEST_NETWORK, TEST_EXCLUSIONS, TEST_SKIP_VALUES)
+
+        assert list(handler.ip_addresses) == expected
+        assert len(handler.ip_addresses) == len(expected)
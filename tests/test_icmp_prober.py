@@ -0,0 +1,196 @@
+import pytest
+import asyncio
+import socket
+import struct
+from unittest.mock import AsyncMock, MagicMock
+from joby_challenge.models.icmp_prober import (
+    ICMPProber,
+    ICMPv6Prober,
+    DualStackProber,
+    ICMPV6_ECHO_REPLY,
+    ICMPV6_ECHO_REQUEST,
+    icmp_checksum,
+    build_echo_request,
+    parse_echo_reply,
+    ICMP_ECHO_REPLY,
+    ICMP_HEADER,
+)
+from tests.constants import TEST_SINGLE_IP
+
+TEST_IDENTIFIER = 0x1234
+TEST_SEQUENCE = 7
+TEST_IPV6_HOST = "2001:db8::1"
+TEST_TIMEOUT = 0.05
+# minimal IPv4 header, version 4 and IHL of 5 words
+TEST_IP_HEADER = bytes([0x45]) + bytes(19)
+CHECKSUM_TEST_CASES = [
+    (b"\x00\x01\xf2\x03\xf4\xf5\xf6\xf7", 0x220D),
+    (b"\x00\x00", 0xFFFF),
+    (b"\xff", 0x00FF),
+]
+
+
+def build_reply(identifier, sequence, icmp_type=ICMP_ECHO_REPLY):
+    return TEST_IP_HEADER + ICMP_HEADER.pack(icmp_type, 0, 0, identifier, sequence)
+
+
+class FakeSocket:
+    """Socket stand-in that records sends and never blocks."""
+    def __init__(self):
+        self.sent = []
+
+    def sendto(self, packet, address):
+        self.sent.append((packet, address))
+
+
+class FullSocket(FakeSocket):
+    """Fake socket whose send buffer stays full until unblocked, on a real fd the loop can watch."""
+    def __init__(self):
+        super().__init__()
+        self.blocked = True
+        self.pair = socket.socketpair()
+
+    def fileno(self):
+        return self.pair[0].fileno()
+
+    def sendto(self, packet, address):
+        if self.blocked:
+            raise BlockingIOError
+        super().sendto(packet, address)
+
+    def close(self):
+        for sock in self.pair:
+            sock.close()
+
+
+@pytest.fixture
+def full_socket(prober):
+    sock = FullSocket()
+    prober.sockets = [sock]
+    yield sock
+    sock.close()
+
+
+@pytest.fixture
+def prober():
+    prober = ICMPProber(timeout=TEST_TIMEOUT)
+    prober.identifier = TEST_IDENTIFIER
+    return prober
+
+
+@pytest.fixture
+def fake_socket(prober):
+    """Attach a fake socket so no raw socket privileges are needed."""
+    sock = FakeSocket()
+    prober.sockets = [sock]
+    return sock
+
+
+class TestICMPProber:
+
+    @pytest.mark.parametrize("data,expected", CHECKSUM_TEST_CASES)
+    def test_icmp_checksum(self, data, expected):
+        assert icmp_checksum(data) == expected
+
+    def test_build_echo_request(self):
+        """a packet with its checksum filled in should checksum to zero"""
+        packet = build_echo_request(TEST_IDENTIFIER, TEST_SEQUENCE)
+
+        assert icmp_checksum(packet) == 0
+        assert struct.unpack_from("!HH", packet, 4) == (TEST_IDENTIFIER, TEST_SEQUENCE)
+
+    @pytest.mark.parametrize(
+        "packet,expected",
+        [
+            (build_reply(TEST_IDENTIFIER, TEST_SEQUENCE), (TEST_IDENTIFIER, TEST_SEQUENCE)),
+            (build_reply(TEST_IDENTIFIER, TEST_SEQUENCE, icmp_type=8), None),
+            (TEST_IP_HEADER, None),
+        ],
+        ids=["echo reply", "echo request", "truncated"],
+    )
+    def test_parse_echo_reply(self, packet, expected):
+        assert parse_echo_reply(packet) == expected
+
+    def test_next_sequence_skips_outstanding(self, prober):
+        prober.pending[(TEST_SINGLE_IP, 1)] = MagicMock()
+
+        assert prober.next_sequence(TEST_SINGLE_IP) == 2
+        assert prober.next_sequence("192.168.5.2") == 3
+
+    @pytest.mark.asyncio
+    async def test_probe_matches_reply(self, prober, fake_socket):
+        """replies are routed back to the waiting probe by address and sequence"""
+        probe = asyncio.create_task(prober.probe(TEST_SINGLE_IP))
+        await asyncio.sleep(0)
+
+        packet, address = fake_socket.sent[0]
+        sequence = struct.unpack_from("!H", packet, 6)[0]
+        assert address == (TEST_SINGLE_IP, 0)
+
+        # a reply for another process and another host should both be ignored
+        prober.handle_packet(build_reply(TEST_IDENTIFIER + 1, sequence), TEST_SINGLE_IP)
+        prober.handle_packet(build_reply(TEST_IDENTIFIER, sequence), "192.168.5.2")
+        assert not probe.done()
+
+        prober.handle_packet(build_reply(TEST_IDENTIFIER, sequence), TEST_SINGLE_IP)
+
+        assert await probe is True
+        assert prober.pending == {}
+
+    @pytest.mark.asyncio
+    async def test_probe_timeout(self, prober, fake_socket):
+        assert await prober.probe(TEST_SINGLE_IP) is False
+        assert prober.pending == {}
+
+    @pytest.mark.asyncio
+    async def test_blocked_senders_all_resume(self, prober, full_socket):
+        """every sender waiting on a full buffer is woken, not just the last one to register"""
+        prober.open()
+        hosts = [TEST_SINGLE_IP, "192.168.5.2", "192.168.5.3"]
+        sends = [asyncio.create_task(prober.send(full_socket, b"echo", host, 1.0)) for host in hosts]
+        await asyncio.sleep(0.01)
+        assert not any(send.done() for send in sends)
+
+        full_socket.blocked = False
+
+        await asyncio.wait_for(asyncio.gather(*sends), 0.5)
+        assert sorted(address[0] for _, address in full_socket.sent) == sorted(hosts)
+        assert prober.writers == {}
+
+    @pytest.mark.asyncio
+    async def test_probe_timeout_covers_a_full_buffer(self, prober, full_socket):
+        assert await asyncio.wait_for(prober.probe(TEST_SINGLE_IP), 1.0) is False
+        assert prober.pending == {}
+
+    @pytest.mark.asyncio
+    async def test_ping_retries(self, prober, fake_socket, mock_async_sleep):
+        """ping keeps the retry semantics of utils.ping_host"""
+        with pytest.raises(Exception, match="max attempts"):
+            await prober.ping(TEST_SINGLE_IP)
+
+        assert len(fake_socket.sent) == 3
+        assert mock_async_sleep.call_count == 2
+
+    def test_icmpv6_packets(self):
+        """ICMPv6 uses its own echo types, and replies come without an IP header"""
+        prober = ICMPv6Prober()
+        prober.identifier = TEST_IDENTIFIER
+
+        assert prober.build_request(TEST_SEQUENCE)[0] == ICMPV6_ECHO_REQUEST
+        reply = ICMP_HEADER.pack(ICMPV6_ECHO_REPLY, 0, 0, TEST_IDENTIFIER, TEST_SEQUENCE)
+        assert prober.parse_reply(reply) == (TEST_IDENTIFIER, TEST_SEQUENCE)
+        assert prober.parse_reply(build_reply(TEST_IDENTIFIER, TEST_SEQUENCE)) is None
+
+    @pytest.mark.asyncio
+    async def test_dual_stack_routes_by_family(self):
+        prober = DualStackProber()
+        prober.v4.probe = AsyncMock(return_value=True)
+        prober.v6.probe = AsyncMock(return_value=False)
+
+        assert await prober.probe(TEST_SINGLE_IP) is True
+        assert await prober.probe(TEST_IPV6_HOST, TEST_TIMEOUT) is False
+
+        prober.v4.probe.assert_awaited_once_with(TEST_SINGLE_IP, None)
+        prober.v6.probe.assert_awaited_once_with(TEST_IPV6_HOST, TEST_TIMEOUT)
+        # neither opened a socket, closing is a no-op
+        prober.close()
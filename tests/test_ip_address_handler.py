@@ -1,5 +1,6 @@
 import pytest
-from joby_challenge.models.ip_address_handler import IPAddressHandler
+import itertools
+from joby_challenge.models.ip_address_handler import IPAddressHandler, LazyIPAddresses, shard_ranges
 from tests.constants import TEST_NETWORK_CIDR, TEST_SKIP_VALUES, TEST_SINGLE_IP, TEST_INVALID_IP
 
 CIDR_IP_ADDRESSES = [
@@ -20,6 +21,17 @@ CIDR_2_IP_ADDRESSES = [
 ]
 SKIPPED_ADDRESSES = ["192.168.1.1", "192.168.1.3", "192.168.1.5"]
 NOT_SKIPPED_ADDRESSES = ["192.168.1.2", "192.168.1.4", "192.168.1.6"]
+LAZY_TEST_CASES = [
+    (["192.168.1.0/22"], None),
+    (["192.168.1.0/22"], ["0", "1", "255"]),
+    (["192.168.1.0/29", "192.168.5.1", "10.0.0.0/31", "10.0.0.9/32"], ["1", "3"]),
+    (["2001:db8::/126", "2001:db8::1"], ["1"]),
+]
+SHARD_TEST_CASES = [
+    ([(4, 1, 10)], 3, [[(4, 1, 3)], [(4, 4, 6)], [(4, 7, 10)]]),
+    ([(4, 1, 2), (4, 11, 12)], 2, [[(4, 1, 1), (4, 11, 11)], [(4, 2, 2), (4, 12, 12)]]),
+    ([(4, 5, 5)], 2, [[], [(4, 5, 5)]]),
+]
 LAST_OCTEST_TEST_CASES = [
     ("192.168.1.1", "1"),
     ("10.0.0.255", "255"),
@@ -98,3 +110,60 @@ class TestIPAddressHandler:
         """Test that get_last_octet returns the correct value."""
 
         assert address_handler.get_last_octet(test_address) == expected_octet
+
+    @pytest.mark.parametrize(
+        "networks,skips",
+        LAZY_TEST_CASES,
+        ids=["network", "network with skips", "mixed targets", "ipv6 ignores skips"],
+    )
+    def test_lazy_matches_eager(self, networks, skips):
+        """lazy mode yields exactly what the eager list holds, and counts it without iterating"""
+        eager = IPAddressHandler(networks, skips=skips)
+        lazy = IPAddressHandler(networks, skips=skips, lazy=True)
+
+        assert isinstance(lazy.ip_addresses, LazyIPAddresses)
+        assert list(lazy.ip_addresses) == eager.ip_addresses
+        assert len(lazy.ip_addresses) == len(eager.ip_addresses)
+
+        # re-iterable, the pool may consume it more than once
+        assert list(lazy.ip_addresses) == eager.ip_addresses
+
+    def test_lazy_large_network(self):
+        """a /8 is described by one integer range rather than 16M strings"""
+        handler = IPAddressHandler(["10.0.0.0/8"], skips=TEST_SKIP_VALUES, lazy=True)
+
+        assert len(handler.ip_addresses.ranges) == 1
+        assert len(handler.ip_addresses) == (2 ** 24 - 2) - 3 * 2 ** 16
+        assert list(itertools.islice(handler.ip_addresses, 3)) == ["10.0.0.2", "10.0.0.4", "10.0.0.6"]
+
+    def test_interleave(self):
+        """counterparts of the networks come out next to each other, the longer network finishes alone"""
+        handler = IPAddressHandler(["192.168.1.0/30", "192.168.2.0/29"], skips=["2"], interleave=True)
+
+        assert isinstance(handler.ip_addresses, LazyIPAddresses)
+        assert list(handler.ip_addresses) == [
+            "192.168.1.1", "192.168.2.1",
+            "192.168.2.3", "192.168.2.4", "192.168.2.5", "192.168.2.6",
+        ]
+        assert len(handler.ip_addresses) == 6
+
+    def test_lazy_invalid_address(self):
+        handler = IPAddressHandler([TEST_INVALID_IP, TEST_SINGLE_IP], lazy=True)
+
+        assert list(handler.ip_addresses) == [TEST_SINGLE_IP]
+
+    @pytest.mark.parametrize(
+        "ranges,count,expected",
+        SHARD_TEST_CASES,
+        ids=["even split", "counterparts together", "more shards than hosts"],
+    )
+    def test_shard_ranges(self, ranges, count, expected):
+        assert shard_ranges(ranges, count) == expected
+
+    def test_shards_cover_targets(self, sample_networks):
+        """the shards together hold every target exactly once"""
+        handler = IPAddressHandler(sample_networks, skips=TEST_SKIP_VALUES, lazy=True)
+        shards = shard_ranges(handler.ip_addresses.ranges, 4)
+
+        sharded = [ip for shard in shards for ip in LazyIPAddresses(shard, TEST_SKIP_VALUES)]
+        assert sorted(sharded) == sorted(handler.ip_addresses)
@@ -0,0 +1,119 @@
+import logging
+import multiprocessing
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+from unittest.mock import patch
+from joby_challenge.logs import DeferredQueueHandler, ForwardedRecords, RateLimitFilter, configure_logging, forward_logging
+from tests.constants import TEST_SINGLE_IP
+
+TEST_BURST = 3
+TEST_RECORDS = 10
+
+
+def make_record(msg="%s is reachable", args=(TEST_SINGLE_IP,), level=logging.INFO, name="pings"):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+def log_in_child(message):
+    logging.getLogger("Orchestrator").warning(message)
+
+
+def log_hosts_in_child(count):
+    for index in range(count):
+        logging.getLogger("pings").info("%s is reachable", f"10.0.0.{index}")
+
+
+@pytest.fixture
+def root_logger():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield root
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+
+class TestRateLimitFilter:
+
+    def test_burst_per_template(self):
+        rate_limit = RateLimitFilter(burst=TEST_BURST, window=60)
+
+        passed = [rate_limit.filter(make_record()) for _ in range(TEST_RECORDS)]
+        assert passed.count(True) == TEST_BURST
+        assert rate_limit.filter(make_record("%s ping failed: %s", (TEST_SINGLE_IP, "timeout")))
+        assert rate_limit.filter(make_record(level=logging.WARNING))
+
+    def test_reports_suppressed_next_window(self):
+        rate_limit = RateLimitFilter(burst=1, window=1)
+
+        with patch("joby_challenge.logs.time.monotonic", side_effect=[0.0, 0.1, 0.2, 5.0]):
+            assert rate_limit.filter(make_record())
+            assert not rate_limit.filter(make_record())
+            assert not rate_limit.filter(make_record())
+
+            record = make_record()
+            assert rate_limit.filter(record)
+
+        assert record.getMessage() == f"{TEST_SINGLE_IP} is reachable (2 similar messages suppressed)"
+
+    def test_reports_are_not_sampled(self):
+        """the end of scan report repeats its templates once per mismatch, all of it is printed"""
+        rate_limit = RateLimitFilter(burst=TEST_BURST, window=60)
+
+        separators = [make_record("----------------------------------", (), name="NetworkDataCollector")] * TEST_RECORDS
+        assert all(rate_limit.filter(record) for record in separators)
+
+    def test_disabled(self):
+        rate_limit = RateLimitFilter(burst=0)
+        assert all(rate_limit.filter(make_record()) for _ in range(TEST_RECORDS))
+
+
+class TestConfigureLogging:
+
+    def test_record_left_unformatted(self):
+        record = make_record()
+        assert DeferredQueueHandler(None).prepare(record).args == (TEST_SINGLE_IP,)
+
+    def test_queued_to_listener(self, root_logger, capsys):
+        listener = configure_logging("INFO", burst=TEST_BURST)
+        try:
+            assert [type(handler) for handler in root_logger.handlers] == [DeferredQueueHandler]
+            logger = logging.getLogger("pings")
+            for _ in range(TEST_RECORDS):
+                logger.info("%s is reachable", TEST_SINGLE_IP)
+            logger.debug("not printed at INFO")
+        finally:
+            listener.stop()
+
+        lines = capsys.readouterr().err.splitlines()
+        assert len(lines) == TEST_BURST
+        assert lines[0].endswith(f"pings - INFO - {TEST_SINGLE_IP} is reachable")
+
+    def test_forwarded_from_processes(self, caplog):
+        """records logged in pool processes reach this process' handlers"""
+        records = multiprocessing.Queue()
+        forwarder = ForwardedRecords(records)
+        forwarder.start()
+        try:
+            with ProcessPoolExecutor(1, initializer=forward_logging, initargs=(records, logging.INFO)) as executor:
+                executor.submit(log_in_child, "shard warning").result()
+        finally:
+            forwarder.stop()
+
+        assert [record.getMessage() for record in caplog.records] == ["shard warning"]
+        assert caplog.records[0].name == "Orchestrator"
+
+    def test_forwarded_records_are_sampled(self, caplog):
+        """shard records keep their template, so the parent samples them like its own"""
+        caplog.handler.addFilter(RateLimitFilter(burst=TEST_BURST, window=60))
+        records = multiprocessing.Queue()
+        forwarder = ForwardedRecords(records)
+        forwarder.start()
+        try:
+            with ProcessPoolExecutor(1, initializer=forward_logging, initargs=(records, logging.INFO)) as executor:
+                executor.submit(log_hosts_in_child, TEST_RECORDS).result()
+        finally:
+            forwarder.stop()
+
+        assert [record.getMessage() for record in caplog.records] == [
+            f"10.0.0.{index} is reachable" for index in range(TEST_BURST)
+        ]
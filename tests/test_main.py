@@ -0,0 +1,88 @@
+import pytest
+import subprocess
+import sys
+from unittest.mock import patch
+from joby_challenge import main
+from joby_challenge.models.probe_backends import DEFAULT_MAX_CONNECTIONS
+from joby_challenge.models.rtt_estimator import DEFAULT_MIN_TIMEOUT_SECONDS
+
+# loaded only once a scan or diff actually starts
+TEST_DEFERRED_MODULES = [
+    "asyncio",
+    "aioping",
+    "joby_challenge.models.orchestrator",
+    "joby_challenge.models.monitor",
+    "joby_challenge.models.probe_backends",
+    "joby_challenge.models.snapshot",
+]
+
+
+def parse(*argv):
+    with patch.object(sys, "argv", ["joby_challenge", *argv]):
+        return main.parse_args()
+
+
+class TestStartup:
+    def test_import_loads_no_scanner(self):
+        code = (
+            "import logging, sys\n"
+            "import joby_challenge.main\n"
+            f"print([name for name in {TEST_DEFERRED_MODULES!r} if name in sys.modules])\n"
+            "print(len(logging.getLogger().handlers))"
+        )
+        loaded, handlers = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        ).stdout.splitlines()
+
+        assert loaded == "[]"
+        # logging is configured by run(), never at import
+        assert handlers == "0"
+
+    def test_help_matches_the_scanner(self, capsys):
+        """--help can't import the defaults it mentions, so they are spelled out"""
+        with pytest.raises(SystemExit):
+            parse("--help")
+
+        help_text = capsys.readouterr().out
+        assert f"defaults to {DEFAULT_MAX_CONNECTIONS}" in help_text
+        assert f"defaults to {DEFAULT_MIN_TIMEOUT_SECONDS * 1000:.0f} ms" in help_text
+
+
+class TestParseArgs:
+    def test_unset_options_are_none(self):
+        args = parse()
+
+        assert args.max_concurrent is None
+        assert args.cache_ttl is None
+        assert args.report is None
+        assert args.backend_options == {}
+
+    def test_unknown_backend(self, capsys):
+        with pytest.raises(SystemExit):
+            parse("--backend", "carrier-pigeon")
+
+        assert "unknown --backend carrier-pigeon" in capsys.readouterr().err
+
+    def test_backend_options(self):
+        args = parse("--backend", "tcp", "--ports", "22", "--probe-timeout", "0.5")
+
+        assert args.backend_options == {"timeout": 0.5, "ports": [22]}
+
+    def test_sharded_metrics_rejected(self, capsys):
+        with pytest.raises(SystemExit):
+            parse("--processes", "2", "--progress")
+
+        assert "--processes 1" in capsys.readouterr().err
+
+    @pytest.mark.parametrize("option", [["--processes", "2"], ["--cache", "results.db"], ["--cache-ttl", "60"]])
+    def test_scan_only_options_rejected_with_monitor(self, option, capsys):
+        with pytest.raises(SystemExit):
+            parse("--monitor", *option)
+
+        assert "--monitor" in capsys.readouterr().err
+
+    def test_targets_file_network_too_large(self, capsys):
+        with pytest.raises(SystemExit):
+            parse("--networks", "2001:db8::/64", "2001:db8:1::/64", "--targets-file", "-")
+
+        assert "not 2001:db8::/64, 2001:db8:1::/64" in capsys.readouterr().err
@@ -0,0 +1,101 @@
+import json
+import logging
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from joby_challenge.models.async_worker_pool import AsyncWorkerPool
+from joby_challenge.models.metrics import Histogram, Metrics, MetricsReporter, registry
+from joby_challenge.utils import probe_host
+from tests.constants import TEST_SINGLE_IP
+
+TEST_BUCKETS = (0.01, 0.1, 1.0)
+TEST_LATENCIES = [0.005, 0.05, 0.05, 0.5, 5.0]
+TEST_TOTAL = 10
+PROBE_FAILURE_TEST_CASES = [(TimeoutError("Ping timeout"), "timeouts"), (OSError("unreachable"), "errors")]
+
+
+@pytest.fixture
+def metrics():
+    return Metrics()
+
+
+class TestMetrics:
+
+    def test_histogram(self):
+        histogram = Histogram(TEST_BUCKETS)
+        assert histogram.quantile(0.5) is None
+
+        for latency in TEST_LATENCIES:
+            histogram.observe(latency)
+
+        assert histogram.cumulative() == [(0.01, 1), (0.1, 3), (1.0, 4), (float("inf"), 5)]
+        assert histogram.quantile(0.5) == 0.1
+        assert histogram.quantile(0.99) == float("inf")
+        assert histogram.sum == pytest.approx(sum(TEST_LATENCIES))
+
+    def test_exports(self, metrics):
+        metrics.probes = 4
+        metrics.timeouts = 1
+        metrics.latency.observe(0.002)
+
+        prometheus = metrics.to_prometheus(total=TEST_TOTAL)
+        assert "joby_probes_total 4\n" in prometheus
+        assert "joby_hosts_total 10\n" in prometheus
+        assert 'joby_call_latency_seconds_bucket{le="0.0025"} 1\n' in prometheus
+        assert 'joby_call_latency_seconds_bucket{le="+Inf"} 1\n' in prometheus
+
+        exported = metrics.to_dict()
+        assert exported["counters"]["timeouts"] == 1
+        assert exported["gauges"]["in_flight"] == 0
+        assert exported["latency_seconds"]["p50"] == 0.0025
+        assert "probe_timeout_seconds" not in exported
+        assert "joby_probe_timeout_seconds" not in prometheus
+
+    def test_exports_probe_timeouts(self, metrics):
+        metrics.timeout.observe(0.05)
+
+        assert metrics.to_dict()["probe_timeout_seconds"]["count"] == 1
+        assert 'joby_probe_timeout_seconds_bucket{le="0.05"} 1\n' in metrics.to_prometheus()
+
+    @pytest.mark.asyncio
+    async def test_pool_counts(self, metrics, result_callback, mock_async_sleep):
+        target_function = AsyncMock(side_effect=[False, True, False, False])
+        pool = AsyncWorkerPool(target_function, result_callback, max_concurrent=1, retry_attempts=3, metrics=metrics)
+
+        await pool.start(["dead", "alive"])
+
+        assert metrics.calls == 4
+        assert metrics.retries == 2
+        assert (metrics.results, metrics.reachable) == (2, 1)
+        assert metrics.in_flight == 0
+        assert metrics.latency.count == 4
+
+    @pytest.mark.parametrize("exception,counter", PROBE_FAILURE_TEST_CASES)
+    @pytest.mark.asyncio
+    async def test_probe_host_counts(self, exception, counter):
+        before = registry.counters()
+
+        with patch("aioping.ping", new_callable=AsyncMock, side_effect=exception):
+            assert await probe_host(TEST_SINGLE_IP) is False
+
+        after = registry.counters()
+        assert after["probes"] - before["probes"] == 1
+        assert after[counter] - before[counter] == 1
+
+    @pytest.mark.asyncio
+    async def test_reporter(self, metrics, tmp_path, caplog):
+        caplog.set_level(logging.INFO)
+        path = tmp_path / "metrics.json"
+        queue = MagicMock()
+        queue.qsize.return_value = 3
+        metrics.results = 5
+        metrics.probes = 8
+        metrics.timeouts = 2
+
+        reporter = MetricsReporter(metrics, path=path, interval=60, progress=True, queue=queue, total=TEST_TOTAL)
+        reporter.start()
+        await reporter.stop()
+
+        assert json.loads(path.read_text())["gauges"]["queue_depth"] == 3
+        assert not (tmp_path / "metrics.json.tmp").exists()
+        assert "50.0% 5/10 hosts" in caplog.text
+        assert "queue 3 | retries 0 | timeouts 25.0%" in caplog.text
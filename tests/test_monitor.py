@@ -0,0 +1,105 @@
+import pytest
+from joby_challenge.models.monitor import Monitor, NEW_MISMATCH, RESOLVED_MISMATCH, FLAPPING
+from tests.constants import TEST_SKIP_VALUES
+
+TEST_MAX_BACKOFF_EXPONENT = 2
+
+
+class ScriptedPings:
+    """aioping.ping side effect replaying per-cycle reachability for chosen hosts, everything else is up."""
+    def __init__(self, script):
+        # host -> list of reachable per monitor cycle, the last entry repeats
+        self.script = script
+        self.monitor = None
+
+    def __call__(self, host, timeout=None):
+        results = self.script.get(host, [True])
+
+        if not results[min(self.monitor.cycle, len(results) - 1)]:
+            raise Exception("ping failure")
+
+
+@pytest.fixture
+def monitor(sample_networks):
+    return Monitor(sample_networks, interval=0, max_backoff_exponent=TEST_MAX_BACKOFF_EXPONENT)
+
+
+class TestMonitor:
+
+    def test_init(self, sample_networks):
+        monitor = Monitor(sample_networks, skips=TEST_SKIP_VALUES)
+
+        assert [bounds[3:] for bounds in monitor.host_bounds] == [(1, 6), (1, 6)]
+        assert monitor.offset_count == 7
+        assert monitor.exclusions.last_octets == [1, 3, 5]
+
+        with pytest.raises(ValueError):
+            Monitor(sample_networks, processes=2)
+        with pytest.raises(ValueError):
+            Monitor(sample_networks, target_offsets=[1])
+
+    def test_targets_skip(self, sample_networks):
+        monitor = Monitor(sample_networks, skips=TEST_SKIP_VALUES)
+
+        assert list(monitor.targets()) == [
+            "192.168.1.2", "192.168.2.2",
+            "192.168.1.4", "192.168.2.4",
+            "192.168.1.6", "192.168.2.6",
+        ]
+
+    def test_backoff_schedule(self, monitor):
+        """stable offsets are probed less and less often, a change brings them back every cycle"""
+        monitor.due_offsets = list(range(monitor.offset_count))
+        monitor.changed_offsets = {3}
+        monitor.exponents[3] = TEST_MAX_BACKOFF_EXPONENT
+        monitor.finish_cycle()
+
+        assert monitor.exponents[2] == 1
+        assert monitor.exponents[3] == 0
+
+        monitor.due_offsets = [2]
+        monitor.finish_cycle()
+        monitor.finish_cycle()
+        assert monitor.exponents[2] == TEST_MAX_BACKOFF_EXPONENT
+
+        due = [cycle for cycle in range(8) if (setattr(monitor, "cycle", cycle) or monitor.is_due(2))]
+        assert due == [2, 6]
+
+    @pytest.mark.parametrize(
+        "mock_ping_with_side_effects",
+        [ScriptedPings({"192.168.2.2": [True, False, True]})],
+        indirect=True,
+    )
+    @pytest.mark.asyncio
+    async def test_transitions(self, monitor, mock_ping_with_side_effects):
+        """only the changes between cycles are reported"""
+        # probe every offset each cycle so the script lines up
+        monitor.max_backoff_exponent = 0
+        mock_ping_with_side_effects.side_effect.monitor = monitor
+        assert await monitor.run_cycle() == []
+        monitor.cycle += 1
+
+        transitions = await monitor.run_cycle()
+        assert [(t.kind, t.offset) for t in transitions] == [(NEW_MISMATCH, 2)]
+        assert transitions[0].results == {"192.168.1.2": True, "192.168.2.2": False}
+        monitor.cycle += 1
+
+        transitions = await monitor.run_cycle()
+        assert [(t.kind, t.offset) for t in transitions] == [(RESOLVED_MISMATCH, 2)]
+
+    @pytest.mark.parametrize(
+        "mock_ping_with_side_effects",
+        [ScriptedPings({"192.168.1.4": [True, False, True, False]})],
+        indirect=True,
+    )
+    @pytest.mark.asyncio
+    async def test_flapping(self, sample_networks, mock_ping_with_side_effects):
+        monitor = Monitor(sample_networks, interval=0, cycles=4, max_backoff_exponent=0)
+        mock_ping_with_side_effects.side_effect.monitor = monitor
+
+        await monitor.start()
+
+        assert monitor.cycle == 4
+        assert monitor.flapping[0][4]
+        assert not monitor.flapping[1][4]
+        assert (FLAPPING, 4) in [(t.kind, t.offset) for t in monitor.transitions]
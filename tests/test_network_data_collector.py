@@ -1,12 +1,20 @@
 import pytest
 import logging
 from joby_challenge.models.network_data_collector import NetworkDataCollector, DEFAULT_OCTET
+from joby_challenge.models.exclusions import Exclusions
 from tests.constants import TEST_SINGLE_IP
 
 NO_MISMATCH_TEXT = "No mismatches found between networks"
 TEST_REACHABLE_MAP = {True: "IS REACHABLE", False: "IS NOT REACHABLE"}
 TEST_SINGLE_IP_2 = "192.168.2.1"
 TEST_SINGLE_LAST_OCTET_2 = "192.168.1.2"
+TEST_SITE_NETWORKS = ["10.1.0.0/24", "10.2.0.0/24", "10.3.0.0/24"]
+DESCRIBE_SIGNATURE_TEST_CASES = [
+    (0b111, "up everywhere"),
+    (0b000, "down everywhere"),
+    (0b011, "down only at 10.3.0.0/24"),
+    (0b010, "up only at 10.2.0.0/24"),
+]
 MISMATCH_TEST_CASES = [
     ({}, 0),
     ({TEST_SINGLE_IP: True}, 0),
@@ -102,3 +110,80 @@ class TestNetworkDataCollector:
 
         assert f"{TEST_SINGLE_IP} {TEST_REACHABLE_MAP[True]}" in caplog.text
         assert  f"{TEST_SINGLE_IP_2} {TEST_REACHABLE_MAP[False]}" in caplog.text
+
+    def test_offset_store(self):
+        """with networks the collector stores by host offset and compares at the end"""
+        collector = NetworkDataCollector(networks=["192.168.5.0/24", "192.168.2.0/24"])
+        collector.add_result(TEST_SINGLE_IP, True)
+        collector.add_result(TEST_SINGLE_IP_2, False)
+
+        assert collector.store is not None
+        assert collector.data == {}
+        assert collector.mismatches == []
+        assert collector.get_all_results() == {"1": {TEST_SINGLE_IP: True, TEST_SINGLE_IP_2: False}}
+        assert collector.find_mismatches() == [{TEST_SINGLE_IP: True, TEST_SINGLE_IP_2: False}]
+
+    def test_finalize_offsets(self, caplog):
+        """an offset is reported as soon as its last counterpart is in, and then forgotten"""
+        caplog.set_level(logging.INFO)
+        collector = NetworkDataCollector(networks=TEST_SITE_NETWORKS[:2])
+        collector.track_hosts([(4, 0x0A010001, 0x0A0100FE), (4, 0x0A020001, 0x0A020002)], Exclusions(last_octets=[3]))
+
+        assert collector.counterparts(1) == 2
+        assert collector.counterparts(3) == 0
+        assert collector.counterparts(200) == 1
+
+        collector.add_result("10.1.0.1", True)
+        assert collector.outstanding == {1: 1}
+        assert collector.mismatches == []
+
+        collector.add_result("10.2.0.1", False)
+        assert collector.outstanding == {}
+        assert collector.mismatches == [{"10.1.0.1": True, "10.2.0.1": False}]
+        assert "MISMATCH 10.1.0.1 IS REACHABLE, 10.2.0.1 IS NOT REACHABLE" in caplog.text
+
+        # only one network has a host at offset 200
+        collector.add_result("10.1.0.200", False)
+        collector.add_result("10.1.0.2", True)
+        assert collector.outstanding == {2: 1}
+
+        collector.log_finalized()
+        assert collector.outstanding == {}
+        assert collector.finalized == 3
+        assert "1 mismatches across 3 offsets" in caplog.text
+
+    @pytest.mark.parametrize("signature,expected", DESCRIBE_SIGNATURE_TEST_CASES)
+    def test_describe_signature(self, signature, expected):
+        collector = NetworkDataCollector(networks=TEST_SITE_NETWORKS)
+        assert collector.describe_signature(signature) == expected
+
+    def test_log_signatures(self, caplog):
+        caplog.set_level(logging.INFO)
+        collector = NetworkDataCollector(networks=TEST_SITE_NETWORKS)
+
+        collector.log_signatures()
+        assert "No hosts were probed in every network" in caplog.text
+        caplog.clear()
+
+        for offset in range(1, 4):
+            collector.add_result(f"10.1.0.{offset}", True)
+            collector.add_result(f"10.2.0.{offset}", True)
+            collector.add_result(f"10.3.0.{offset}", offset != 2)
+
+        assert [group[:2] for group in collector.find_signatures()] == [(0b111, 2), (0b011, 1)]
+
+        collector.log_signatures()
+        assert "111 up everywhere: 2 hosts (offsets 1, 3)" in caplog.text
+        assert "110 down only at 10.3.0.0/24: 1 hosts (offsets 2)" in caplog.text
+
+    def test_log_sparse_signatures(self, caplog):
+        """sparse stores keep offsets at bitmap positions, the log names the offsets"""
+        caplog.set_level(logging.INFO)
+        collector = NetworkDataCollector(networks=TEST_SITE_NETWORKS, offsets=[10, 20])
+
+        for offset in (10, 20):
+            for network in range(1, 4):
+                collector.add_result(f"10.{network}.0.{offset}", True)
+
+        collector.log_signatures()
+        assert "111 up everywhere: 2 hosts (offsets 10, 20)" in caplog.text
@@ -1,6 +1,20 @@
 import pytest
-from unittest.mock import MagicMock
-from joby_challenge.models.orchestrator import Orchestrator, DEFAULT_MAX_CONCURRENT_WORKERS
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, MagicMock, patch
+from joby_challenge.models.orchestrator import (
+    Orchestrator,
+    HostResult,
+    Mismatch,
+    DEFAULT_MAX_CONCURRENT_WORKERS,
+    REPORT_SIGNATURES,
+    run_shard,
+)
+from joby_challenge.models.snapshot import Snapshot, REACHABLE
+from joby_challenge.models.metrics import registry
+from joby_challenge.models.ip_address_handler import LazyIPAddresses
+from joby_challenge.models.probe_backends import AdaptiveTimeouts, TCPConnectBackend
+from joby_challenge.models.icmp_backend import ICMPBackend
 from tests.constants import (
     TEST_NETWORK_CIDR,
     TEST_NETWORK_CIDR_2,
@@ -20,6 +34,7 @@ ORCHESTRATOR_INIT_TEST_CASES = [
         TEST_MAX_CONCURRENT,
     ),
 ]
+TEST_IPV6_PREFIXES = ["2001:db8:1::/64", "2001:db8:2::/64"]
 ORCHESTRATOR_START_RESULT = {
     "1": {"192.168.1.1": False, "192.168.2.1": False},
     "2": {"192.168.1.2": True, "192.168.2.2": True},
@@ -38,6 +53,26 @@ def ping_side_effect(host, timeout=None):
         raise Exception("ping failure")
 
 
+def mismatch_side_effect(host, timeout=None):
+    if host == "192.168.2.2":
+        raise Exception("ping failure")
+
+
+async def hanging_side_effect(host, timeout=None):
+    await asyncio.get_running_loop().create_future()
+
+
+async def yield_control(times=20):
+    """Let other tasks run, asyncio.sleep is mocked in these tests."""
+    for _ in range(times):
+        await asyncio.wait([asyncio.get_running_loop().create_future()], timeout=0)
+
+
+def ipv6_side_effect(host, timeout=None):
+    if host.startswith("2001:db8:2:"):
+        raise Exception("ping failure")
+
+
 class TestOrchestrator:
 
     @pytest.mark.parametrize(
@@ -58,9 +93,24 @@ class TestOrchestrator:
         assert orchestrator.data_collector.data == {}
 
         # Check that the worker pool is correctly initialized
-        assert orchestrator.worker_pool.target_function.__name__ == "ping_host"
+        assert isinstance(orchestrator.backend, ICMPBackend)
+        assert orchestrator.worker_pool.target_function == orchestrator.backend.probe
         assert orchestrator.worker_pool.concurrent_workers == max_concurrent
 
+    def test_adaptive_timeouts(self, sample_networks):
+        orchestrator = Orchestrator(
+            sample_networks, backend="tcp", backend_options={"timeout": 2.0}, adaptive_timeouts=True
+        )
+
+        assert isinstance(orchestrator.backend, AdaptiveTimeouts)
+        assert isinstance(orchestrator.backend.backend, TCPConnectBackend)
+        assert orchestrator.worker_pool.target_function == orchestrator.backend.probe
+        # the ceiling defaults to the backend's own timeout
+        assert orchestrator.rtt.max_timeout == 2.0
+
+        bounded = Orchestrator(sample_networks, adaptive_timeouts=True, timeout_bounds=(0.01, 0.5))
+        assert (bounded.rtt.min_timeout, bounded.rtt.max_timeout) == (0.01, 0.5)
+
     @pytest.mark.parametrize(
         "mock_ping_with_side_effects", [ping_side_effect], indirect=True
     )
@@ -81,3 +131,343 @@ class TestOrchestrator:
 
         # Check that the result matches our expected value
         assert result == ORCHESTRATOR_START_RESULT
+
+    @pytest.mark.parametrize(
+        "mock_ping_with_side_effects", [ping_side_effect], indirect=True
+    )
+    @pytest.mark.asyncio
+    async def test_start_lazy(self, sample_networks, mock_ping_with_side_effects):
+        """lazy target generation produces the same results"""
+        orchestrator = Orchestrator(sample_networks, lazy=True)
+
+        assert await orchestrator.start() == ORCHESTRATOR_START_RESULT
+
+    @pytest.mark.parametrize(
+        "mock_ping_with_side_effects", [ping_side_effect], indirect=True
+    )
+    @pytest.mark.asyncio
+    async def test_start_interleaved(self, sample_networks, mock_ping_with_side_effects):
+        """interleaved scans finalize every offset during the scan and skip the end of scan report"""
+        orchestrator = Orchestrator(sample_networks, interleave=True)
+        orchestrator.data_collector.log_mismatches = MagicMock()
+
+        assert await orchestrator.start() == ORCHESTRATOR_START_RESULT
+        assert orchestrator.data_collector.outstanding == {}
+        assert orchestrator.data_collector.finalized == len(ORCHESTRATOR_START_RESULT)
+        orchestrator.data_collector.log_mismatches.assert_not_called()
+
+    @pytest.mark.parametrize("interleave", [False, True])
+    @pytest.mark.parametrize(
+        "mock_ping_with_side_effects", [mismatch_side_effect], indirect=True
+    )
+    @pytest.mark.asyncio
+    async def test_start_sinks(self, sample_networks, mock_ping_with_side_effects, interleave):
+        """sinks get every result as it arrives plus the mismatches, and are closed at the end"""
+        sink = MagicMock(backlogged=False)
+        sink.drain = AsyncMock()
+        sink.close = AsyncMock()
+        orchestrator = Orchestrator(sample_networks, interleave=interleave, sinks=[sink])
+
+        await orchestrator.start()
+
+        assert sink.write.call_count == len(ORCHESTRATOR_START_RESULT) * 2
+        sink.write.assert_any_call("192.168.2.2", False)
+        sink.write_mismatch.assert_called_once_with({"192.168.1.2": True, "192.168.2.2": False})
+        sink.close.assert_awaited_once()
+
+    @pytest.mark.parametrize(
+        "mock_ping_with_side_effects", [mismatch_side_effect], indirect=True
+    )
+    @pytest.mark.asyncio
+    async def test_stream_finds_mismatches_once(self, sample_networks, mock_ping_with_side_effects):
+        """the report, the sinks and the stream share one pass over the store"""
+        orchestrator = Orchestrator(sample_networks)
+        store = orchestrator.data_collector.store
+
+        with patch.object(store, "mismatches", wraps=store.mismatches) as mismatches:
+            events = [event async for event in orchestrator.stream()]
+
+        assert mismatches.call_count == 1
+        assert Mismatch({"192.168.1.2": True, "192.168.2.2": False}) in events
+
+    @pytest.mark.parametrize("interleave", [False, True])
+    @pytest.mark.parametrize(
+        "mock_ping_with_side_effects", [mismatch_side_effect], indirect=True
+    )
+    @pytest.mark.asyncio
+    async def test_stream(self, sample_networks, mock_ping_with_side_effects, interleave):
+        """every host result and the mismatch come out of stream() as they complete"""
+        orchestrator = Orchestrator(sample_networks, interleave=interleave)
+
+        events = [event async for event in orchestrator.stream()]
+
+        results = [event for event in events if isinstance(event, HostResult)]
+        assert len(results) == len(ORCHESTRATOR_START_RESULT) * 2
+        assert HostResult("192.168.2.2", False) in results
+        assert [event for event in events if isinstance(event, Mismatch)] == [
+            Mismatch({"192.168.1.2": True, "192.168.2.2": False})
+        ]
+        assert orchestrator.events is None
+        assert orchestrator.worker_pool.result_callback == orchestrator.add_result
+
+    @pytest.mark.parametrize(
+        "mock_ping_with_side_effects", [ping_side_effect], indirect=True
+    )
+    @pytest.mark.asyncio
+    async def test_stream_sharded(self, sample_networks, mock_ping_with_side_effects):
+        orchestrator = Orchestrator(sample_networks, processes=2)
+
+        with patch("joby_challenge.models.orchestrator.ProcessPoolExecutor", ThreadPoolExecutor):
+            events = [event async for event in orchestrator.stream()]
+
+        assert len(events) == len(ORCHESTRATOR_START_RESULT) * 2
+
+    @pytest.mark.parametrize(
+        "mock_ping_with_side_effects", [ping_side_effect], indirect=True
+    )
+    @pytest.mark.asyncio
+    async def test_stream_buffer_holds_workers_back(self, sample_networks, mock_ping_with_side_effects):
+        """a consumer that stops reading stops the scan once the buffer is full"""
+        orchestrator = Orchestrator(sample_networks, max_concurrent=1)
+        stream = orchestrator.stream(buffer_size=1)
+
+        await stream.__anext__()
+        await yield_control()
+
+        # one event taken, one in the buffer, one waiting in the worker's callback
+        assert orchestrator.data_collector.store.probed[0].count() + orchestrator.data_collector.store.probed[1].count() <= 3
+        await stream.aclose()
+
+    @pytest.mark.parametrize(
+        "mock_ping_with_side_effects", [ping_side_effect], indirect=True
+    )
+    @pytest.mark.asyncio
+    async def test_stream_closed_early(self, sample_networks, mock_ping_with_side_effects):
+        """closing the stream cancels the scan and stops its workers"""
+        sink = MagicMock(backlogged=False)
+        sink.drain = AsyncMock()
+        sink.close = AsyncMock()
+        orchestrator = Orchestrator(sample_networks, sinks=[sink])
+        stream = orchestrator.stream()
+
+        await stream.__anext__()
+        await stream.aclose()
+
+        assert orchestrator.worker_pool.workers == []
+        assert orchestrator.events is None
+        sink.close.assert_awaited_once()
+
+    @pytest.mark.parametrize(
+        "mock_ping_with_side_effects", [hanging_side_effect], indirect=True
+    )
+    @pytest.mark.asyncio
+    async def test_stream_deadline(self, sample_networks, mock_ping_with_side_effects):
+        orchestrator = Orchestrator(sample_networks)
+
+        with pytest.raises(asyncio.TimeoutError):
+            async for _ in orchestrator.stream(deadline=0.05):
+                pass
+
+        assert orchestrator.worker_pool.workers == []
+
+    @pytest.mark.asyncio
+    async def test_stream_scan_error(self, orchestrator):
+        orchestrator.run_pool = AsyncMock(side_effect=RuntimeError("boom"))
+
+        with pytest.raises(RuntimeError, match="boom"):
+            async for _ in orchestrator.stream():
+                pass
+
+    @pytest.mark.parametrize(
+        "mock_ping_with_side_effects", [ping_side_effect], indirect=True
+    )
+    @pytest.mark.asyncio
+    async def test_start_snapshot(self, sample_networks, mock_ping_with_side_effects, tmp_path):
+        path = tmp_path / "scan.snap"
+        orchestrator = Orchestrator(sample_networks, skips=TEST_SKIP_VALUES, snapshot_path=path)
+
+        await orchestrator.start()
+
+        with Snapshot(path) as snapshot:
+            assert [str(network) for network in snapshot.networks] == sample_networks
+            assert snapshot.metadata["skips"] == TEST_SKIP_VALUES
+            assert snapshot.bitmap(0, REACHABLE) == orchestrator.data_collector.store.reachable[0].to_int()
+
+    def test_invalid_report(self, sample_networks):
+        with pytest.raises(ValueError):
+            Orchestrator(sample_networks, report="everything")
+
+    def test_sharded_metrics_rejected(self, sample_networks, tmp_path):
+        """shards count into their own processes' registries, the parent would report nothing"""
+        with pytest.raises(ValueError, match="single process"):
+            Orchestrator(sample_networks, processes=2, metrics_path=str(tmp_path / "metrics.prom"))
+        with pytest.raises(ValueError, match="single process"):
+            Orchestrator(sample_networks, processes=2, progress=True)
+
+    @pytest.mark.parametrize(
+        "mock_ping_with_side_effects", [ping_side_effect], indirect=True
+    )
+    @pytest.mark.asyncio
+    async def test_metrics_reset_per_scan(self, sample_networks, mock_ping_with_side_effects):
+        orchestrator = Orchestrator(sample_networks)
+
+        await orchestrator.start()
+        await orchestrator.start()
+
+        assert registry.results == len(ORCHESTRATOR_START_RESULT) * 2
+
+    @pytest.mark.parametrize(
+        "mock_ping_with_side_effects", [ping_side_effect], indirect=True
+    )
+    @pytest.mark.asyncio
+    async def test_start_signatures(self, sample_networks, mock_ping_with_side_effects):
+        """the signature report replaces the mismatch report"""
+        orchestrator = Orchestrator(sample_networks, report=REPORT_SIGNATURES)
+        orchestrator.data_collector.log_mismatches = MagicMock()
+        orchestrator.data_collector.log_signatures = MagicMock()
+
+        await orchestrator.start()
+
+        orchestrator.data_collector.log_signatures.assert_called_once()
+        orchestrator.data_collector.log_mismatches.assert_not_called()
+
+    def test_adaptive_concurrency(self, sample_networks):
+        """the pool gets enough workers for the upper bound, the limiter starts at max_concurrent"""
+        orchestrator = Orchestrator(
+            sample_networks,
+            max_concurrent=TEST_MAX_CONCURRENT,
+            adaptive_concurrency=True,
+            concurrency_bounds=(2, 100),
+        )
+
+        assert orchestrator.worker_pool.concurrent_workers == 100
+        assert orchestrator.worker_pool.concurrency_limiter is orchestrator.concurrency_limiter
+        assert orchestrator.concurrency_limiter.limit == TEST_MAX_CONCURRENT
+
+    @pytest.mark.parametrize(
+        "mock_ping_with_side_effects", [ping_side_effect], indirect=True
+    )
+    def test_shard_built_inside_its_loop(self, sample_networks, mock_ping_with_side_effects):
+        """pools, locks and limiters must belong to the loop the shard runs on"""
+        orchestrator = Orchestrator(sample_networks, processes=2)
+        shard = LazyIPAddresses([(4, 0xC0A80101, 0xC0A80101)])
+        loops = []
+        init = Orchestrator.__init__
+
+        def recording_init(self, *args, **kwargs):
+            loops.append(asyncio.get_running_loop())
+            init(self, *args, **kwargs)
+
+        with patch.object(Orchestrator, "__init__", recording_init):
+            run_shard(sample_networks, None, shard, orchestrator.shard_options)
+
+        assert len(loops) == 1
+
+    @pytest.mark.parametrize(
+        "mock_ping_with_side_effects", [ping_side_effect], indirect=True
+    )
+    def test_run_shard(self, sample_networks, mock_ping_with_side_effects):
+        """a shard scans only its ranges and hands back packed results"""
+        orchestrator = Orchestrator(sample_networks, processes=2)
+        shard = LazyIPAddresses([(4, 0xC0A80101, 0xC0A80103)])
+
+        orchestrator.data_collector.store.merge(run_shard(sample_networks, None, shard, orchestrator.shard_options))
+
+        assert orchestrator.data == {
+            "1": {"192.168.1.1": False},
+            "2": {"192.168.1.2": True},
+            "3": {"192.168.1.3": False},
+        }
+
+    @pytest.mark.parametrize(
+        "mock_ping_with_side_effects", [ping_side_effect], indirect=True
+    )
+    @pytest.mark.asyncio
+    async def test_start_sharded(self, sample_networks, mock_ping_with_side_effects):
+        """sharded scans merge to the same results as a single process"""
+        orchestrator = Orchestrator(sample_networks, processes=3, rate_limit=300)
+
+        assert orchestrator.shard_options["rate_limit"] == 100
+
+        # threads stand in for processes so the ping mock applies
+        with patch("joby_challenge.models.orchestrator.ProcessPoolExecutor", ThreadPoolExecutor):
+            result = await orchestrator.start()
+
+        assert result == ORCHESTRATOR_START_RESULT
+
+    @pytest.mark.parametrize(
+        "mock_ping_with_side_effects", [ping_side_effect], indirect=True
+    )
+    @pytest.mark.asyncio
+    async def test_start_cached(self, sample_networks, mock_ping_with_side_effects, tmp_path):
+        """a rescan answers every host from the cache and still reports the same results"""
+        cache_path = str(tmp_path / "cache.sqlite")
+
+        await Orchestrator(sample_networks, cache_path=cache_path).start()
+        first_run_pings = mock_ping_with_side_effects.call_count
+        assert first_run_pings
+
+        result = await Orchestrator(sample_networks, cache_path=cache_path).start()
+
+        assert result == ORCHESTRATOR_START_RESULT
+        assert mock_ping_with_side_effects.call_count == first_run_pings
+
+    @pytest.mark.parametrize("processes", [1, 2])
+    @pytest.mark.parametrize(
+        "mock_ping_with_side_effects", [ping_side_effect], indirect=True
+    )
+    @pytest.mark.asyncio
+    async def test_start_resumed(self, sample_networks, mock_ping_with_side_effects, tmp_path, processes):
+        """a resumed scan restores the journaled results and only probes the rest"""
+        journal_path = str(tmp_path / "scan.journal")
+        interrupted = Orchestrator(sample_networks, checkpoint_path=journal_path)
+        interrupted.checkpoint.prepare()
+        interrupted.checkpoint.open()
+        for host in ["192.168.1.1", "192.168.1.2", "192.168.2.1"]:
+            interrupted.add_result(host, host.endswith(".2"))
+        interrupted.checkpoint.close()
+
+        orchestrator = Orchestrator(sample_networks, checkpoint_path=journal_path, resume=True, processes=processes)
+        with patch("joby_challenge.models.orchestrator.ProcessPoolExecutor", ThreadPoolExecutor):
+            result = await orchestrator.start()
+
+        assert result == ORCHESTRATOR_START_RESULT
+        pinged = {call.args[0] for call in mock_ping_with_side_effects.call_args_list}
+        assert not pinged & {"192.168.1.1", "192.168.1.2", "192.168.2.1"}
+        assert "192.168.2.2" in pinged
+
+        # the journal now covers the whole scan, resuming again probes nothing
+        mock_ping_with_side_effects.reset_mock()
+        assert await Orchestrator(sample_networks, checkpoint_path=journal_path, resume=True).start() == ORCHESTRATOR_START_RESULT
+        mock_ping_with_side_effects.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "mock_ping_with_side_effects", [ipv6_side_effect], indirect=True
+    )
+    @pytest.mark.asyncio
+    async def test_start_target_offsets(self, mock_ping_with_side_effects):
+        """sparse targets probe only the given offsets and line results up by them"""
+        orchestrator = Orchestrator(TEST_IPV6_PREFIXES, target_offsets=[1], interleave=True)
+
+        assert await orchestrator.start() == {"1": {"2001:db8:1::1": True, "2001:db8:2::1": False}}
+        assert len(orchestrator.data_collector.mismatches) == 1
+
+        with pytest.raises(ValueError):
+            Orchestrator(TEST_IPV6_PREFIXES, target_offsets=[1], snapshot_path="scan.snap")
+
+    @pytest.mark.parametrize(
+        "mock_ping_with_side_effects", [mismatch_side_effect], indirect=True
+    )
+    @pytest.mark.asyncio
+    async def test_start_targets_file(self, sample_networks, mock_ping_with_side_effects, tmp_path):
+        """only streamed addresses are probed, each once, and still compared by offset"""
+        path = tmp_path / "targets.txt"
+        path.write_text("192.168.1.2\n192.168.2.2\n192.168.1.2\n192.168.2.3\n")
+        orchestrator = Orchestrator(sample_networks, targets_file=str(path), processes=2, interleave=True)
+
+        assert (orchestrator.processes, orchestrator.interleave) == (1, False)
+        assert await orchestrator.start() == {
+            "2": {"192.168.1.2": True, "192.168.2.2": False},
+            "3": {"192.168.2.3": True},
+        }
+        assert mock_ping_with_side_effects.call_count == 3 + 2
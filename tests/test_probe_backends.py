@@ -0,0 +1,229 @@
+import pytest
+import asyncio
+import contextlib
+import socket
+from unittest.mock import patch
+from joby_challenge.models.metrics import registry
+from joby_challenge.models.rtt_estimator import RTTEstimator
+from joby_challenge.models.probe_backends import (
+    AdaptiveTimeouts,
+    ProbeBackend,
+    TCPConnectBackend,
+    UDPBackend,
+)
+from joby_challenge.models.icmp_backend import ICMPBackend
+
+TEST_HOST = "127.0.0.1"
+TEST_IPV6_HOST = "::1"
+TEST_TIMEOUT = 0.2
+TEST_MAX_CONNECTIONS = 2
+TEST_PORT_COUNT = 6
+
+
+def free_port(kind=socket.SOCK_STREAM, family=socket.AF_INET, host=TEST_HOST):
+    """A port nothing listens on, found by binding and releasing it."""
+    with socket.socket(family, kind) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def reset_metrics():
+    registry.reset()
+    yield registry
+    registry.reset()
+
+
+@contextlib.asynccontextmanager
+async def tcp_listener():
+    server = await asyncio.start_server(lambda reader, writer: writer.close(), TEST_HOST, 0)
+    try:
+        yield server.sockets[0].getsockname()[1]
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+class EchoProtocol(asyncio.DatagramProtocol):
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, address):
+        self.transport.sendto(data or b"\x00", address)
+
+
+@contextlib.asynccontextmanager
+async def udp_listener():
+    transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(EchoProtocol, local_addr=(TEST_HOST, 0))
+    try:
+        yield transport.get_extra_info("sockname")[1]
+    finally:
+        transport.close()
+
+
+@pytest.fixture
+def silent_udp_port():
+    """A bound UDP port that never answers, so probes to it time out."""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind((TEST_HOST, 0))
+        yield sock.getsockname()[1]
+
+
+class CountingBackend(ProbeBackend):
+    """Records how many port checks run at once, every port fails after a short wait."""
+    def __init__(self, max_connections):
+        super().__init__(TEST_TIMEOUT, max_connections)
+        self.active = 0
+        self.peak = 0
+
+    async def probe(self, host, timeout=None):
+        return await self.first_success(host, range(TEST_PORT_COUNT), self.timeout)
+
+    async def check_port(self, host, port, timeout):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(0.01)
+            raise ConnectionResetError()
+        finally:
+            self.active -= 1
+
+
+class TestTCPConnectBackend:
+    @pytest.mark.asyncio
+    async def test_open_port(self, reset_metrics):
+        async with tcp_listener() as port:
+            backend = TCPConnectBackend(timeout=TEST_TIMEOUT, ports=[port])
+
+            assert await backend.probe(TEST_HOST) is True
+        assert reset_metrics.probes == 1
+
+    @pytest.mark.asyncio
+    async def test_refused_port_means_up(self):
+        """A RST comes from the host itself, so it's up even with nothing listening."""
+        backend = TCPConnectBackend(timeout=TEST_TIMEOUT, ports=[free_port()])
+
+        assert await backend.probe(TEST_HOST) is True
+
+    @pytest.mark.asyncio
+    async def test_ipv6(self):
+        backend = TCPConnectBackend(timeout=TEST_TIMEOUT, ports=[free_port(family=socket.AF_INET6, host=TEST_IPV6_HOST)])
+
+        assert await backend.probe(TEST_IPV6_HOST) is True
+
+    @pytest.mark.asyncio
+    async def test_silence_times_out(self, reset_metrics):
+        backend = TCPConnectBackend(timeout=TEST_TIMEOUT, ports=[free_port()])
+        loop = asyncio.get_running_loop()
+
+        # a connect that never completes, like a host that drops the SYN
+        with patch.object(loop, "sock_connect", new=lambda sock, address: loop.create_future()):
+            assert await backend.probe(TEST_HOST) is False
+
+        assert reset_metrics.timeouts == 1
+
+
+class TestUDPBackend:
+    @pytest.mark.asyncio
+    async def test_reply(self):
+        async with udp_listener() as port:
+            backend = UDPBackend(timeout=TEST_TIMEOUT, ports=[port], payload=b"ping")
+
+            assert await backend.probe(TEST_HOST) is True
+
+    @pytest.mark.asyncio
+    async def test_port_unreachable_means_up(self):
+        backend = UDPBackend(timeout=TEST_TIMEOUT, ports=[free_port(socket.SOCK_DGRAM)])
+
+        assert await backend.probe(TEST_HOST) is True
+
+    @pytest.mark.asyncio
+    async def test_silence_times_out(self, silent_udp_port, reset_metrics):
+        backend = UDPBackend(timeout=TEST_TIMEOUT, ports=[silent_udp_port])
+
+        assert await backend.probe(TEST_HOST) is False
+        assert reset_metrics.timeouts == 1
+        assert reset_metrics.errors == 0
+
+
+class TestProbeBackend:
+    @pytest.mark.asyncio
+    async def test_first_success_wins(self, silent_udp_port):
+        """The answering port settles the probe without waiting for the others."""
+        backend = UDPBackend(timeout=5.0, ports=[silent_udp_port, free_port(socket.SOCK_DGRAM)])
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+
+        assert await backend.probe(TEST_HOST) is True
+        assert loop.time() - started < 1.0
+
+    @pytest.mark.asyncio
+    async def test_connection_cap(self, reset_metrics):
+        backend = CountingBackend(max_connections=TEST_MAX_CONNECTIONS)
+
+        results = await asyncio.gather(*(backend.probe(TEST_HOST) for _ in range(4)))
+
+        assert results == [False] * 4
+        assert backend.peak == TEST_MAX_CONNECTIONS
+        assert reset_metrics.errors == 4
+
+    @pytest.mark.asyncio
+    async def test_uncapped(self):
+        backend = CountingBackend(max_connections=None)
+
+        await backend.probe(TEST_HOST)
+
+        assert backend.peak == TEST_PORT_COUNT
+
+    @pytest.mark.parametrize("mock_ping_with_side_effects", [[0.01]], indirect=True)
+    @pytest.mark.asyncio
+    async def test_icmp_backend_uses_probe_host(self, mock_ping_with_side_effects):
+        backend = ICMPBackend()
+
+        assert await backend.probe(TEST_HOST) is True
+
+
+class RecordingBackend(ProbeBackend):
+    """Answers for TEST_HOST only, recording the timeout of every probe."""
+    def __init__(self):
+        super().__init__(TEST_TIMEOUT, None)
+        self.timeouts = []
+        self.closed = False
+
+    async def probe(self, host, timeout=None):
+        self.timeouts.append(timeout)
+        return host == TEST_HOST
+
+    def close(self):
+        self.closed = True
+
+
+class TestAdaptiveTimeouts:
+    @pytest.mark.asyncio
+    async def test_replies_shorten_timeouts(self, reset_metrics):
+        inner = RecordingBackend()
+        estimator = RTTEstimator(0.01, TEST_TIMEOUT)
+        backend = AdaptiveTimeouts(inner, estimator)
+
+        assert await backend.probe(TEST_HOST) is True
+        assert await backend.probe("127.0.0.2") is False
+
+        assert inner.timeouts[0] == TEST_TIMEOUT
+        assert inner.timeouts[1] == 0.01
+        # only the reply is a sample
+        assert estimator.overall.samples == 1
+
+    @pytest.mark.asyncio
+    async def test_explicit_timeout_wins(self):
+        inner = RecordingBackend()
+        backend = AdaptiveTimeouts(inner, RTTEstimator(0.01, TEST_TIMEOUT))
+
+        await backend.probe(TEST_HOST, timeout=5.0)
+
+        assert inner.timeouts == [5.0]
+
+    def test_close(self):
+        inner = RecordingBackend()
+        AdaptiveTimeouts(inner, RTTEstimator()).close()
+
+        assert inner.closed
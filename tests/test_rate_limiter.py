@@ -0,0 +1,103 @@
+import pytest
+import time
+from unittest.mock import patch, MagicMock, AsyncMock
+from joby_challenge.models.rate_limiter import RateLimiter, TokenBucket, MAX_SUBNET_BUCKETS
+from joby_challenge.models.async_worker_pool import AsyncWorkerPool
+from joby_challenge.utils import subnet
+
+TEST_RATE = 10
+TEST_BURST = 2
+TEST_TIME = 1000.0
+SUBNET_TEST_CASES = [
+    ("192.168.1.1", "192.168.1.200", True),
+    ("192.168.1.1", "192.168.2.1", False),
+    ("2001:db8::1", "2001:db8::ffff", True),
+    ("2001:db8::1", "2001:db8:0:1::1", False),
+]
+
+
+@pytest.fixture
+def clock():
+    """Frozen time.monotonic that tests move by hand."""
+    with patch("joby_challenge.models.rate_limiter.time.monotonic", return_value=TEST_TIME) as mock:
+        yield mock
+
+
+class TestTokenBucket:
+
+    def test_invalid_rate(self):
+        with pytest.raises(ValueError):
+            TokenBucket(0)
+
+    def test_reserve(self, clock):
+        """the burst is free, after that every token costs 1/rate seconds more"""
+        bucket = TokenBucket(TEST_RATE, burst=TEST_BURST)
+
+        delays = [bucket.reserve() for _ in range(TEST_BURST + 3)]
+
+        assert delays[:TEST_BURST] == [0.0] * TEST_BURST
+        assert delays[TEST_BURST:] == pytest.approx([0.1, 0.2, 0.3])
+
+    def test_refill(self, clock):
+        bucket = TokenBucket(TEST_RATE, burst=TEST_BURST)
+        for _ in range(TEST_BURST):
+            bucket.reserve()
+        assert not bucket.idle()
+
+        clock.return_value = TEST_TIME + 10
+        assert bucket.idle()
+        assert bucket.tokens == TEST_BURST
+
+
+class TestRateLimiter:
+
+    @pytest.mark.parametrize("first,second,same", SUBNET_TEST_CASES)
+    def test_subnet(self, first, second, same):
+        assert (subnet(first) == subnet(second)) is same
+
+    @pytest.mark.asyncio
+    async def test_acquire_waits(self, clock, mock_async_sleep):
+        limiter = RateLimiter(packets_per_second=TEST_RATE)
+
+        for _ in range(3):
+            await limiter.acquire("192.168.1.1")
+
+        # burst of one token at 10pps, then 0.1s and 0.2s waits
+        assert [call.args[0] for call in mock_async_sleep.call_args_list] == pytest.approx([0.1, 0.2])
+        assert limiter.waited == pytest.approx(0.3)
+
+    @pytest.mark.asyncio
+    async def test_subnet_buckets_are_separate(self, clock, mock_async_sleep):
+        limiter = RateLimiter(subnet_packets_per_second=TEST_RATE)
+
+        await limiter.acquire("192.168.1.1")
+        await limiter.acquire("192.168.2.1")
+        mock_async_sleep.assert_not_called()
+
+        await limiter.acquire("192.168.1.2")
+        mock_async_sleep.assert_called_once()
+
+    def test_prune(self, clock):
+        limiter = RateLimiter(subnet_packets_per_second=TEST_RATE)
+        limiter.subnet_bucket("192.168.1.1").reserve()
+
+        for index in range(MAX_SUBNET_BUCKETS):
+            limiter.subnet_bucket(f"10.{index // 256}.{index % 256}.1")
+
+        # the idle buckets were dropped, the one that was used is still refilling
+        assert len(limiter.subnet_buckets) < MAX_SUBNET_BUCKETS
+        assert subnet("192.168.1.1") in limiter.subnet_buckets
+
+    @pytest.mark.asyncio
+    async def test_pool_rate(self):
+        """the pool as a whole is held to the configured rate"""
+        limiter = RateLimiter(packets_per_second=200)
+        pool = AsyncWorkerPool(AsyncMock(return_value=True), MagicMock(), rate_limiter=limiter)
+        hosts = [f"192.168.1.{index}" for index in range(1, 61)]
+
+        started = time.monotonic()
+        await pool.start(hosts)
+        elapsed = time.monotonic() - started
+
+        # 60 packets with a burst of 20 at 200pps need at least 0.2s
+        assert elapsed >= 0.19
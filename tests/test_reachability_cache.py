@@ -0,0 +1,96 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from joby_challenge.models.reachability_cache import ReachabilityCache, pack_address, WRITE_BATCH_SIZE
+from tests.constants import TEST_SINGLE_IP
+
+TEST_TIME = 1000.0
+TEST_TTL = 60.0
+TEST_ADDRESSES = ["192.168.1.1", "192.168.1.2", "192.168.1.3"]
+PACK_TEST_CASES = [("192.168.1.1", b"\xc0\xa8\x01\x01"), ("::1", bytes(15) + b"\x01")]
+
+
+@pytest.fixture
+def clock():
+    with patch("joby_challenge.models.reachability_cache.time.time", return_value=TEST_TIME) as mock:
+        yield mock
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = ReachabilityCache(str(tmp_path / "cache.sqlite"), ttl=TEST_TTL, changed_ttl=0)
+    yield cache
+    cache.close()
+
+
+class TestReachabilityCache:
+
+    @pytest.mark.parametrize("address,expected", PACK_TEST_CASES)
+    def test_pack_address(self, address, expected):
+        assert pack_address(address) == expected
+
+    def test_lookup_fresh_and_expired(self, cache, clock):
+        cache.record(TEST_ADDRESSES[0], True)
+        cache.record(TEST_ADDRESSES[1], False)
+        cache.flush()
+
+        assert cache.lookup(TEST_ADDRESSES) == {TEST_ADDRESSES[0]: True, TEST_ADDRESSES[1]: False}
+
+        clock.return_value = TEST_TIME + TEST_TTL + 1
+        assert cache.lookup(TEST_ADDRESSES) == {}
+
+    def test_changed_entries_expire(self, cache, clock):
+        """a result that flips the cached one is re-probed next time"""
+        cache.record(TEST_SINGLE_IP, True)
+        cache.flush()
+
+        clock.return_value = TEST_TIME + 1
+        cache.record(TEST_SINGLE_IP, False)
+        cache.flush()
+        assert cache.lookup([TEST_SINGLE_IP]) == {}
+
+        # the same result again is trusted for the full TTL
+        clock.return_value = TEST_TIME + 2
+        cache.record(TEST_SINGLE_IP, False)
+        cache.flush()
+        assert cache.lookup([TEST_SINGLE_IP]) == {TEST_SINGLE_IP: False}
+
+    def test_filter(self, cache):
+        cache.record(TEST_ADDRESSES[1], True)
+        cache.flush()
+        on_hit = MagicMock()
+
+        assert list(cache.filter(TEST_ADDRESSES, on_hit)) == [TEST_ADDRESSES[0], TEST_ADDRESSES[2]]
+        on_hit.assert_called_once_with(TEST_ADDRESSES[1], True)
+        assert (cache.hits, cache.misses) == (1, 2)
+
+    @pytest.mark.asyncio
+    async def test_afilter(self, cache):
+        cache.record(TEST_ADDRESSES[1], True)
+        cache.flush()
+        on_hit = MagicMock()
+
+        async def addresses():
+            for address in TEST_ADDRESSES:
+                yield address
+
+        assert [address async for address in cache.afilter(addresses(), on_hit)] == [TEST_ADDRESSES[0], TEST_ADDRESSES[2]]
+        on_hit.assert_called_once_with(TEST_ADDRESSES[1], True)
+
+    def test_record_batches(self, cache):
+        for index in range(WRITE_BATCH_SIZE - 1):
+            cache.record(f"10.0.{index // 256}.{index % 256}", True)
+        assert len(cache.pending) == WRITE_BATCH_SIZE - 1
+
+        cache.record(TEST_SINGLE_IP, True)
+        assert cache.pending == []
+        assert cache.lookup([TEST_SINGLE_IP]) == {TEST_SINGLE_IP: True}
+
+    def test_persists(self, tmp_path, clock):
+        path = str(tmp_path / "cache.sqlite")
+        cache = ReachabilityCache(path)
+        cache.record(TEST_SINGLE_IP, True)
+        cache.close()
+
+        cache = ReachabilityCache(path)
+        assert cache.lookup([TEST_SINGLE_IP]) == {TEST_SINGLE_IP: True}
+        cache.close()
@@ -0,0 +1,146 @@
+import asyncio
+import csv
+import json
+import pytest
+import threading
+import time
+from joby_challenge.models.result_sink import CSVSink, MismatchSink, NDJSONSink, open_sink, CSV_FIELDS, MAX_PENDING_BATCHES
+from tests.constants import TEST_SINGLE_IP
+
+TEST_BATCH_SIZE = 10
+TEST_RESULT_COUNT = 1000
+TEST_MISMATCH = {"192.168.1.1": True, "192.168.2.1": False}
+OPEN_SINK_TEST_CASES = [("results.csv", CSVSink), ("results.ndjson", NDJSONSink), ("results.jsonl", NDJSONSink)]
+
+
+def addresses(count):
+    return [f"10.0.{index >> 8}.{index & 0xFF}" for index in range(count)]
+
+
+class SlowDiskSink(NDJSONSink):
+    """Writer thread stuck until the disk is released."""
+    def __init__(self, path, batch_size):
+        super().__init__(path, batch_size)
+        self.disk = threading.Event()
+
+    def write_records(self, records):
+        self.disk.wait()
+        super().write_records(records)
+
+
+class MeteredDiskSink(NDJSONSink):
+    """Writer thread writes one batch per release of the disk."""
+    def __init__(self, path, batch_size):
+        super().__init__(path, batch_size)
+        self.disk = threading.Semaphore(0)
+
+    def write_records(self, records):
+        self.disk.acquire()
+        super().write_records(records)
+
+
+class TestResultSink:
+
+    @pytest.mark.parametrize("name,sink_class", OPEN_SINK_TEST_CASES)
+    def test_open_sink(self, tmp_path, name, sink_class):
+        sink = open_sink(tmp_path / name)
+        sink.executor.shutdown()
+        sink.file.close()
+
+        assert type(sink) is sink_class
+
+    @pytest.mark.asyncio
+    async def test_ndjson(self, tmp_path):
+        """batches are written in order off the event loop"""
+        path = tmp_path / "results.ndjson"
+        sink = NDJSONSink(path, batch_size=TEST_BATCH_SIZE)
+
+        for index, address in enumerate(addresses(TEST_RESULT_COUNT)):
+            sink.write(address, index % 2 == 0)
+
+        # everything but the partial batch has been handed to the writer thread
+        assert len(sink.buffer) < TEST_BATCH_SIZE
+
+        await sink.close()
+
+        records = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [record["address"] for record in records] == addresses(TEST_RESULT_COUNT)
+        assert records[1]["reachable"] is False
+        assert sink.written == TEST_RESULT_COUNT
+
+    @pytest.mark.asyncio
+    async def test_csv(self, tmp_path):
+        path = tmp_path / "results.csv"
+        sink = CSVSink(path, batch_size=TEST_BATCH_SIZE)
+        sink.write(TEST_SINGLE_IP, True)
+        sink.write_mismatch(TEST_MISMATCH)
+
+        await sink.flush()
+        assert path.read_text().startswith("address,reachable,time")
+
+        await sink.close()
+
+        with open(path, newline="") as file:
+            rows = list(csv.DictReader(file))
+
+        assert list(rows[0]) == CSV_FIELDS
+        assert [(row["address"], row["reachable"]) for row in rows] == [(TEST_SINGLE_IP, "1")]
+
+    @pytest.mark.asyncio
+    async def test_mismatch_sink(self, tmp_path):
+        path = tmp_path / "mismatches.ndjson"
+        sink = MismatchSink(path)
+        sink.write(TEST_SINGLE_IP, True)
+        sink.write_mismatch(TEST_MISMATCH)
+
+        await sink.close()
+
+        assert [json.loads(line) for line in path.read_text().splitlines()] == [TEST_MISMATCH]
+
+    @pytest.mark.asyncio
+    async def test_backpressure_is_awaited(self, tmp_path):
+        """a writer that falls behind makes callers wait in drain(), the event loop keeps running"""
+        sink = SlowDiskSink(tmp_path / "results.ndjson", batch_size=1)
+        for address in addresses(MAX_PENDING_BATCHES):
+            sink.write(address, True)
+        assert sink.backlogged
+
+        drain = asyncio.ensure_future(sink.drain())
+        await asyncio.sleep(0.01)
+        assert not drain.done()
+
+        sink.disk.set()
+        await asyncio.wait_for(drain, 1)
+        assert not sink.backlogged
+
+        await sink.close()
+        assert sink.written == MAX_PENDING_BATCHES
+
+    @pytest.mark.asyncio
+    async def test_concurrent_drainers(self, tmp_path):
+        """drainers woken by the same batch neither block the loop on unfinished writes nor drain past the limit"""
+        sink = MeteredDiskSink(tmp_path / "results.ndjson", batch_size=1)
+        for address in addresses(MAX_PENDING_BATCHES + 1):
+            sink.write(address, True)
+        # frees the writer eventually should a drainer block the loop on it
+        unstick = threading.Timer(1, sink.disk.release, [TEST_RESULT_COUNT])
+        unstick.start()
+
+        drains = [asyncio.ensure_future(sink.drain()) for _ in range(3)]
+        await asyncio.sleep(0.01)
+
+        started = time.perf_counter()
+        sink.disk.release()
+        await asyncio.sleep(0.05)
+        assert time.perf_counter() - started < 0.5
+        assert len(sink.writes) == MAX_PENDING_BATCHES
+        assert not any(drain.done() for drain in drains)
+
+        sink.disk.release()
+        await asyncio.wait_for(asyncio.gather(*drains), 1)
+        assert len(sink.writes) == MAX_PENDING_BATCHES - 1
+
+        unstick.cancel()
+        sink.disk.release(TEST_RESULT_COUNT)
+        await sink.close()
+        assert sink.written == MAX_PENDING_BATCHES + 1
@@ -0,0 +1,131 @@
+import pytest
+from joby_challenge.models.result_store import OffsetResultStore
+from tests.constants import TEST_NETWORK_CIDR, TEST_NETWORK_CIDR_2, TEST_INVALID_IP
+
+TEST_WIDE_NETWORKS = ["10.1.0.0/16", "10.2.0.0/16"]
+TEST_SITE_NETWORKS = ["10.1.0.0/24", "10.2.0.0/24", "10.3.0.0/24"]
+# offset -> reachable at each site
+TEST_SITE_RESULTS = {
+    1: [True, True, True],
+    2: [True, True, True],
+    3: [True, True, False],
+    4: [False, False, False],
+}
+TEST_IPV6_PREFIXES = ["2001:db8:1::/64", "2001:db8:2::/64"]
+TEST_IPV6_OFFSETS = [1 << 32, 1]
+LOCATE_TEST_CASES = [
+    ("192.168.1.1", (0, 1)),
+    ("192.168.2.6", (1, 6)),
+    ("192.168.3.1", None),
+    ("::1", None),
+]
+
+
+@pytest.fixture
+def store():
+    return OffsetResultStore([TEST_NETWORK_CIDR, TEST_NETWORK_CIDR_2])
+
+
+class TestOffsetResultStore:
+
+    def test_init_skips_unparseable(self):
+        store = OffsetResultStore([TEST_NETWORK_CIDR, TEST_INVALID_IP])
+        assert len(store.networks) == 1
+        assert len(store.probed) == 1
+
+    @pytest.mark.parametrize("ip_address,expected", LOCATE_TEST_CASES)
+    def test_locate(self, store, ip_address, expected):
+        assert store.locate(ip_address) == expected
+
+    def test_add(self, store):
+        assert store.add("192.168.1.3", True) == (0, 3)
+        assert store.add("192.168.3.3", True) is None
+
+        assert store.result(0, 3) is True
+        assert store.result(1, 3) is None
+
+        # a later result replaces the earlier one
+        store.add("192.168.1.3", False)
+        assert store.result(0, 3) is False
+        assert 3 not in store.reachable[0]
+        assert 3 in store.failed[0]
+
+    def test_wide_networks_keep_hosts_apart(self):
+        """x.y.0.5 and x.y.1.5 are different offsets, unlike the last-octet buckets"""
+        store = OffsetResultStore(TEST_WIDE_NETWORKS)
+        store.add("10.1.0.5", True)
+        store.add("10.2.0.5", True)
+        store.add("10.1.1.5", True)
+        store.add("10.2.1.5", False)
+
+        assert store.mismatches() == [{"10.1.1.5": True, "10.2.1.5": False}]
+        assert set(store.as_dict()) == {"5", "261"}
+
+    def test_mismatches(self, store):
+        store.add("192.168.1.1", True)
+        store.add("192.168.2.1", False)
+        store.add("192.168.1.2", True)
+        store.add("192.168.2.2", True)
+        # only probed in one network, nothing to compare against
+        store.add("192.168.1.4", False)
+
+        assert store.mismatches() == [{"192.168.1.1": True, "192.168.2.1": False}]
+        assert store.as_dict() == {
+            "1": {"192.168.1.1": True, "192.168.2.1": False},
+            "2": {"192.168.1.2": True, "192.168.2.2": True},
+            "4": {"192.168.1.4": False},
+        }
+
+    def test_signature_groups(self):
+        """offsets split by which networks they answered in, partially probed offsets left out"""
+        store = OffsetResultStore(TEST_SITE_NETWORKS)
+        for offset, results in TEST_SITE_RESULTS.items():
+            for index, reachable in enumerate(results):
+                store.set(index, offset, reachable)
+        # only probed at the first site
+        store.set(0, 9, True)
+
+        assert store.signature_groups() == {
+            0b111: (2, 0b110),
+            0b011: (1, 1 << 3),
+            0b000: (1, 1 << 4),
+        }
+
+    def test_signature_groups_empty(self):
+        assert OffsetResultStore([]).signature_groups() == {}
+
+    def test_dump_and_merge(self, store):
+        """shard results merge into one store, later results win"""
+        shard = OffsetResultStore([TEST_NETWORK_CIDR, TEST_NETWORK_CIDR_2])
+        store.add("192.168.1.1", True)
+        store.add("192.168.1.2", True)
+        shard.add("192.168.1.2", False)
+        shard.add("192.168.2.2", True)
+
+        store.merge(shard.dump())
+
+        assert store.as_dict() == {
+            "1": {"192.168.1.1": True},
+            "2": {"192.168.1.2": False, "192.168.2.2": True},
+        }
+        assert store.mismatches() == [{"192.168.1.2": False, "192.168.2.2": True}]
+
+    def test_merge_wrong_networks(self, store):
+        with pytest.raises(ValueError):
+            store.merge(OffsetResultStore([TEST_NETWORK_CIDR]).dump())
+
+    def test_sparse_offsets(self):
+        """sparse stores index bitmaps by target position, a /64 costs a few bytes"""
+        store = OffsetResultStore(TEST_IPV6_PREFIXES, offsets=TEST_IPV6_OFFSETS)
+
+        assert store.add("2001:db8:1::1:0:0", True) == (0, 1)
+        assert store.add("2001:db8:2::1:0:0", False) == (1, 1)
+        assert store.add("2001:db8:2::5", False) is None
+        assert store.address(1, 1) == "2001:db8:2::1:0:0"
+        assert [len(bitmap.data) for bitmap in store.probed] == [1, 1]
+        assert store.as_dict() == {str(1 << 32): {"2001:db8:1::1:0:0": True, "2001:db8:2::1:0:0": False}}
+        assert store.mismatches() == [{"2001:db8:1::1:0:0": True, "2001:db8:2::1:0:0": False}]
+
+        merged = OffsetResultStore(TEST_IPV6_PREFIXES, offsets=TEST_IPV6_OFFSETS)
+        merged.merge(store.dump())
+        assert merged.as_dict() == store.as_dict()
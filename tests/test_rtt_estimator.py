@@ -0,0 +1,101 @@
+import pytest
+from joby_challenge.models.metrics import registry
+from joby_challenge.models.rtt_estimator import RTTEstimate, RTTEstimator
+from joby_challenge.utils import subnet
+
+TEST_MIN_TIMEOUT = 0.05
+TEST_MAX_TIMEOUT = 1.0
+TEST_HOST = "10.0.0.1"
+TEST_NEIGHBOUR = "10.0.0.200"
+TEST_OTHER_SUBNET_HOST = "10.0.1.1"
+TEST_IPV6_HOST = "2001:db8::1"
+TEST_IPV6_NEIGHBOUR = "2001:db8::ffff:1"
+
+
+@pytest.fixture
+def estimator():
+    registry.reset()
+    yield RTTEstimator(TEST_MIN_TIMEOUT, TEST_MAX_TIMEOUT)
+    registry.reset()
+
+
+class TestRTTEstimate:
+    def test_first_sample(self):
+        estimate = RTTEstimate()
+        estimate.observe(0.1)
+
+        assert estimate.srtt == 0.1
+        assert estimate.rttvar == 0.05
+        assert estimate.timeout() == pytest.approx(0.3)
+
+    def test_smoothing(self):
+        """RFC 6298: the deviation is updated with the old smoothed RTT, then the smoothed RTT moves 1/8 of the way."""
+        estimate = RTTEstimate()
+        estimate.observe(0.1)
+        estimate.observe(0.2)
+
+        assert estimate.rttvar == pytest.approx(0.75 * 0.05 + 0.25 * 0.1)
+        assert estimate.srtt == pytest.approx(0.1 + 0.125 * 0.1)
+        assert estimate.samples == 2
+
+    def test_converges_on_steady_rtt(self):
+        estimate = RTTEstimate()
+        for _ in range(100):
+            estimate.observe(0.002)
+
+        assert estimate.srtt == pytest.approx(0.002)
+        assert estimate.timeout() == pytest.approx(0.002, rel=0.01)
+
+
+class TestRTTEstimator:
+    def test_ceiling_before_any_reply(self, estimator):
+        assert estimator.timeout(TEST_HOST) == TEST_MAX_TIMEOUT
+
+    def test_floor(self, estimator):
+        estimator.observe(TEST_HOST, 0.001)
+
+        assert estimator.timeout(TEST_NEIGHBOUR) == TEST_MIN_TIMEOUT
+
+    def test_ceiling(self, estimator):
+        estimator.observe(TEST_HOST, 2.0)
+
+        assert estimator.timeout(TEST_HOST) == TEST_MAX_TIMEOUT
+
+    def test_per_subnet(self, estimator):
+        estimator.observe(TEST_HOST, 0.1)
+        estimator.observe(TEST_OTHER_SUBNET_HOST, 0.2)
+
+        assert estimator.timeout(TEST_NEIGHBOUR) == pytest.approx(0.3)
+        assert estimator.timeout(TEST_OTHER_SUBNET_HOST) == pytest.approx(0.6)
+        assert len(estimator.subnets) == 2
+
+    def test_ipv6_subnet_is_a_64(self, estimator):
+        estimator.observe(TEST_IPV6_HOST, 0.1)
+
+        assert estimator.estimate(TEST_IPV6_NEIGHBOUR) is estimator.subnets[subnet(TEST_IPV6_HOST)]
+
+    def test_unanswered_subnet_uses_overall(self, estimator):
+        estimator.observe(TEST_HOST, 0.1)
+
+        assert estimator.estimate(TEST_OTHER_SUBNET_HOST) is estimator.overall
+        assert estimator.timeout(TEST_OTHER_SUBNET_HOST) == pytest.approx(0.3)
+
+    def test_invalid_bounds(self):
+        with pytest.raises(ValueError):
+            RTTEstimator(1.0, 0.5)
+
+    def test_reports_effective_timeouts(self, estimator, caplog):
+        estimator.timeout(TEST_HOST)
+        estimator.observe(TEST_HOST, 0.001)
+        estimator.timeout(TEST_HOST)
+
+        stats = estimator.stats()
+        assert stats["probes"] == 2
+        assert stats["min_timeout"] == TEST_MIN_TIMEOUT
+        assert stats["max_timeout"] == TEST_MAX_TIMEOUT
+        assert stats["mean_timeout"] == pytest.approx((TEST_MIN_TIMEOUT + TEST_MAX_TIMEOUT) / 2)
+        assert registry.timeout.count == 2
+
+        with caplog.at_level("INFO"):
+            estimator.log_stats()
+        assert "2 probes waited" in caplog.text
@@ -0,0 +1,65 @@
+import ipaddress
+import pytest
+from joby_challenge.models.bitmap import iter_bits
+from joby_challenge.models.result_store import OffsetResultStore
+from joby_challenge.models.snapshot import Snapshot, write_snapshot, diff_snapshots, offset_address, PROBED, REACHABLE
+
+TEST_SNAPSHOT_NETWORKS = ["10.1.0.0/24", "10.2.0.0/29", "2001:db8::/120"]
+TEST_METADATA = {"started": 1.5, "skips": [1]}
+
+
+def build_store(networks, results):
+    store = OffsetResultStore(networks)
+    for address, reachable in results.items():
+        store.add(address, reachable)
+    return store
+
+
+class TestSnapshot:
+
+    def test_round_trip(self, tmp_path):
+        path = tmp_path / "scan.snap"
+        store = build_store(TEST_SNAPSHOT_NETWORKS, {"10.1.0.1": True, "10.1.0.200": False, "2001:db8::5": True})
+        # a network that grew past its preallocated size keeps all its bits
+        store.probed[1].set(100)
+
+        write_snapshot(path, store, TEST_METADATA)
+
+        with Snapshot(path) as snapshot:
+            assert snapshot.networks == [ipaddress.ip_network(network) for network in TEST_SNAPSHOT_NETWORKS]
+            assert snapshot.metadata == TEST_METADATA
+
+            for index in range(len(TEST_SNAPSHOT_NETWORKS)):
+                assert snapshot.bitmap(index, PROBED) == store.probed[index].to_int()
+                assert snapshot.bitmap(index, REACHABLE) == store.reachable[index].to_int()
+                # bitmaps are aligned so they can be viewed in place
+                assert snapshot.sections[index][0] % 8 == 0
+
+    def test_not_a_snapshot(self, tmp_path):
+        path = tmp_path / "results.json"
+        path.write_bytes(b"{}" * 20)
+
+        with pytest.raises(ValueError):
+            Snapshot(path)
+
+    def test_diff(self, tmp_path):
+        """only hosts probed in both snapshots count, networks missing from one are skipped"""
+        old_path = tmp_path / "old.snap"
+        new_path = tmp_path / "new.snap"
+
+        write_snapshot(old_path, build_store(TEST_SNAPSHOT_NETWORKS[:2], {
+            "10.1.0.1": True, "10.1.0.2": False, "10.1.0.3": True, "10.1.0.4": True, "10.2.0.1": True,
+        }))
+        write_snapshot(new_path, build_store(TEST_SNAPSHOT_NETWORKS[:1], {
+            "10.1.0.1": False, "10.1.0.2": True, "10.1.0.3": True, "10.1.0.5": True,
+        }))
+
+        with Snapshot(old_path) as old, Snapshot(new_path) as new:
+            [network_diff] = diff_snapshots(old, new)
+
+        network = ipaddress.ip_network(TEST_SNAPSHOT_NETWORKS[0])
+        assert network_diff.network == network
+        assert network_diff.probed == 3
+        assert (network_diff.came_up_count, network_diff.went_down_count) == (1, 1)
+        assert [offset_address(network, offset) for offset in iter_bits(network_diff.came_up)] == ["10.1.0.2"]
+        assert [offset_address(network, offset) for offset in iter_bits(network_diff.went_down)] == ["10.1.0.1"]
@@ -0,0 +1,125 @@
+import io
+import pytest
+from joby_challenge.models.exclusions import Exclusions
+from joby_challenge.models.ip_address_handler import IPAddressHandler
+from joby_challenge.models.target_sources import (
+    OffsetTargets,
+    StreamedTargets,
+    parse_offset,
+    hitlist_offsets,
+    STDIN_SOURCE,
+)
+from tests.constants import TEST_INVALID_IP
+
+TEST_PREFIXES = ["2001:db8:1::/64", "2001:db8:2::/64"]
+TEST_OFFSETS = [0x53, 1, 0x10000, 1]
+OFFSET_TEST_CASES = [("5", 5), ("0x1f", 0x1F), ("::1", 1), ("::a:0:0:1", 0xA000000000001)]
+TEST_HITLIST = ["2001:db8:1::53", "2001:db8:2::1", "2001:db8:1::53", "2001:db9::1"]
+TEST_STREAM_NETWORKS = ["192.168.1.0/24", "192.168.2.0/24", "2001:db8::/112"]
+TEST_TARGETS_FILE = """\
+# inventory export
+192.168.1.7
+192.168.2.7
+192.168.1.7  # again
+10.0.0.1
+not_an_ip
+192.168.1.9
+2001:db8:0::0:5
+2001:db8::5
+"""
+EXPECTED_STREAMED = ["192.168.1.7", "192.168.2.7", "2001:db8::5"]
+EXPECTED_STREAM_STATS = {"read": 8, "yielded": 3, "duplicate": 2, "outside": 1, "excluded": 1, "invalid": 1}
+EXPECTED_TARGETS = [
+    "2001:db8:1::1", "2001:db8:2::1",
+    "2001:db8:1::53", "2001:db8:2::53",
+    "2001:db8:1::1:0", "2001:db8:2::1:0",
+]
+
+
+class TestTargetSources:
+
+    @pytest.mark.parametrize("value,expected", OFFSET_TEST_CASES, ids=["decimal", "hex", "iid", "long iid"])
+    def test_parse_offset(self, value, expected):
+        assert parse_offset(value) == expected
+
+    def test_parse_offset_invalid(self):
+        with pytest.raises(ValueError):
+            parse_offset(TEST_INVALID_IP)
+
+    def test_hitlist_offsets(self, caplog):
+        assert hitlist_offsets(TEST_HITLIST, TEST_PREFIXES) == {0x53, 1}
+        assert "1 hitlist addresses are outside every network" in caplog.text
+
+    def test_offset_targets(self):
+        """offsets are probed in every prefix, counterparts next to each other"""
+        targets = OffsetTargets(TEST_PREFIXES, TEST_OFFSETS)
+
+        assert list(targets) == EXPECTED_TARGETS
+        assert len(targets) == len(EXPECTED_TARGETS)
+        assert targets.ranges[0] == (6, 0x20010DB8000100000000000000000000, 0x20010DB800010000FFFFFFFFFFFFFFFF)
+
+    def test_offset_targets_exclusions(self):
+        """offsets past the end of a smaller network and excluded addresses are left out"""
+        targets = OffsetTargets(
+            ["10.0.0.0/24", "10.1.0.0/16"], [1, 3, 0x100], skips=["3"], exclusions=Exclusions(["10.1.0.1"]),
+        )
+
+        assert list(targets) == ["10.0.0.1", "10.1.1.0"]
+        assert len(targets) == 2
+
+    def test_shard(self):
+        targets = OffsetTargets(TEST_PREFIXES, TEST_OFFSETS)
+        shards = targets.shard(2)
+
+        assert [shard.offsets for shard in shards] == [[1], [0x53, 0x10000]]
+        assert [address for shard in shards for address in shard] == EXPECTED_TARGETS
+
+    def test_handler(self):
+        handler = IPAddressHandler(TEST_PREFIXES, offsets=TEST_OFFSETS)
+
+        assert isinstance(handler.ip_addresses, OffsetTargets)
+        assert list(handler.ip_addresses) == EXPECTED_TARGETS
+
+
+@pytest.fixture
+def targets_file(tmp_path):
+    path = tmp_path / "targets.txt"
+    path.write_text(TEST_TARGETS_FILE)
+    return str(path)
+
+
+class TestStreamedTargets:
+
+    def test_dedup_and_filter(self, targets_file):
+        targets = StreamedTargets(targets_file, TEST_STREAM_NETWORKS, exclusions=Exclusions(["192.168.1.9"]))
+
+        assert list(targets) == EXPECTED_STREAMED
+        assert targets.stats == EXPECTED_STREAM_STATS
+        # files can be read again, with fresh dedup state
+        assert list(targets) == EXPECTED_STREAMED
+
+    @pytest.mark.asyncio
+    async def test_async_from_stdin(self, monkeypatch):
+        monkeypatch.setattr("sys.stdin", io.StringIO(TEST_TARGETS_FILE))
+        targets = StreamedTargets(STDIN_SOURCE, TEST_STREAM_NETWORKS, skips=["9"])
+
+        assert [address async for address in targets] == EXPECTED_STREAMED
+        assert targets.stats == EXPECTED_STREAM_STATS
+
+    def test_skips_lines_with_nul_bytes(self, tmp_path):
+        path = tmp_path / "targets.txt"
+        path.write_text("192.168.1.\x007\n192.168.1.8\n")
+        targets = StreamedTargets(str(path), TEST_STREAM_NETWORKS)
+
+        assert list(targets) == ["192.168.1.8"]
+        assert targets.stats["invalid"] == 1
+
+    def test_rejects_huge_networks(self):
+        with pytest.raises(ValueError):
+            StreamedTargets(STDIN_SOURCE, TEST_PREFIXES)
+
+    def test_handler(self, targets_file):
+        handler = IPAddressHandler(TEST_STREAM_NETWORKS, targets_file=targets_file)
+
+        assert isinstance(handler.ip_addresses, StreamedTargets)
+        assert handler.lazy